@@ -1,37 +1,201 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import os
+from flask import Flask, Response, render_template, request, jsonify, abort, url_for, g, stream_with_context
 import io
-import base64
+import os
+import json
+import hashlib
 import pandas as pd
 # Set matplotlib to use non-interactive Agg backend before any other imports
 import matplotlib
 
 matplotlib.use('Agg')
 
-from visualizations.matplotlib_visualizations import generate_matplotlib_visualizations
-from visualizations.seaborn_visualizations import generate_seaborn_visualizations
-from visualizations.pandas_visualizations import generate_pandas_visualizations
-from visualizations.numpy_visualizations import generate_numpy_visualizations
+import matplotlib.pyplot as plt
+from visualizations.chart_cache import chart_cache
+from visualizations.figures import figure_pool
+from visualizations import formats
+from visualizations.metrics import metrics, span, start_trace, finish_trace
+from visualizations import registry
+from visualizations.rendering import iter_chart_pngs
+from visualizations.specs import iter_chart_specs, has_specs, SPEC_OPTIONS
+from visualizations.filters import parse_filter, filter_key, filter_frame, filter_options
+from visualizations.aggregates import append_aggregates
+from visualizations.jobs import render_jobs, QueueFull
+from visualizations.streaming import summarize_dataset, append_summary
+from dataset import load_dataset, append_rows, is_out_of_core, DATA_PATH
+import uploads
 
 app = Flask(__name__)
+# Bodies are bounded by the largest upload; /upload checks the length itself to answer with JSON
+app.config['MAX_CONTENT_LENGTH'] = uploads.UPLOAD_MAX_BYTES + uploads.MULTIPART_OVERHEAD_BYTES
 # ...existing code...
 
+# Chart URLs carry the dataset version, so a matching URL can be cached for a long time
+CHART_MAX_AGE = int(os.environ.get('CHART_MAX_AGE', 24 * 60 * 60))
+
+
+# The dashboard grid shows thumbnails; full resolution is only drawn when a chart is opened or downloaded.
+# Browsers fetching the thumbnail URL negotiate WebP, so that is what a page load renders ahead of them.
+THUMBNAIL_OPTIONS = formats.render_options('webp', size='thumb')
+
+
+def chart_etag(library, chart_id, version, options=None):
+    options = ','.join(f'{name}={value}' for name, value in sorted((options or {}).items()))
+    return hashlib.sha256(f'{library}/{chart_id}/{version}/{options}'.encode('utf-8')).hexdigest()[:32]
+
+
+def chart_entry(chart, version, filters=(), dataset=None):
+    # Image URLs of a filtered view (or an uploaded dataset) carry its filter (and dataset id),
+    # so the image requests select the same rows
+    view = {'v': version[:16], 'filter': filter_key(filters) or None, 'dataset': dataset}
+    return {
+        'id': chart.id,
+        'title': chart.title,
+        'url': url_for('chart_negotiated', library=chart.library, chart_id=chart.id, size='thumb', **view),
+        'full_url': url_for('chart_image', library=chart.library, chart_id=chart.id, ext='png', **view)
+    }
+
+
+def spec_entry(chart, spec):
+    return {'id': chart.id, 'title': chart.title, 'spec': spec}
+
+
+def error_entry(chart, error):
+    return {'id': chart.id, 'title': chart.title, 'error': error}
+
+
+def request_options(format=None):
+    """Render options from the query string (format, dpi, width, size); raises ValueError on bad values."""
+    args = request.args
+    return formats.render_options(format or args.get('format'), dpi=args.get('dpi'), width=args.get('width'),
+                                  size=args.get('size'))
+
+
+def cache_metrics():
+    stats = chart_cache.stats()
+    for name in ('hits', 'disk_hits', 'misses', 'evictions'):
+        yield f'dataviz_chart_cache_{name}_total', {}, stats[name]
+    yield 'dataviz_chart_cache_entries', {}, stats['entries']
+    yield 'dataviz_chart_cache_bytes', {}, stats['bytes']
+
+
+def figure_metrics():
+    # Figures open in this process: pool figures being drawn on, plus any left in pyplot (a leak)
+    pool = figure_pool.stats()
+    yield 'dataviz_open_figures', {}, pool['in_use'] + len(plt.get_fignums())
+    yield 'dataviz_figure_pool_idle', {}, pool['idle']
+
+
+metrics.add_collector(cache_metrics)
+metrics.add_collector(figure_metrics)
+for name in ('hits', 'disk_hits', 'misses', 'evictions'):
+    metrics.describe(f'dataviz_chart_cache_{name}_total', 'counter', f'Chart cache {name.replace("_", " ")}.')
+metrics.describe('dataviz_chart_cache_entries', 'gauge', 'Charts held in the in-memory cache.')
+metrics.describe('dataviz_chart_cache_bytes', 'gauge', 'Bytes held in the in-memory chart cache.')
+metrics.describe('dataviz_open_figures', 'gauge', 'Matplotlib figures currently open in the web process.')
+metrics.describe('dataviz_figure_pool_idle', 'gauge', 'Cleared figures waiting for reuse in the web process.')
+
+
+def count_bytes(chunks, endpoint):
+    for chunk in chunks:
+        metrics.inc('dataviz_response_bytes_total', len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk),
+                    endpoint=endpoint)
+        yield chunk
+
+
+@app.before_request
+def begin_trace():
+    g.trace = start_trace(method=request.method, path=request.path, endpoint=request.endpoint)
+
+
+@app.after_request
+def record_request(response):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    status = response.status_code
+    if response.is_streamed:
+        # Streamed bodies are counted as they are sent
+        response.response = count_bytes(response.response, endpoint)
+    else:
+        metrics.inc('dataviz_response_bytes_total', response.content_length or 0, endpoint=endpoint)
+
+    def finish():
+        # Runs once the body has been sent, so streamed responses are timed to their last line
+        duration = finish_trace(trace, status=status)
+        metrics.inc('dataviz_requests_total', endpoint=endpoint, status=status)
+        metrics.observe('dataviz_request_seconds', duration, endpoint=endpoint)
+
+    response.call_on_close(finish)
+    return response
+
+
+def load_view(filters=(), path=DATA_PATH):
+    """Return (df, version, render kwargs) for the dataset at path, restricted to filters.
+
+    Datasets too large for memory are summarized chunk by chunk: charts get
+    the exact shared aggregates plus a row sample for row-level drawing. The
+    summary covers every row, so a filtered view of such a dataset is drawn
+    from the filtered sample alone. Raises ValueError for filters on columns
+    the dataset does not have.
+    """
+    with span('load'):
+        if is_out_of_core(path):
+            sample, version, aggs = summarize_dataset(path)
+            check_filter_columns(sample, filters)
+            if not filters:
+                return sample, version, {'source': sample, 'aggregates': aggs}
+            with span('filter'):
+                sample, version = filter_frame(sample, version, filters)
+            return sample, version, {'source': sample}
+        df, version = load_dataset(path)
+    if not filters:
+        return df, version, {'source': path}
+    check_filter_columns(df, filters)
+    with span('filter'):
+        df, version = filter_frame(df, version, filters)
+    # Workers select the same rows from their own mapping of the dataset
+    return df, version, {'source': (path, filter_key(filters))}
+
+
+def check_filter_columns(df, filters):
+    missing = [column for column, _ in filters if column not in df.columns]
+    if missing:
+        raise ValueError(f'The dataset has no {", ".join(missing)} column to filter on')
+
+
+def request_filters():
+    # The filter comes as a form field on POSTs and in the query string of chart URLs
+    return parse_filter(request.values.get('filter'))
+
+
+def request_dataset():
+    # An uploaded dataset picked by ?dataset=<id> (or the form field); None means the dashboard dataset
+    return request.values.get('dataset') or None
+
+
+def request_view():
+    """(filters, dataset id, df, version, render kwargs) of the request's dataset and filter.
+
+    Raises LookupError for an unknown dataset and ValueError for a bad filter
+    or a dataset that is still converting.
+    """
+    filters = request_filters()
+    dataset = request_dataset()
+    path = uploads.dataset_path(dataset) if dataset else DATA_PATH
+    df, version, view = load_view(filters, path)
+    return filters, dataset, df, version, view
+
+
+def view_error(e):
+    return error_response(str(e), 404 if isinstance(e, LookupError) else 400)
+
+
+def error_response(message, status=400):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
 
-# Load dataset
-def load_data():
-    # Try to load from Kaggle first
-    try:
-         df = pd.read_csv('data/shopping_trends.csv')
-     
-    except:
-        import kagglehub
-        from kagglehub import KaggleDatasetAdapter
-        df = kagglehub.load_dataset(
-            KaggleDatasetAdapter.PANDAS,
-            "bhadramohit/customer-shopping-latest-trends-dataset",
-            "customer_shopping_trends.csv")
-       
-    return df
 
 @app.route('/')
 def index():
@@ -39,44 +203,323 @@ def index():
 
 @app.route('/get_visualizations', methods=['POST'])
 def get_visualizations():
-    library = request.form.get('library')
-    df = load_data()
-    
-    if library == 'matplotlib':
-        results = generate_matplotlib_visualizations(df)
-    elif library == 'seaborn':
-        results = generate_seaborn_visualizations(df)
-    elif library == 'pandas':
-        results = generate_pandas_visualizations(df)
-    elif library == 'plotly':
-        results = generate_numpy_visualizations(df)
-    else:
+    requested = request.form.get('library')
+    library = registry.resolve_library(requested)
+    if library is None:
         return jsonify({'error': 'Invalid library selected'})
-    
+    # mode=spec (the default for client-rendered buttons) returns chart specs the browser draws itself
+    mode = request.form.get('mode') or ('spec' if requested in registry.CLIENT_RENDERED else 'image')
+    if mode == 'spec' and not has_specs(library):
+        return jsonify({'error': f'No client-side charts for {library}'})
+    try:
+        filters, dataset, df, version, view = request_view()
+    except (LookupError, ValueError) as e:
+        return jsonify({'error': str(e)})
+    if df.empty:
+        return jsonify({'error': 'No rows match the selected filters'})
+    if not registry.get_charts(library, df.columns):
+        return jsonify({'error': f"None of the {library} charts apply to this dataset's columns"})
+
+    try:
+        job, coalesced = submit_visualizations(library, mode, df, version, view, filters, dataset)
+    except QueueFull as e:
+        response = error_response(f'Too many render jobs waiting ({e}), try again shortly', 503)
+        response.headers['Retry-After'] = '5'
+        return response
+
+    if request.form.get('async') == '1':
+        # Return at once; the client polls the job or follows its events
+        response = jsonify(job_status_body(job, coalesced=coalesced))
+        response.status_code = 202
+        return response
+
+    if request.form.get('stream') == '1':
+        return stream_job(job)
+
+    job.wait()
+    state, items, error = job.snapshot()
+    if error:
+        return error_response(error, 500)
+    entries = {entry['id']: entry for entry in job_entries(job, items)}
+    results = {
+        'library': library,
+        'mode': mode,
+        'visualizations': [entries[c.id] for c in job_charts(job) if c.id in entries]
+    }
     return jsonify(results)
 
-@app.route('/download_image', methods=['POST'])
-def download_image():
-    image_data = request.form.get('image_data')
-    chart_title = request.form.get('chart_title', 'chart')
-    
-    # Remove the header part
-    image_data = image_data.split(',')[1]
-    
-    # Decode the base64 image data
-    image_bytes = base64.b64decode(image_data)
-    
-    # Create a BytesIO object to serve as a file-like object
-    image_io = io.BytesIO(image_bytes)
-    image_io.seek(0)
-    
-    # Send the image as a downloadable file
-    return send_file(
-        image_io,
-        mimetype='image/png',
-        as_attachment=True,
-        download_name=f'{chart_title}.png'
-    )
+def submit_visualizations(library, mode, df, version, view, filters=(), dataset=None):
+    """Queue the rendering of library's charts for this view; returns (job, coalesced).
+
+    Image jobs render (or find in the cache) every thumbnail, so the page's
+    image requests are cache hits; spec jobs build every chart spec. The
+    version of a filtered view includes its filter, and an uploaded dataset
+    has its own version, so requests for the same library, mode and view
+    share one job. Only the charts whose columns the dataset has are rendered;
+    a chart that fails gets an error entry and the others are still rendered.
+    """
+    def run(job):
+        def failed(chart, error):
+            app.logger.error('Chart %s/%s failed in render job %s', library, chart.id, job.id, exc_info=error)
+            job.append(chart.id, error=f'{chart.title} could not be drawn: {error or type(error).__name__}')
+
+        if mode == 'spec':
+            for chart, spec in iter_chart_specs(library, df, version=version, aggregates=view.get('aggregates'),
+                                                on_error=failed):
+                job.append(chart.id, spec)
+        else:
+            for chart, _ in iter_chart_pngs(library, df, version=version, options=THUMBNAIL_OPTIONS,
+                                            on_error=failed, **view):
+                job.append(chart.id)
+
+    return render_jobs.submit((library, mode, version), run, library=library, mode=mode, version=version,
+                              filter=filter_key(filters), dataset=dataset)
+
+def job_charts(job):
+    library, dataset = job.info['library'], job.info['dataset']
+    # An uploaded dataset's columns are in its status; the dashboard dataset has every chart's columns
+    charts = registry.get_charts(library, uploads.status(dataset)['columns'] if dataset else None)
+    if job.info['mode'] == 'spec':
+        return [c for c in charts if registry.get_spec(library, c.id)]
+    return charts
+
+def job_entries(job, items):
+    # Response entries for (chart_id, payload) items of a job, built here because URLs need the request context
+    library, filters = job.info['library'], parse_filter(job.info['filter'])
+    for chart_id, payload in items:
+        chart = registry.get_chart(library, chart_id)
+        if chart_id in job.errors:
+            yield error_entry(chart, job.errors[chart_id])
+        elif job.info['mode'] == 'spec':
+            yield spec_entry(chart, payload)
+        else:
+            yield chart_entry(chart, job.info['version'], filters, job.info['dataset'])
+
+def job_status_body(job, since=0, **fields):
+    state, items, error = job.snapshot(since)
+    body = {
+        'job': job.id,
+        'status': state,
+        'library': job.info['library'],
+        'mode': job.info['mode'],
+        'total': len(job_charts(job)),
+        'completed': since + len(items),
+        'visualizations': list(job_entries(job, items)),
+        'status_url': url_for('job_status', job_id=job.id),
+        'events_url': url_for('job_events', job_id=job.id),
+        **fields
+    }
+    if error:
+        body['error'] = error
+    return body
+
+def stream_job(job):
+    # NDJSON: a header line listing every chart, then one line per chart as the job finishes it
+    header = {'library': job.info['library'], 'mode': job.info['mode'], 'job': job.id,
+              'charts': [{'id': c.id, 'title': c.title} for c in job_charts(job)]}
+
+    def generate():
+        yield json.dumps(header) + '\n'
+        try:
+            for item in job.iter_items():
+                for entry in job_entries(job, [item]):
+                    yield json.dumps(entry) + '\n'
+        except Exception as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    # Entries are built as lines are sent, so the body keeps the request context for their URLs
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    # Poll a render job: its state and the entries finished so far, or only those after ?since=N
+    job = render_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job_status_body(job, since=request.args.get('since', 0, type=int)))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    # Follow a render job: the same NDJSON stream as /get_visualizations with stream=1
+    job = render_jobs.get(job_id)
+    if job is None:
+        abort(404)
+    return stream_job(job)
+
+@app.route('/chart/<library>/<chart_id>')
+def get_chart(library, chart_id):
+    name = registry.resolve_library(library)
+    chart = registry.get_chart(name, chart_id) if name else None
+    if chart is None:
+        abort(404)
+    try:
+        filters, dataset, df, version, view = request_view()
+    except (LookupError, ValueError) as e:
+        return view_error(e)
+    if df.empty:
+        return error_response('No rows match the selected filters')
+    if not registry.chart_columns(chart) <= set(df.columns):
+        abort(404)
+    for _ in iter_chart_pngs(name, df, version=version, chart_ids=[chart_id], **view):
+        pass
+    return jsonify(chart_entry(chart, version, filters, dataset))
+
+@app.route('/chart/<library>/<chart_id>/spec')
+def chart_spec(library, chart_id):
+    name = registry.resolve_library(library)
+    if name is None or registry.get_spec(name, chart_id) is None:
+        abort(404)
+    try:
+        _, _, df, version, view = request_view()
+    except (LookupError, ValueError) as e:
+        return view_error(e)
+    if df.empty:
+        return error_response('No rows match the selected filters')
+    if not registry.chart_columns(registry.get_chart(name, chart_id)) <= set(df.columns):
+        abort(404)
+    etag = chart_etag(name, chart_id, version, SPEC_OPTIONS)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        chart, spec = next(iter_chart_specs(name, df, version=version, chart_ids=[chart_id],
+                                            aggregates=view.get('aggregates')))
+        response = jsonify(spec_entry(chart, spec))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+@app.route('/chart/<library>/<chart_id>.<any(png, webp, svg):ext>')
+def chart_image(library, chart_id, ext):
+    # The extension picks the format; format=png8 on a .png URL asks for the palette-quantized variant
+    format = 'png8' if ext == 'png' and request.args.get('format') == 'png8' else ext
+    return serve_chart(library, chart_id, format)
+
+@app.route('/chart/<library>/<chart_id>/image')
+def chart_negotiated(library, chart_id):
+    # Without an explicit format=, serve the best format the client lists in its Accept header
+    format = request.args.get('format') or formats.negotiate_format(request.accept_mimetypes)
+    response = serve_chart(library, chart_id, format)
+    if 'format' not in request.args:
+        response.vary.add('Accept')
+    return response
+
+def serve_chart(library, chart_id, format):
+    name = registry.resolve_library(library)
+    chart = registry.get_chart(name, chart_id) if name else None
+    if chart is None:
+        abort(404)
+    try:
+        options = request_options(format)
+        _, _, df, version, view = request_view()
+    except (LookupError, ValueError) as e:
+        return view_error(e)
+    if df.empty:
+        return error_response('No rows match the selected filters')
+    if not registry.chart_columns(chart) <= set(df.columns):
+        abort(404)
+    etag = chart_etag(name, chart_id, version, options)
+
+    if request.args.get('v') == version[:16]:
+        cache_control = f'public, max-age={CHART_MAX_AGE}, immutable'
+    else:
+        # Unversioned or stale URL: let caches keep it but revalidate against the ETag
+        cache_control = 'public, no-cache'
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        _, image = next(iter_chart_pngs(name, df, version=version, options=options, chart_ids=[chart_id], **view))
+        response = Response(image, mimetype=formats.mimetype(options))
+        if request.args.get('download') == '1':
+            filename = f'{chart.title}.{formats.extension(options)}'
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+@app.route('/append', methods=['POST'])
+def append():
+    # Rows come as a CSV body (with a header line) or as JSON: {"rows": [{column: value, ...}, ...]}
+    if request.mimetype == 'text/csv':
+        try:
+            rows = pd.read_csv(io.BytesIO(request.get_data()))
+        except pd.errors.EmptyDataError:
+            return jsonify({'error': 'No rows to append'}), 400
+        except pd.errors.ParserError as e:
+            return jsonify({'error': f'The CSV body could not be parsed: {e}'}), 400
+    else:
+        payload = request.get_json(silent=True) or {}
+        rows = pd.DataFrame.from_records(payload.get('rows') or [])
+    if rows.empty:
+        return jsonify({'error': 'No rows to append'}), 400
+
+    try:
+        previous, version, batch = append_rows(rows, DATA_PATH)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Fold the batch into the maintained aggregates instead of recomputing them under the new version
+    append_aggregates(previous, version, batch)
+    append_summary(DATA_PATH, previous, version, batch)
+    return jsonify({'previous_version': previous, 'version': version, 'rows': len(batch)})
+
+@app.route('/filters')
+def filters_endpoint():
+    # The columns a view can be filtered on, with their values or [min, max] range
+    dataset = request_dataset()
+    try:
+        df, version, _ = load_view(path=uploads.dataset_path(dataset) if dataset else DATA_PATH)
+    except (LookupError, ValueError) as e:
+        return view_error(e)
+    return jsonify(filter_options(df, version))
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    """Add a CSV with any columns as a new dataset: a multipart "file" field or the raw request body.
+
+    The body is streamed to disk (never held in memory) and converted to the
+    typed columnar layout in the background. Returns 202 with the dataset's
+    status while it converts, or 200 if the same file was uploaded before.
+    Charts of a ready dataset are requested with dataset=<id>.
+    """
+    limit = uploads.UPLOAD_MAX_BYTES + uploads.MULTIPART_OVERHEAD_BYTES
+    if request.content_length is not None and request.content_length > limit:
+        return error_response(f'Uploads are limited to {uploads.UPLOAD_MAX_BYTES} bytes', 413)
+    try:
+        # The body is read straight from the request stream: request.files would spool it to a temporary file first
+        if request.mimetype == 'multipart/form-data':
+            name, chunks = uploads.read_multipart_file(request.stream, request.mimetype_params.get('boundary', ''))
+        else:
+            name, chunks = None, uploads.read_chunks(request.stream)
+        name = request.args.get('name') or name or 'upload.csv'
+        entry = uploads.register(chunks, name)
+    except uploads.UploadTooLarge as e:
+        return error_response(str(e), 413)
+    except ValueError as e:
+        return error_response(str(e))
+    response = jsonify(dict(entry, status_url=url_for('dataset_status', dataset_id=entry['id'])))
+    response.status_code = 200 if entry['status'] == uploads.READY else 202
+    return response
+
+@app.route('/datasets')
+def datasets():
+    return jsonify({'datasets': uploads.list_datasets()})
+
+@app.route('/datasets/<dataset_id>')
+def dataset_status(dataset_id):
+    entry = uploads.status(dataset_id)
+    if entry is None:
+        abort(404)
+    return jsonify(entry)
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(chart_cache.stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
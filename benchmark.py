@@ -0,0 +1,227 @@
+import sys
+import json
+import time
+import uuid
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use('Agg')
+
+from visualizations import registry, formats
+from visualizations.aggregates import compute_aggregates
+from visualizations.figures import figure_pool
+from visualizations.rendering import prepare_frame, draw_chart
+from dataset import load_data
+
+SCALES = {'4k': 4_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+PHASES = ('draw', 'encode')
+# What a dashboard page load renders: the WebP grid thumbnail
+DEFAULT_FORMAT = 'webp'
+DEFAULT_SIZE = 'thumb'
+
+
+def synthetic_dataset(rows, template=None, seed=0):
+    """Shopping-trends-shaped data with rows rows, drawn column by column from the real dataset.
+
+    Every column keeps the template's values and their frequencies; text
+    columns are built as categoricals so even 10M rows fit in memory.
+    """
+    template = load_data() if template is None else template
+    rng = np.random.default_rng(seed)
+    data = {}
+    for name in template.columns:
+        column = template[name]
+        if name == 'Customer ID':
+            data[name] = np.arange(1, rows + 1)
+        elif pd.api.types.is_numeric_dtype(column.dtype):
+            data[name] = rng.choice(column.to_numpy(), size=rows)
+        else:
+            categorical = pd.Categorical(column)
+            codes = rng.choice(categorical.codes, size=rows)
+            data[name] = pd.Categorical.from_codes(codes, categories=categorical.categories)
+    return pd.DataFrame(data)
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _render_phases(chart, frame, aggs, options):
+    with figure_pool.figure(chart.figsize) as fig:
+        _, draw_time = _timed(draw_chart, chart, fig, frame, aggs)
+        image, encode_time = _timed(formats.encode_figure, fig, options)
+    return dict(zip(PHASES, (draw_time, encode_time))), image
+
+
+def _aggregate(library, df, version, charts):
+    """Prepare the library's frame and compute its charts' aggregates as a render does.
+
+    Returns (frame, {name: result}, prepare seconds, aggregate seconds). The
+    aggregates of every chart are computed together for the frame version, so
+    the cube and the per-version memo are built here, once, as on the first
+    page load of a new dataset version.
+    """
+    (frame, frame_version), prepare_time = _timed(prepare_frame, library, df, version)
+    needs = [name for chart in charts for name in chart.needs]
+    aggs, aggregate_time = _timed(compute_aggregates, frame, needs, frame_version) if needs else ({}, 0.0)
+    return frame, aggs, prepare_time, aggregate_time
+
+
+def _peak_memory(chart, frame, aggs, options):
+    # Separate traced pass: tracemalloc slows allocation-heavy code too much to time under it
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        _render_phases(chart, frame, aggs, options)
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_chart(chart, frame, aggs, options=None, repeat=1, memory=True):
+    """Time one chart's phases (best of repeat) and measure its peak traced memory.
+
+    aggs holds the chart's precomputed aggregates; options are the render
+    options the image is encoded with, see visualizations.formats.
+    """
+    aggs = {name: aggs[name] for name in chart.needs}
+    best = None
+    for _ in range(repeat):
+        phases, png = _render_phases(chart, frame, aggs, options)
+        if best is None or sum(phases.values()) < sum(best.values()):
+            best = phases
+    return {
+        'library': chart.library,
+        'chart': chart.id,
+        'phases': best,
+        'total': sum(best.values()),
+        'peak_bytes': _peak_memory(chart, frame, aggs, options) if memory else None,
+        'png_bytes': len(png),
+    }
+
+
+def run(scales, libraries=None, chart_ids=None, repeat=1, memory=True, options=None, log=sys.stderr):
+    """Benchmark the charts of libraries at each scale, rendered with options (default: the grid thumbnail)."""
+    registry.load_libraries()
+    libraries = libraries or list(registry.LIBRARY_MODULES)
+    options = formats.render_options(DEFAULT_FORMAT, size=DEFAULT_SIZE) if options is None else options
+    template = load_data()
+    results = []
+    for scale in scales:
+        rows = SCALES[scale]
+        df = synthetic_dataset(rows, template)
+        # A version of its own per run, so the aggregates are computed rather than found in the memo
+        version = f'benchmark-{scale}-{uuid.uuid4().hex}'
+        for library in libraries:
+            charts = [chart for chart in registry.get_charts(library, df.columns)
+                      if not chart_ids or chart.id in chart_ids]
+            if not charts:
+                continue
+            frame, aggs, prepare_time, aggregate_time = _aggregate(library, df, version, charts)
+            print(f"{scale:>5} {library:<10} {'(prepare + aggregate)':<45} "
+                  f"{(prepare_time + aggregate_time) * 1000:9.1f} ms", file=log)
+            for chart in charts:
+                result = benchmark_chart(chart, frame, aggs, options, repeat, memory)
+                result.update(scale=scale, rows=rows, prepare=prepare_time, aggregate=aggregate_time)
+                results.append(result)
+                peak = f"{result['peak_bytes'] / 2 ** 20:8.1f} MB" if memory else ''
+                print(f"{scale:>5} {library:<10} {chart.id:<45} {result['total'] * 1000:9.1f} ms {peak}", file=log)
+        del df
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'versions': {module.__name__: module.__version__ for module in (np, pd, matplotlib)},
+        'options': options,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.25, min_delta=0.005):
+    """Return the (key, before, after) charts whose total time grew by more than threshold.
+
+    Each library's shared prepare and aggregate step is compared as well, as
+    the chart id 'aggregate'. Differences under min_delta seconds are ignored
+    as timer noise.
+    """
+    def by_key(report):
+        times = {}
+        for r in report['results']:
+            times[(r['scale'], r['library'], r['chart'])] = r['total']
+            if 'aggregate' in r:
+                times[(r['scale'], r['library'], 'aggregate')] = r['prepare'] + r['aggregate']
+        return times
+
+    before, after = by_key(baseline), by_key(current)
+    regressions = []
+    for key in sorted(before.keys() & after.keys()):
+        if after[key] - before[key] > min_delta and after[key] > before[key] * (1 + threshold):
+            regressions.append((key, before[key], after[key]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-chart rendering benchmarks on synthetic data')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='benchmark every chart and write the results as JSON')
+    run_parser.add_argument('--scales', default=','.join(SCALES),
+                            help=f"comma-separated dataset sizes out of {', '.join(SCALES)} (default: all)")
+    run_parser.add_argument('--libraries', help='comma-separated libraries (default: all)')
+    run_parser.add_argument('--charts', help='comma-separated chart ids (default: all)')
+    run_parser.add_argument('--repeat', type=int, default=1, help='timed runs per chart; the fastest is kept')
+    run_parser.add_argument('--no-memory', action='store_true', help='skip the traced peak-memory pass')
+    run_parser.add_argument('--format', default=DEFAULT_FORMAT, choices=list(formats.FORMATS),
+                            help=f'image format to encode (default: {DEFAULT_FORMAT})')
+    run_parser.add_argument('--size', default=DEFAULT_SIZE, choices=[*formats.SIZES, 'full'],
+                            help=f'image size to encode (default: {DEFAULT_SIZE}, the grid thumbnail)')
+    run_parser.add_argument('--out', default='-', help='output file (default: stdout)')
+
+    compare_parser = commands.add_parser('compare', help='fail when a chart got slower than in a baseline run')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='allowed relative slowdown (default: 0.25)')
+    compare_parser.add_argument('--min-delta', type=float, default=0.005,
+                                help='ignore slowdowns smaller than this many seconds (default: 0.005)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        scales = args.scales.split(',')
+        unknown = [scale for scale in scales if scale not in SCALES]
+        if unknown:
+            parser.error(f'unknown scale(s): {", ".join(unknown)}')
+        options = formats.render_options(args.format, size=None if args.size == 'full' else args.size)
+        report = run(scales, libraries=args.libraries.split(',') if args.libraries else None,
+                     chart_ids=set(args.charts.split(',')) if args.charts else None, repeat=args.repeat,
+                     memory=not args.no_memory, options=options)
+        output = json.dumps(report, indent=2)
+        if args.out == '-':
+            print(output)
+        else:
+            with open(args.out, 'w') as f:
+                f.write(output)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold, args.min_delta)
+    for (scale, library, chart_id), before, after in regressions:
+        print(f'REGRESSION {scale} {library}/{chart_id}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms '
+              f'({after / before - 1:+.0%})')
+    if regressions:
+        return 1
+    print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,586 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from schema import apply_schema, coerce_rows, csv_dtypes, read_typed_csv, memory_report, CONVERTERS, FLAG_CATEGORIES
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'shopping_trends.csv')
+
+KAGGLE_DATASET = 'bhadramohit/customer-shopping-latest-trends-dataset'
+KAGGLE_FILE = 'customer_shopping_trends.csv'
+
+# Columnar layout: a directory holding meta.json plus one raw little-endian array
+# file per column, which is memory-mapped on load. Text columns are stored as
+# dictionary-encoded categoricals (integer codes + the category list in meta.json).
+# Format 2 stores the compact column types of the schema (see schema.py); format 1
+# copies, written before it, are ignored until the dataset is converted again.
+COLUMNAR_FORMAT = 2
+COLUMNAR_SUFFIX = '.columns'
+META_FILE = 'meta.json'
+
+# Shared copy for multi-process servers: a parent process publishes the dataset here
+# (ideally on tmpfs such as /dev/shm) and every worker memory-maps the same pages
+SHARED_DATASET_DIR = os.environ.get('SHARED_DATASET_DIR') or None
+SHARED_CURRENT = 'current'
+
+# Sources larger than this are summarized chunk by chunk instead of loaded whole
+OUT_OF_CORE_BYTES = int(os.environ.get('OUT_OF_CORE_BYTES', 1 << 30))
+CHUNK_ROWS = int(os.environ.get('CHUNK_ROWS', 250_000))
+# Distinct values a text column may have when written chunk by chunk; columns with more
+# (identifiers, free text) are left out rather than holding every value in memory
+MAX_CATEGORIES = int(os.environ.get('MAX_CATEGORIES', 10_000))
+
+# One parsed DataFrame per source, kept for the life of the worker process.
+# Each entry holds the file signature, the dataset version and the frame.
+_cache = {}
+_lock = threading.Lock()
+
+# Content digests of sources that are never loaded whole: path -> {signature, version, hasher}
+_versions = {}
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _file_hasher(path, chunk_size=1 << 20):
+    # The sha256 state is kept so appended bytes can be hashed on their own
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher
+
+
+def _file_digest(path):
+    return _file_hasher(path).hexdigest()
+
+
+def _load_from_kaggle():
+    import kagglehub
+    from kagglehub import KaggleDatasetAdapter
+    return apply_schema(kagglehub.load_dataset(KaggleDatasetAdapter.PANDAS, KAGGLE_DATASET, KAGGLE_FILE))
+
+
+def columnar_path(path):
+    # data/shopping_trends.csv -> data/shopping_trends.columns
+    return os.path.splitext(path)[0] + COLUMNAR_SUFFIX
+
+
+def _read_meta(columnar_dir):
+    try:
+        with open(os.path.join(columnar_dir, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('format') == COLUMNAR_FORMAT else None
+
+
+def _code_dtype(n_categories):
+    # Codes are signed so -1 can mark missing values
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def write_columnar(df, columnar_dir, version, source_signature=None):
+    """Write df to columnar_dir in the memory-mappable columnar layout."""
+    tmp_dir = f'{columnar_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        file_name = f'c{i:03d}.bin'
+        if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            values = series.to_numpy()
+            column = {'name': name, 'kind': 'numeric'}
+        else:
+            categorical = pd.Categorical(series)
+            values = categorical.codes.astype(_code_dtype(len(categorical.categories)))
+            column = {'name': name, 'kind': 'categorical', 'categories': categorical.categories.tolist()}
+        values = np.ascontiguousarray(values)
+        values.astype(values.dtype.newbyteorder('<'), copy=False).tofile(os.path.join(tmp_dir, file_name))
+        column.update({'file': file_name, 'dtype': values.dtype.newbyteorder('<').str})
+        columns.append(column)
+
+    meta = {
+        'format': COLUMNAR_FORMAT,
+        'rows': len(df),
+        'version': version,
+        'source_signature': list(source_signature) if source_signature else None,
+        'columns': columns,
+    }
+    _publish_columnar(tmp_dir, columnar_dir, meta)
+    return meta
+
+
+def _publish_columnar(tmp_dir, columnar_dir, meta):
+    with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Swap the new directory in; readers holding the old mapping keep their pages
+    old_dir = f'{columnar_dir}.{os.getpid()}.old'
+    if os.path.exists(columnar_dir):
+        os.replace(columnar_dir, old_dir)
+    os.replace(tmp_dir, columnar_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _narrowest_int(low, high):
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+class ColumnarWriter:
+    """Write a dataset in the columnar layout chunk by chunk, for sources too large to hold in memory.
+
+    Each written chunk is converted by its column kinds (see schema.py) and
+    appended to wide scratch files: float64 for numbers, int32 codes into
+    a growing category list for text. close() then narrows every column in
+    blocks of CHUNK_ROWS, as read_typed_csv would type it, so memory stays
+    bounded by one chunk plus at most MAX_CATEGORIES distinct values per text
+    column. A text column with more values is skipped: it is left out of the
+    dataset and listed under 'skipped_columns' in the meta, whose 'schema'
+    holds the kinds of the columns kept.
+    """
+
+    def __init__(self, columnar_dir, schema):
+        self.columnar_dir = columnar_dir
+        self.schema = schema
+        self.rows = 0
+        self._tmp_dir = f'{columnar_dir}.{os.getpid()}.tmp'
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        os.makedirs(self._tmp_dir)
+        self._columns = None
+
+    @property
+    def columns(self):
+        """Names of the columns written so far and not skipped."""
+        return [column['name'] for column in self._columns or [] if not column['skipped']]
+
+    def _scratch(self, i):
+        return os.path.join(self._tmp_dir, f'c{i:03d}.wide')
+
+    def write(self, chunk):
+        if self._columns is None:
+            self._columns = [{'name': name, 'kind': self.schema.get(name, 'category'), 'categories': {},
+                              'missing': False, 'integral': True, 'low': np.inf, 'high': -np.inf,
+                              'skipped': False}
+                             for name in chunk.columns]
+        for i, column in enumerate(self._columns):
+            if column['skipped']:
+                continue
+            series = chunk[column['name']]
+            if column['kind'] in ('int', 'float'):
+                values = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+                present = values[~np.isnan(values)]
+                column['missing'] |= len(present) < len(values)
+                if len(present):
+                    column['integral'] &= bool((present == np.floor(present)).all())
+                    column['low'] = min(column['low'], present.min())
+                    column['high'] = max(column['high'], present.max())
+            else:
+                categorical = CONVERTERS[column['kind']](series)
+                # Codes into the column's categories in order of first appearance; sorted on close
+                categories = column['categories']
+                lookup = np.array([categories.setdefault(value, len(categories))
+                                   for value in categorical.cat.categories] + [-1], dtype=np.int32)
+                values = lookup[categorical.cat.codes.to_numpy()]
+                if len(categories) > MAX_CATEGORIES:
+                    column.update(skipped=True, categories={})
+                    if os.path.exists(self._scratch(i)):
+                        os.remove(self._scratch(i))
+                    continue
+            with open(self._scratch(i), 'ab') as f:
+                values.astype(values.dtype.newbyteorder('<'), copy=False).tofile(f)
+        self.rows += len(chunk)
+
+    def _final_column(self, column):
+        # (meta entry, dtype, block converter) for one column
+        if column['kind'] in ('int', 'float'):
+            narrow = column['kind'] == 'int' and not column['missing'] and column['integral']
+            dtype = _narrowest_int(column['low'], column['high']) if narrow and self.rows else np.dtype(np.float32)
+            return {'name': column['name'], 'kind': 'numeric'}, np.dtype('<f8'), dtype, lambda values: values
+        names = list(column['categories'])
+        categories = FLAG_CATEGORIES if column['kind'] == 'flag' else sorted(names)
+        positions = {value: i for i, value in enumerate(categories)}
+        remap = np.array([positions[value] for value in names] + [-1], dtype=np.int32)
+        entry = {'name': column['name'], 'kind': 'categorical', 'categories': categories}
+        return entry, np.dtype('<i4'), _code_dtype(len(categories)), lambda codes: remap[codes]
+
+    def close(self, version, **extra):
+        """Finish the dataset as version (extra goes into meta.json) and swap it into place; returns the meta."""
+        columns = []
+        for i, column in enumerate(self._columns or []):
+            if column['skipped']:
+                continue
+            entry, wide_dtype, dtype, convert = self._final_column(column)
+            wide = np.memmap(self._scratch(i), dtype=wide_dtype, mode='r', shape=(self.rows,)) if self.rows else []
+            file_name = f'c{i:03d}.bin'
+            with open(os.path.join(self._tmp_dir, file_name), 'wb') as f:
+                for start in range(0, self.rows, CHUNK_ROWS):
+                    convert(wide[start:start + CHUNK_ROWS]).astype(dtype.newbyteorder('<')).tofile(f)
+            del wide
+            os.remove(self._scratch(i))
+            entry.update({'file': file_name, 'dtype': dtype.newbyteorder('<').str})
+            columns.append(entry)
+
+        kept = [column for column in self._columns or [] if not column['skipped']]
+        meta = {'format': COLUMNAR_FORMAT, 'rows': self.rows, 'version': version, 'source_signature': None,
+                'columns': columns, 'schema': {column['name']: column['kind'] for column in kept},
+                'skipped_columns': [column['name'] for column in self._columns or [] if column['skipped']],
+                **extra}
+        _publish_columnar(self._tmp_dir, self.columnar_dir, meta)
+        return meta
+
+    def abort(self):
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+
+def read_columnar(columnar_dir, meta=None):
+    """Build a DataFrame over memory-mapped column files; pages are read lazily."""
+    meta = meta or _read_meta(columnar_dir)
+    data = {}
+    for column in meta['columns']:
+        dtype = np.dtype(column['dtype'])
+        file_path = os.path.join(columnar_dir, column['file'])
+        if meta['rows'] and dtype.itemsize:
+            values = np.memmap(file_path, dtype=dtype, mode='r', shape=(meta['rows'],))
+        else:
+            values = np.empty(0, dtype=dtype)
+        if column['kind'] == 'categorical':
+            values = pd.Categorical.from_codes(values, categories=column['categories'])
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def convert_to_columnar(path=DATA_PATH, columnar_dir=None):
+    """One-time conversion of a CSV dataset into the columnar layout next to it."""
+    columnar_dir = columnar_dir or columnar_path(path)
+    signature = _file_signature(path)
+    version = _file_digest(path)
+    df = read_typed_csv(path)
+    return write_columnar(df, columnar_dir, version, source_signature=signature)
+
+
+def shared_path(path, shared_dir=None):
+    # <shared dir>/shopping_trends: one published copy per source file name
+    shared_dir = shared_dir or SHARED_DATASET_DIR
+    if not shared_dir:
+        return None
+    return os.path.join(shared_dir, os.path.splitext(os.path.basename(path))[0])
+
+
+def _columnar_candidates(path):
+    # The shared copy wins over the one next to the CSV, so workers map the same pages
+    shared = shared_path(path)
+    if shared is not None:
+        yield os.path.join(shared, SHARED_CURRENT)
+    yield columnar_path(path)
+
+
+def _matching_columnar(path, signature):
+    # (directory, meta) of a columnar copy converted from the current CSV contents, if any
+    for columnar_dir in _columnar_candidates(path):
+        meta = _read_meta(columnar_dir)
+        if meta is not None and meta.get('source_signature') == list(signature):
+            return columnar_dir, meta
+    return None, None
+
+
+def _load_columnar_source(path, signature, entry):
+    # Prefer a columnar copy when it was converted from the current CSV contents
+    columnar_dir, meta = _matching_columnar(path, signature)
+    if meta is None:
+        return None
+    # realpath follows the shared 'current' link, so a swap shows up as a new signature
+    meta_path = os.path.realpath(os.path.join(columnar_dir, META_FILE))
+    columnar_signature = ('columnar', meta_path) + signature + _file_signature(meta_path)
+    if entry is not None and entry['signature'] == columnar_signature:
+        return entry
+    return {'signature': columnar_signature, 'version': meta['version'], 'df': read_columnar(columnar_dir, meta)}
+
+
+def publish_shared(path=DATA_PATH, shared_dir=None):
+    """Publish the dataset at path as a columnar copy under shared_dir for workers to map.
+
+    Each version gets its own directory and the 'current' link is swapped to
+    it atomically. Workers pick the new copy up on their next load_dataset;
+    the ones still mapping an older copy keep valid pages until they re-map,
+    because unlinked files stay readable while mapped. Returns the meta of
+    the published copy.
+    """
+    shared = shared_path(path, shared_dir)
+    if shared is None:
+        raise ValueError('No shared dataset directory configured (set SHARED_DATASET_DIR)')
+    os.makedirs(shared, exist_ok=True)
+
+    signature = _file_signature(path)
+    current = os.path.join(shared, SHARED_CURRENT)
+    meta = _read_meta(current)
+    if meta is not None and meta.get('source_signature') == list(signature):
+        return meta
+
+    df, version = load_dataset(path)
+    # Named by content and mtime, so republishing never rewrites the directory 'current' points at
+    target = f'{version[:16]}-{signature[0]}'
+    meta = write_columnar(df, os.path.join(shared, target), version, source_signature=signature)
+
+    link = os.path.join(shared, f'{SHARED_CURRENT}.{os.getpid()}.tmp')
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(target, link)
+    os.replace(link, current)
+
+    for name in os.listdir(shared):
+        if name not in (target, SHARED_CURRENT) and not name.endswith('.tmp'):
+            shutil.rmtree(os.path.join(shared, name), ignore_errors=True)
+    return meta
+
+
+def load_dataset(path=DATA_PATH):
+    """Return (df, version) for the dataset at path, parsing it only when the file changed.
+
+    The version is a fingerprint of the file contents, so other layers can key
+    derived results (charts, aggregates) on it. A columnar copy converted from
+    the same CSV is memory-mapped instead of parsing the CSV; path may also
+    name a columnar directory directly.
+    """
+    with _lock:
+        return _load_locked(path)
+
+
+def _load_locked(path):
+    entry = _cache.get(path)
+
+    if os.path.isdir(path):
+        meta = _read_meta(path)
+        if meta is None:
+            raise ValueError(f'{path} is not a columnar dataset')
+        signature = ('columnar',) + _file_signature(os.path.join(path, META_FILE))
+        if entry is None or entry['signature'] != signature:
+            entry = {'signature': signature, 'version': meta['version'], 'df': read_columnar(path, meta)}
+            _cache[path] = entry
+        return entry['df'], entry['version']
+
+    try:
+        signature = _file_signature(path)
+    except OSError:
+        # No local copy: fall back to the Kaggle download, fetched once per process
+        if entry is None:
+            df = _load_from_kaggle()
+            entry = {'signature': None, 'version': 'kaggle:' + KAGGLE_DATASET, 'df': df}
+            _cache[path] = entry
+        return entry['df'], entry['version']
+
+    columnar_entry = _load_columnar_source(path, signature, entry)
+    if columnar_entry is not None:
+        _cache[path] = columnar_entry
+        return columnar_entry['df'], columnar_entry['version']
+
+    if entry is not None and entry['signature'] == signature:
+        return entry['df'], entry['version']
+
+    # mtime/size changed: only re-parse if the contents actually differ
+    hasher = _file_hasher(path)
+    digest = hasher.hexdigest()
+    if entry is not None and entry['version'] == digest:
+        entry.update(signature=signature, hasher=hasher)
+        return entry['df'], entry['version']
+
+    df = read_typed_csv(path)
+    _cache[path] = {'signature': signature, 'version': digest, 'hasher': hasher, 'df': df}
+    return df, digest
+
+
+def _valid_columnar_dir(path):
+    # The columnar directory to read path from, if there is an up-to-date one
+    if os.path.isdir(path):
+        return path
+    columnar_dir, _ = _matching_columnar(path, _file_signature(path))
+    return columnar_dir
+
+
+def source_bytes(path=DATA_PATH):
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path)
+
+
+def is_out_of_core(path=DATA_PATH):
+    """True when the source at path is too large to load into one DataFrame."""
+    try:
+        return source_bytes(path) > OUT_OF_CORE_BYTES
+    except OSError:
+        return False
+
+
+def source_version(path=DATA_PATH):
+    """Return the version load_dataset would report for path, without parsing the data."""
+    columnar_dir = _valid_columnar_dir(path)
+    if columnar_dir is not None:
+        return _read_meta(columnar_dir)['version']
+
+    signature = _file_signature(path)
+    with _lock:
+        known = _versions.get(path)
+    if known is not None and known['signature'] == signature:
+        return known['version']
+    hasher = _file_hasher(path)
+    with _lock:
+        _versions[path] = {'signature': signature, 'version': hasher.hexdigest(), 'hasher': hasher}
+    return hasher.hexdigest()
+
+
+def iter_chunks(path=DATA_PATH, chunk_rows=CHUNK_ROWS):
+    """Yield the dataset at path as DataFrames of at most chunk_rows rows.
+
+    Only one chunk is materialized at a time: CSV sources are parsed
+    incrementally and columnar sources are sliced from the memory map.
+    """
+    columnar_dir = _valid_columnar_dir(path)
+    if columnar_dir is not None:
+        df = read_columnar(columnar_dir)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+    with pd.read_csv(path, chunksize=chunk_rows, dtype=csv_dtypes()) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk)
+
+
+def _known_hasher(path, signature):
+    # sha256 state over the file as it is now, from whichever cache saw it last
+    for known in (_cache.get(path), _versions.get(path)):
+        if known is not None and known['signature'] == signature and known.get('hasher') is not None:
+            return known['hasher']
+    return _file_hasher(path)
+
+
+def _concat_rows(df, batch):
+    combined = pd.concat([df, batch], ignore_index=True)
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            # Keep dictionary-encoded columns encoded, with sorted categories as on conversion
+            categories = df[name].cat.categories.union(pd.Index(batch[name].dropna().unique()))
+            combined[name] = pd.Categorical(combined[name], categories=categories)
+    return combined
+
+
+def append_rows(rows, path=DATA_PATH):
+    """Append the rows DataFrame to the CSV at path.
+
+    Returns (previous version, new version, batch), where batch is the rows as
+    a fresh CSV load would type them. Only the appended bytes are hashed, and
+    an in-memory copy of the dataset is extended rather than re-parsed. The
+    rows are coerced to the schema first and written in their cleaned form;
+    raises ValueError, writing nothing, if any value does not fit.
+    """
+    with _lock:
+        signature = _file_signature(path)
+        columns = pd.read_csv(path, nrows=0).columns
+        missing = [name for name in columns if name not in rows.columns]
+        unexpected = [name for name in rows.columns if name not in columns]
+        if missing or unexpected:
+            raise ValueError(f'Rows do not match the dataset columns (missing: {missing}, unexpected: {unexpected})')
+
+        rows = coerce_rows(rows[list(columns)])
+        hasher = _known_hasher(path, signature).copy()
+        previous = hasher.hexdigest()
+        data = rows.to_csv(index=False, header=False, lineterminator='\n').encode('utf-8')
+        with open(path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            f.write(data)
+        hasher.update(data)
+        version = hasher.hexdigest()
+        signature = _file_signature(path)
+
+        # Parse the batch back from its CSV form so its dtypes match a full load
+        batch = read_typed_csv(io.BytesIO(data), header=None, names=list(columns))
+        _versions[path] = {'signature': signature, 'version': version, 'hasher': hasher}
+        entry = _cache.get(path)
+        if entry is not None and entry['version'] == previous:
+            _cache[path] = {'signature': signature, 'version': version, 'hasher': hasher,
+                            'df': _concat_rows(entry['df'], batch)}
+        return previous, version, batch
+
+
+def load_data(path=DATA_PATH):
+    df, _ = load_dataset(path)
+    return df
+
+
+def dataset_version(path=DATA_PATH):
+    _, version = load_dataset(path)
+    return version
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _versions.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Dataset maintenance commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+    convert = commands.add_parser('convert', help='convert a CSV dataset to the memory-mapped columnar format')
+    convert.add_argument('csv', nargs='?', default=DATA_PATH)
+    convert.add_argument('--out', help='output directory (default: next to the CSV, with a .columns suffix)')
+    share = commands.add_parser('share', help='publish the dataset to SHARED_DATASET_DIR for server workers to map')
+    share.add_argument('csv', nargs='?', default=DATA_PATH)
+    share.add_argument('--dir', help='shared directory (default: $SHARED_DATASET_DIR)')
+    share.add_argument('--watch', type=float, metavar='SECONDS',
+                       help='keep running and republish whenever the CSV changes, checking this often')
+    memory = commands.add_parser('memory', help='report the memory each column of the loaded dataset takes')
+    memory.add_argument('csv', nargs='?', default=DATA_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'memory':
+        df, version = load_dataset(args.csv)
+        report = memory_report(df)
+        print(report.to_string(formatters={'bytes_per_row': '{:.2f}'.format}))
+        print(f"Total: {report.attrs['total_bytes'] / 2 ** 20:.2f} MB for {len(df)} rows (version {version[:16]})")
+        if os.path.isfile(args.csv):
+            # For comparison: the same file parsed without the schema, as object strings and 64-bit numbers
+            untyped = memory_report(pd.read_csv(args.csv)).attrs['total_bytes']
+            print(f"Untyped: {untyped / 2 ** 20:.2f} MB ({untyped / max(report.attrs['total_bytes'], 1):.1f}x)")
+    elif args.command == 'convert':
+        out = args.out or columnar_path(args.csv)
+        meta = convert_to_columnar(args.csv, out)
+        print(f"Wrote {meta['rows']} rows x {len(meta['columns'])} columns to {out}")
+    elif args.command == 'share':
+        if not (args.dir or SHARED_DATASET_DIR):
+            parser.error('set SHARED_DATASET_DIR or pass --dir')
+        published = None
+        while True:
+            meta = publish_shared(args.csv, args.dir)
+            if meta['version'] != published:
+                published = meta['version']
+                print(f"Published {meta['rows']} rows as version {published[:16]} to {shared_path(args.csv, args.dir)}",
+                      flush=True)
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
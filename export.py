@@ -0,0 +1,239 @@
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use('Agg')
+
+import seaborn
+from visualizations import registry, formats
+from visualizations.metrics import start_trace, finish_trace
+from dataset import load_dataset, is_out_of_core, DATA_PATH
+
+# Static export: every chart of every library rendered into a directory of
+# image files plus manifest.json, for serving the unfiltered dashboard from a
+# static file server or CDN. A chart is only re-rendered when its fingerprint
+# changes: the dataset version, the render options, the installed plotting
+# libraries, or the code of its library module and of the shared rendering modules.
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# The two images the dashboard shows per chart: the grid thumbnail and the full-size chart
+VARIANTS = {
+    'full': formats.render_options(),
+    'thumb': formats.render_options('webp', size='thumb'),
+}
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(ROOT_DIR, 'visualizations')
+# Modules outside the package that decide what the charts are drawn from: column types and cleaning
+DATA_MODULES = [os.path.join(ROOT_DIR, name) for name in ('schema.py', 'dataset.py')]
+
+
+def _digest(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def _file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def code_digests():
+    """{library: digest of the code its charts are drawn by}.
+
+    Each library's digest covers its own module, every shared module in the
+    visualizations package and the data modules that type and clean the
+    dataset, so editing one library only invalidates its charts.
+    """
+    library_files = {library: os.path.join(PACKAGE_DIR, module.rsplit('.', 1)[1] + '.py')
+                     for library, module in registry.LIBRARY_MODULES.items()}
+    shared = sorted(os.path.join(PACKAGE_DIR, name) for name in os.listdir(PACKAGE_DIR)
+                    if name.endswith('.py') and os.path.join(PACKAGE_DIR, name) not in library_files.values())
+    shared_digest = _digest(*(part for path in shared + DATA_MODULES
+                              for part in (os.path.relpath(path, ROOT_DIR), _file_bytes(path))))
+    versions = [module.__version__ for module in (np, pd, matplotlib, seaborn)]
+    return {library: _digest(shared_digest, _file_bytes(path), *versions) for library, path in library_files.items()}
+
+
+def chart_fingerprint(chart, version, code_digest, variants=VARIANTS):
+    options = json.dumps(variants, sort_keys=True)
+    return _digest(chart.library, chart.id, version, code_digest, options)[:32]
+
+
+def variant_path(chart, variant, options):
+    # full images keep the plain chart id; other variants add their name before the extension
+    suffix = '' if variant == 'full' else f'.{variant}'
+    return f'{chart.library}/{chart.id}{suffix}.{formats.extension(options)}'
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('manifest_version') == MANIFEST_VERSION else None
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.tmp-{os.getpid()}'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def _is_current(entry, fingerprint, out_dir):
+    # An earlier export of the chart is reused only if its inputs match and its files are still there
+    if entry is None or entry.get('fingerprint') != fingerprint:
+        return False
+    for file in entry['files'].values():
+        path = os.path.join(out_dir, file['path'])
+        if not os.path.exists(path) or os.path.getsize(path) != file['bytes']:
+            return False
+    return True
+
+
+def _generate(library, charts, df, version, view, options):
+    """Render charts of library through its generate_*_visualizations function.
+
+    Returns ({chart id: image bytes}, {chart id: {'draw': s, 'encode': s}}),
+    the timings read back from the spans the render recorded.
+    """
+    module = importlib.import_module(registry.LIBRARY_MODULES[library])
+    generate = getattr(module, f'generate_{library}_visualizations')
+    trace = start_trace(library=library)
+    try:
+        result = generate(df, version, view['source'], options=options, chart_ids={chart.id for chart in charts},
+                          aggregates=view.get('aggregates'))
+    finally:
+        finish_trace(trace)
+
+    images = {entry['id']: base64.b64decode(entry['image'].split(',', 1)[1]) for entry in result['visualizations']}
+    timings = {}
+    for recorded in trace['spans']:
+        if recorded['phase'] in ('render', 'encode') and 'chart' in recorded:
+            phase = 'draw' if recorded['phase'] == 'render' else 'encode'
+            timings.setdefault(recorded['chart'], {})[phase] = recorded['ms'] / 1000
+    return images, timings
+
+
+def _load(path):
+    # (df, version, render kwargs) like the app's unfiltered view, including out-of-core datasets
+    if is_out_of_core(path):
+        from visualizations.streaming import summarize_dataset
+        sample, version, aggs = summarize_dataset(path)
+        return sample, version, {'source': sample, 'aggregates': aggs}
+    df, version = load_dataset(path)
+    return df, version, {'source': path}
+
+
+def export(out_dir, path=DATA_PATH, libraries=None, variants=VARIANTS, force=False, log=sys.stderr):
+    """Render the stale charts of libraries (default: all) into out_dir and rewrite its manifest.
+
+    Charts of libraries not exported this time keep their previous manifest
+    entries. Returns the manifest.
+    """
+    registry.load_libraries()
+    libraries = libraries or list(registry.LIBRARY_MODULES)
+    df, version, view = _load(path)
+    digests = code_digests()
+    previous = {(entry['library'], entry['id']): entry for entry in (load_manifest(out_dir) or {}).get('charts', [])}
+
+    entries, stale = {}, {}
+    for library in registry.LIBRARY_MODULES:
+        if library not in libraries:
+            entries.update({key: dict(entry, rendered=False) for key, entry in previous.items() if key[0] == library})
+            continue
+        for chart in registry.get_charts(library):
+            fingerprint = chart_fingerprint(chart, version, digests[library], variants)
+            entry = previous.get((library, chart.id))
+            if not force and _is_current(entry, fingerprint, out_dir):
+                entries[library, chart.id] = dict(entry, rendered=False)
+            else:
+                entries[library, chart.id] = {'library': library, 'id': chart.id, 'title': chart.title,
+                                              'fingerprint': fingerprint, 'files': {}, 'rendered': True}
+                stale.setdefault(library, []).append(chart)
+
+    start = time.perf_counter()
+    # Libraries and variants render side by side; each one fans its charts out to the shared render pool
+    with ThreadPoolExecutor(max_workers=max(1, len(stale) * len(variants))) as executor:
+        jobs = {(library, variant): executor.submit(_generate, library, charts, df, version, view, options)
+                for library, charts in stale.items() for variant, options in variants.items()}
+        for (library, variant), job in jobs.items():
+            images, timings = job.result()
+            for chart in stale[library]:
+                image = images[chart.id]
+                relative = variant_path(chart, variant, variants[variant])
+                _write_atomic(os.path.join(out_dir, relative), image)
+                entries[library, chart.id]['files'][variant] = {
+                    'path': relative,
+                    'mimetype': formats.mimetype(variants[variant]),
+                    'bytes': len(image),
+                    'timings': timings.get(chart.id, {}),
+                }
+            print(f'{library:<10} {variant:<6} {len(stale[library]):3d} charts rendered', file=log)
+
+    # Files of charts that are gone from the registry (or of a renamed variant) are removed
+    kept = {file['path'] for entry in entries.values() for file in entry['files'].values()}
+    for entry in previous.values():
+        for file in entry['files'].values():
+            if file['path'] not in kept and os.path.exists(os.path.join(out_dir, file['path'])):
+                os.remove(os.path.join(out_dir, file['path']))
+
+    rendered = sum(entry['rendered'] for entry in entries.values())
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'dataset': {'path': os.path.basename(path), 'version': version, 'rows': len(df)},
+        'variants': variants,
+        'rendered': rendered,
+        'skipped': len(entries) - rendered,
+        'seconds': round(time.perf_counter() - start, 3),
+        'charts': list(entries.values()),
+    }
+    _write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render every chart to static image files with a JSON manifest')
+    parser.add_argument('out', nargs='?', default='export', help='output directory (default: export)')
+    parser.add_argument('--data', default=DATA_PATH, help='dataset CSV (default: the dashboard dataset)')
+    parser.add_argument('--libraries', help=f"comma-separated libraries (default: {', '.join(registry.LIBRARY_MODULES)})")
+    parser.add_argument('--format', default=formats.DEFAULT_FORMAT, choices=list(formats.FORMATS),
+                        help='format of the full-size images (default: png)')
+    parser.add_argument('--no-thumbnails', action='store_true', help='skip the WebP grid thumbnails')
+    parser.add_argument('--force', action='store_true', help='re-render every chart, even unchanged ones')
+    args = parser.parse_args(argv)
+
+    libraries = args.libraries.split(',') if args.libraries else None
+    unknown = [library for library in libraries or () if library not in registry.LIBRARY_MODULES]
+    if unknown:
+        parser.error(f'unknown library(s): {", ".join(unknown)}')
+    variants = {'full': formats.render_options(args.format)}
+    if not args.no_thumbnails:
+        variants['thumb'] = VARIANTS['thumb']
+
+    manifest = export(args.out, args.data, libraries, variants, args.force)
+    print(f"Exported {manifest['rendered']} charts ({manifest['skipped']} unchanged) for dataset version "
+          f"{manifest['dataset']['version'][:16]} to {args.out} in {manifest['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+# Column types of the shopping-trends dataset, applied once when the data is
+# loaded so no request has to clean or convert it again:
+# - category: trimmed text stored as a categorical with sorted categories (1-2 byte codes)
+# - flag: Yes/No answers, normalized to exactly 'Yes' and 'No' and stored as a two-value categorical
+# - int: the narrowest signed integer type that holds the values, or float32 if any are missing
+#   or fractional
+# - float: float32
+# Values that do not parse (non-numeric numbers, unknown flag answers, blank
+# text) become missing. Columns outside the schema are left as parsed.
+SCHEMA = {
+    'Customer ID': 'int',
+    'Age': 'int',
+    'Gender': 'category',
+    'Item Purchased': 'category',
+    'Category': 'category',
+    'Purchase Amount (USD)': 'int',
+    'Location': 'category',
+    'Size': 'category',
+    'Color': 'category',
+    'Season': 'category',
+    'Review Rating': 'float',
+    'Subscription Status': 'flag',
+    'Payment Method': 'category',
+    'Shipping Type': 'category',
+    'Discount Applied': 'flag',
+    'Promo Code Used': 'flag',
+    'Previous Purchases': 'int',
+    'Preferred Payment Method': 'category',
+    'Frequency of Purchases': 'category',
+}
+
+FLAG_VALUES = {'yes': 'Yes', 'y': 'Yes', 'true': 'Yes', '1': 'Yes',
+               'no': 'No', 'n': 'No', 'false': 'No', '0': 'No'}
+FLAG_CATEGORIES = ['No', 'Yes']
+
+
+def csv_dtypes(schema=SCHEMA):
+    """read_csv dtypes for the schema: text is parsed straight into categoricals, never object strings.
+
+    Columns the file does not have are ignored by read_csv.
+    """
+    return {name: 'category' for name, kind in schema.items() if kind in ('category', 'flag')}
+
+
+def _recode(series, clean, categories=None):
+    # Clean each distinct value once (not every row): clean maps a category to its cleaned value or None
+    # for missing, and the row codes are translated through a lookup table
+    categorical = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    cleaned = [clean(value) for value in categorical.cat.categories]
+    if categories is None:
+        categories = sorted({value for value in cleaned if value is not None})
+    positions = {value: i for i, value in enumerate(categories)}
+    # Missing rows have code -1, which picks the trailing -1 of the lookup
+    lookup = np.array([positions.get(value, -1) for value in cleaned] + [-1], dtype=np.int32)
+    codes = lookup[categorical.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=series.index, name=series.name)
+
+
+def _clean_text(value):
+    text = str(value).strip()
+    return text or None
+
+
+def _clean_flag(value):
+    return FLAG_VALUES.get(str(value).strip().lower())
+
+
+def _as_category(series):
+    return _recode(series, _clean_text)
+
+
+def _as_flag(series):
+    return _recode(series, _clean_flag, FLAG_CATEGORIES)
+
+
+def _as_int(series):
+    values = pd.to_numeric(series, errors='coerce')
+    if values.isna().any() or not (values == np.floor(values)).all():
+        return values.astype(np.float32)
+    return pd.to_numeric(values.astype(np.int64), downcast='integer')
+
+
+def _as_float(series):
+    return pd.to_numeric(series, errors='coerce').astype(np.float32)
+
+
+CONVERTERS = {'category': _as_category, 'flag': _as_flag, 'int': _as_int, 'float': _as_float}
+
+
+def apply_schema(df, schema=SCHEMA):
+    """Return df with every schema column converted to its compact, cleaned type."""
+    converted = {name: CONVERTERS[schema[name]](df[name]) for name in df.columns if name in schema}
+    return df.assign(**converted) if converted else df
+
+
+def coerce_rows(df, schema=SCHEMA):
+    """Return new rows with every schema column converted, for appending to the dataset.
+
+    Unlike apply_schema, nothing becomes missing quietly: raises ValueError
+    naming the columns with blank values, values that do not parse, or
+    fractions in an int column.
+    """
+    converted = apply_schema(df, schema)
+    problems = []
+    for name in df.columns:
+        if name not in schema:
+            continue
+        bad = converted[name].isna().to_numpy()
+        if schema[name] == 'int':
+            values = converted[name].to_numpy(dtype=float)
+            bad = bad | (values != np.floor(values))
+        if bad.any():
+            rows = np.flatnonzero(bad)
+            problems.append(f'{name} {df[name].iloc[rows[:3]].tolist()!r} (row {rows[0] + 1})')
+    if problems:
+        raise ValueError(f'Values do not fit the dataset schema: {"; ".join(problems)}')
+    return converted
+
+
+def read_typed_csv(source, schema=SCHEMA, **kwargs):
+    """pd.read_csv(source, **kwargs) with the schema applied to the result."""
+    return apply_schema(pd.read_csv(source, dtype=csv_dtypes(schema), **kwargs), schema)
+
+
+def _infer_kind(series):
+    values = series.dropna()
+    if values.empty:
+        return 'category'
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return 'flag'
+    if not pd.api.types.is_numeric_dtype(values.dtype):
+        text = values.astype(str).str.strip()
+        if text.str.lower().isin(list(FLAG_VALUES)).all() and not text.isin(['0', '1']).all():
+            return 'flag'
+        numbers = pd.to_numeric(text, errors='coerce')
+        if numbers.notna().all():
+            values = numbers
+        else:
+            return 'category'
+    return 'int' if (values == np.floor(values)).all() else 'float'
+
+
+def infer_schema(sample, known=SCHEMA):
+    """Column kinds for a sample of a dataset with any columns.
+
+    Columns of the shopping-trends schema keep their declared kind. Others
+    are 'flag' when every value is a yes/no answer, 'int' or 'float' when
+    every value is a number, and 'category' otherwise.
+    """
+    return {name: known.get(name) or _infer_kind(sample[name]) for name in sample.columns}
+
+
+def memory_report(df):
+    """Bytes held by each column of df, counting string contents, as a DataFrame sorted largest first.
+
+    Columns: dtype, bytes, and bytes_per_row; the total is in .attrs['total_bytes'].
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'dtype': [str(df[name].dtype) for name in df.columns],
+        'bytes': usage.to_numpy(),
+        'bytes_per_row': usage.to_numpy() / max(len(df), 1),
+    }, index=pd.Index(df.columns, name='column')).sort_values('bytes', ascending=False)
+    report.attrs['total_bytes'] = int(usage.sum())
+    return report
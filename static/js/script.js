@@ -10,6 +10,14 @@ document.addEventListener('DOMContentLoaded', function() {
     const visualizationContainer = document.getElementById('visualization-container');
     const loadingIndicator = document.getElementById('loading');
     const welcomeMessage = document.getElementById('welcome-message');
+    const filterForm = document.getElementById('filter-form');
+    const filterFields = document.getElementById('filter-fields');
+    const filterClear = document.getElementById('filter-clear');
+    
+    // Columns offered in the sidebar filter form, and the filter currently applied
+    const CATEGORY_FILTERS = ['Season', 'Category', 'Gender', 'Location'];
+    const RANGE_FILTERS = ['Age'];
+    let activeFilter = '';
 
     // Toggle sidebar on mobile
     menuToggle.addEventListener('click', function() {
@@ -69,6 +77,69 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Filters: the form is built from the values the server reports for each column
+    fetch('/filters')
+    .then(response => response.json())
+    .then(options => {
+        CATEGORY_FILTERS.filter(column => options.categorical[column]).forEach(column => {
+            const values = options.categorical[column]
+                .map(value => `<option value="${value}">${value}</option>`).join('');
+            filterFields.insertAdjacentHTML('beforeend', `
+                <label class="filter-field">${column}
+                    <select data-column="${column}"><option value="">All</option>${values}</select>
+                </label>
+            `);
+        });
+        RANGE_FILTERS.filter(column => options.numeric[column]).forEach(column => {
+            const [low, high] = options.numeric[column];
+            filterFields.insertAdjacentHTML('beforeend', `
+                <label class="filter-field">${column}
+                    <span class="filter-range">
+                        <input type="number" data-column="${column}" data-bound="low" placeholder="${low}">
+                        <input type="number" data-column="${column}" data-bound="high" placeholder="${high}">
+                    </span>
+                </label>
+            `);
+        });
+    })
+    .catch(error => console.error('Error:', error));
+    
+    filterForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+        applyFilter(buildFilter());
+    });
+    
+    filterClear.addEventListener('click', function() {
+        filterForm.reset();
+        applyFilter('');
+    });
+    
+    function buildFilter() {
+        // Same syntax the server parses: Season:Winter;Age:20..40
+        const clauses = [];
+        filterFields.querySelectorAll('select').forEach(select => {
+            if (select.value) {
+                clauses.push(`${select.dataset.column}:${select.value}`);
+            }
+        });
+        RANGE_FILTERS.forEach(column => {
+            const low = filterFields.querySelector(`input[data-column="${column}"][data-bound="low"]`);
+            const high = filterFields.querySelector(`input[data-column="${column}"][data-bound="high"]`);
+            if (low && high && (low.value || high.value)) {
+                clauses.push(`${column}:${low.value}..${high.value}`);
+            }
+        });
+        return clauses.join(';');
+    }
+    
+    function applyFilter(filter) {
+        activeFilter = filter;
+        const activeLibBtn = document.querySelector('.library-btn.active');
+        if (activeLibBtn && welcomeMessage.style.display === 'none') {
+            loadVisualizations(activeLibBtn.getAttribute('data-library'));
+        }
+    }
+
     // Check localStorage for last selected library
     const lastSelectedLibrary = localStorage.getItem('selectedLibrary');
     if (lastSelectedLibrary) {
@@ -89,9 +160,15 @@ document.addEventListener('DOMContentLoaded', function() {
         loadingIndicator.style.display = 'flex';
         visualizationContainer.innerHTML = '';
         
-        // Send request to backend
+        // Send request to backend, asking for each chart to be streamed as soon as it is ready
         const formData = new FormData();
         formData.append('library', library);
+        formData.append('stream', '1');
+        if (activeFilter) {
+            formData.append('filter', activeFilter);
+        }
+        
+        const chartCards = {};
         
         fetch('http://127.0.0.1:5000/get_visualizations', {
             method: 'POST',
@@ -101,17 +178,19 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!response.ok) {
                 throw new Error(`HTTP error! Status: ${response.status}`);
             }
-            return response.json();
-        })
-        .then(data => {
-            loadingIndicator.style.display = 'none';
-            
-            if (data.error) {
-                showErrorMessage(data.error);
-                return;
-            }
-            
-            displayVisualizations(data);
+            return readNdjson(response, message => {
+                loadingIndicator.style.display = 'none';
+                
+                if (message.charts) {
+                    // Header line: lay out a placeholder card for every chart in order
+                    displayVisualizations(message, chartCards);
+                } else if (message.id && chartCards[message.id]) {
+                    // A chart line; one that failed carries its own error and leaves the others be
+                    fillVisualizationCard(chartCards[message.id], message);
+                } else if (message.error) {
+                    showErrorMessage(message.error);
+                }
+            });
         })
         .catch(error => {
             loadingIndicator.style.display = 'none';
@@ -119,6 +198,32 @@ document.addEventListener('DOMContentLoaded', function() {
             console.error('Error:', error);
         });
     }
+    
+    function readNdjson(response, onMessage) {
+        // Parse a newline-delimited JSON stream, handing over each object as it arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => onMessage(JSON.parse(line)));
+                
+                if (done) {
+                    if (buffer.trim()) {
+                        onMessage(JSON.parse(buffer));
+                    }
+                    return;
+                }
+                return pump();
+            });
+        }
+        
+        return pump();
+    }
 
     function showErrorMessage(message) {
         visualizationContainer.innerHTML = `
@@ -146,7 +251,7 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    function displayVisualizations(data) {
+    function displayVisualizations(data, chartCards) {
         visualizationContainer.innerHTML = '';
         
         // Add library info at the top
@@ -158,113 +263,53 @@ document.addEventListener('DOMContentLoaded', function() {
         `;
         visualizationContainer.appendChild(libraryInfo);
         
-        if (data.library === 'plotly') {
-            // Special handling for Plotly charts
-            data.visualizations.forEach(viz => {
-                const vizCard = document.createElement('div');
-                vizCard.className = 'visualization-card';
-                
-                vizCard.innerHTML = `
-                    <div class="card-header">
-                        <h3 class="card-title">${viz.title}</h3>
-                        <div class="card-actions">
-                            <button class="card-action info-btn" title="Chart Info">
-                                <i class="fas fa-info-circle"></i>
-                            </button>
-                            <button class="card-action fullscreen-btn" title="Fullscreen">
-                                <i class="fas fa-expand"></i>
-                            </button>
-                        </div>
-                    </div>
-                    <div class="card-body">
-                        <div id="plotly-${viz.title.replace(/\s+/g, '-').toLowerCase()}" class="visualization-plot"></div>
-                    </div>
-                    <div class="card-footer">
-                        <button class="download-btn">
-                            <i class="fas fa-download"></i> Download
+        data.charts.forEach(viz => {
+            const vizCard = document.createElement('div');
+            vizCard.className = 'visualization-card';
+            
+            vizCard.innerHTML = `
+                <div class="card-header">
+                    <h3 class="card-title">${viz.title}</h3>
+                    <div class="card-actions">
+                        <button class="card-action info-btn" title="Chart Info">
+                            <i class="fas fa-info-circle"></i>
                         </button>
-                        <span class="chart-meta">${formatDate(new Date())}</span>
-                    </div>
-                `;
-                
-                visualizationContainer.appendChild(vizCard);
-                
-                // Handle Plotly chart rendering
-                const plotElement = vizCard.querySelector(`#plotly-${viz.title.replace(/\s+/g, '-').toLowerCase()}`);
-                const image = new Image();
-                image.onload = function() {
-                    const img = document.createElement('img');
-                    img.src = viz.image;
-                    img.className = 'visualization-image';
-                    img.alt = viz.title;
-                    plotElement.appendChild(img);
-                };
-                image.src = viz.image;
-                
-                // Add download event listener
-                const downloadBtn = vizCard.querySelector('.download-btn');
-                downloadBtn.addEventListener('click', () => downloadImage(viz.image, viz.title));
-                
-                // Fullscreen button functionality
-                const fullscreenBtn = vizCard.querySelector('.fullscreen-btn');
-                fullscreenBtn.addEventListener('click', () => {
-                    toggleFullscreen(vizCard);
-                });
-                
-                // Info button functionality
-                const infoBtn = vizCard.querySelector('.info-btn');
-                infoBtn.addEventListener('click', () => {
-                    showChartInfo(viz.title);
-                });
-            });
-        } else {
-            // For other libraries (Matplotlib, Seaborn, Pandas)
-            data.visualizations.forEach(viz => {
-                const vizCard = document.createElement('div');
-                vizCard.className = 'visualization-card';
-                
-                vizCard.innerHTML = `
-                    <div class="card-header">
-                        <h3 class="card-title">${viz.title}</h3>
-                        <div class="card-actions">
-                            <button class="card-action info-btn" title="Chart Info">
-                                <i class="fas fa-info-circle"></i>
-                            </button>
-                            <button class="card-action fullscreen-btn" title="Fullscreen">
-                                <i class="fas fa-expand"></i>
-                            </button>
-                        </div>
-                    </div>
-                    <div class="card-body">
-                        <img src="${viz.image}" class="visualization-image" alt="${viz.title}">
-                    </div>
-                    <div class="card-footer">
-                        <button class="download-btn">
-                            <i class="fas fa-download"></i> Download
+                        <button class="card-action fullscreen-btn" title="Fullscreen">
+                            <i class="fas fa-expand"></i>
                         </button>
-                        <span class="chart-meta">${formatDate(new Date())}</span>
                     </div>
-                `;
-                
-                visualizationContainer.appendChild(vizCard);
-                
-                // Add download event listener
-                const downloadBtn = vizCard.querySelector('.download-btn');
-                downloadBtn.addEventListener('click', () => downloadImage(viz.image, viz.title));
-                
-                // Fullscreen button functionality
-                const fullscreenBtn = vizCard.querySelector('.fullscreen-btn');
-                fullscreenBtn.addEventListener('click', () => {
-                    toggleFullscreen(vizCard);
-                });
-                
-                // Info button functionality
-                const infoBtn = vizCard.querySelector('.info-btn');
-                infoBtn.addEventListener('click', () => {
-                    showChartInfo(viz.title);
-                });
+                </div>
+                <div class="card-body">
+                    <div class="chart-placeholder"><div class="spinner"></div></div>
+                </div>
+                <div class="card-footer">
+                    <button class="download-btn" disabled>
+                        <i class="fas fa-download"></i> Download
+                    </button>
+                    <span class="chart-meta">${formatDate(new Date())}</span>
+                </div>
+            `;
+            
+            visualizationContainer.appendChild(vizCard);
+            chartCards[viz.id] = vizCard;
+            
+            // Fullscreen button functionality
+            const fullscreenBtn = vizCard.querySelector('.fullscreen-btn');
+            fullscreenBtn.addEventListener('click', () => {
+                // The grid shows a thumbnail; fullscreen swaps in the full-resolution image
+                const image = vizCard.querySelector('.visualization-image');
+                if (image && image.dataset.full && !document.fullscreenElement) {
+                    image.src = image.dataset.full;
+                }
+                toggleFullscreen(vizCard);
             });
-        }
+            
+            // Info button functionality
+            const infoBtn = vizCard.querySelector('.info-btn');
+            infoBtn.addEventListener('click', () => {
+                showChartInfo(viz.title);
+            });
+        });
         
         // Add animation for cards
         const cards = visualizationContainer.querySelectorAll('.visualization-card');
@@ -276,15 +321,48 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    function downloadImage(imageData, title) {
-        const formData = new FormData();
-        formData.append('image_data', imageData);
-        formData.append('chart_title', title);
+    function fillVisualizationCard(vizCard, viz) {
+        const cardBody = vizCard.querySelector('.card-body');
+        if (viz.error) {
+            cardBody.innerHTML = `<div class="chart-placeholder chart-error"><i class="fas fa-exclamation-triangle"></i> ${viz.error}</div>`;
+            return;
+        }
+        if (viz.spec) {
+            fillPlotCard(vizCard, viz);
+            return;
+        }
+        cardBody.innerHTML = `<img src="${viz.url}" data-full="${viz.full_url}" class="visualization-image" alt="${viz.title}">`;
+        
+        // Add download event listener; downloads are always the full-resolution PNG
+        const downloadBtn = vizCard.querySelector('.download-btn');
+        downloadBtn.disabled = false;
+        downloadBtn.addEventListener('click', () => downloadImage(viz.full_url, viz.title));
+    }
+    
+    function fillPlotCard(vizCard, viz) {
+        // Client-rendered chart: the server only sent the aggregated series, Plotly draws them here
+        const cardBody = vizCard.querySelector('.card-body');
+        cardBody.innerHTML = '<div class="visualization-plot"></div>';
+        const plot = cardBody.querySelector('.visualization-plot');
+        Plotly.newPlot(plot, viz.spec.data, viz.spec.layout, { responsive: true, displaylogo: false });
+        
+        const downloadBtn = vizCard.querySelector('.download-btn');
+        downloadBtn.disabled = false;
+        downloadBtn.addEventListener('click', () => {
+            Plotly.downloadImage(plot, { format: 'png', filename: viz.title })
+            .then(() => showNotification('Chart downloaded successfully!', 'success'))
+            .catch(error => {
+                showNotification('Failed to download image', 'error');
+                console.error('Error:', error);
+            });
+        });
+    }
+    
+    function downloadImage(imageUrl, title) {
+        // The chart URL serves the PNG directly; download=1 marks it as an attachment
+        const separator = imageUrl.includes('?') ? '&' : '?';
         
-        fetch('/download_image', {
-            method: 'POST',
-            body: formData
-        })
+        fetch(`${imageUrl}${separator}download=1`)
         .then(response => {
             if (response.ok) {
                 return response.blob();
@@ -618,6 +696,24 @@ document.addEventListener('DOMContentLoaded', function() {
             transition: opacity 0.3s ease, transform 0.3s ease;
         }
         
+        /* Placeholder shown until a streamed chart arrives */
+        .chart-placeholder {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            min-height: 250px;
+        }
+        
+        /* A chart that could not be drawn */
+        .chart-error {
+            color: var(--text-secondary);
+            gap: 8px;
+        }
+        
+        .chart-error i {
+            color: var(--danger-color);
+        }
+        
         /* Library info section */
         .library-info {
             margin-bottom: 30px;
@@ -0,0 +1,44 @@
+import shutil
+import pytest
+import app as dashboard
+from dataset import DATA_PATH
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Appends go to a copy, never to the shipped dataset
+    path = tmp_path / 'shopping_trends.csv'
+    shutil.copy(DATA_PATH, path)
+    monkeypatch.setattr(dashboard, 'DATA_PATH', str(path))
+    return dashboard.app.test_client(), path
+
+
+def test_empty_csv_body_is_rejected(client):
+    client, path = client
+    before = path.read_bytes()
+    response = client.post('/append', data=b'', content_type='text/csv')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'No rows to append'}
+    assert path.read_bytes() == before
+
+
+def test_malformed_csv_body_is_rejected(client):
+    client, path = client
+    before = path.read_bytes()
+    # The second row has more fields than the header
+    response = client.post('/append', data=b'Age,Gender\n30,Male\n41,Female,extra,fields\n', content_type='text/csv')
+    assert response.status_code == 400
+    assert 'could not be parsed' in response.get_json()['error']
+    assert path.read_bytes() == before
+
+
+def test_unparsable_value_is_rejected(client):
+    client, path = client
+    before = path.read_bytes()
+    header = before.split(b'\n', 1)[0]
+    row = before.split(b'\n')[1].split(b',')
+    row[1] = b'abc'
+    response = client.post('/append', data=header + b'\n' + b','.join(row) + b'\n', content_type='text/csv')
+    assert response.status_code == 400
+    assert 'Age' in response.get_json()['error']
+    assert path.read_bytes() == before
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from visualizations.cube import DIMENSIONS, MEASURES, build_cube, get_cube
+from visualizations.aggregates import compute_aggregates
+
+NAMES = ['purchase_mean_by_category_gender', 'count_by_frequency_promo', 'rating_mean_by_season']
+
+
+def wide_frame(rows=400, distinct=1000, seed=0):
+    # Every dimension has hundreds of values, so their product is far beyond an int64 cell code
+    rng = np.random.default_rng(seed)
+    data = {column: rng.integers(0, distinct, rows).astype(str) for column in DIMENSIONS}
+    data.update({column: rng.uniform(1, 100, rows) for column in MEASURES})
+    return pd.DataFrame(data)
+
+
+def test_dimension_space_beyond_int64_has_no_cube():
+    df = wide_frame()
+    assert build_cube(df) is None
+    assert get_cube(df, 'test-wide') is None
+
+
+def test_aggregates_without_a_cube_group_the_rows():
+    df = wide_frame()
+    cubed = compute_aggregates(df, NAMES, 'test-wide-aggregates')
+    grouped = compute_aggregates(df, NAMES)
+    for name in NAMES:
+        pd.testing.assert_series_equal(cubed[name], grouped[name])
+
+
+def test_small_dimension_space_still_builds_a_cube():
+    cube = build_cube(wide_frame(distinct=3))
+    assert cube is not None and cube.cells <= 3 ** len(DIMENSIONS)
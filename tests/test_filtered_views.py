@@ -0,0 +1,32 @@
+import pytest
+from visualizations import registry
+from visualizations import executor
+from visualizations.chart_cache import ChartCache
+from visualizations.filters import parse_filter, filter_frame
+from visualizations.rendering import iter_chart_pngs
+from visualizations.specs import iter_chart_specs, has_specs
+from dataset import load_dataset
+
+# Each filter leaves a single value in at least one category the charts group by
+FILTERS = ['Gender:Female', 'Location:Alaska;Season:Winter;Size:XL', 'Subscription Status:Yes', 'Category:Footwear']
+
+
+@pytest.fixture(autouse=True)
+def serial_rendering(monkeypatch):
+    monkeypatch.setattr(executor, 'RENDER_WORKERS', 0)
+
+
+@pytest.mark.parametrize('filter', FILTERS)
+@pytest.mark.parametrize('library', list(registry.LIBRARY_MODULES))
+def test_every_chart_renders_under_single_value_filter(library, filter):
+    df, version = load_dataset()
+    view, view_version = filter_frame(df, version, parse_filter(filter))
+    assert not view.empty
+
+    charts = registry.get_charts(library, view.columns)
+    rendered = dict(iter_chart_pngs(library, view, version=view_version, cache=ChartCache()))
+    assert sorted(chart.id for chart in rendered) == sorted(chart.id for chart in charts)
+    assert all(rendered.values())
+    if has_specs(library):
+        specs = dict(iter_chart_specs(library, view, version=view_version, cache=ChartCache()))
+        assert specs
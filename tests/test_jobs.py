@@ -0,0 +1,46 @@
+import pytest
+import app as dashboard
+from visualizations import registry, executor
+
+
+def boom(*args):
+    raise RuntimeError('boom')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Serial rendering, so the broken chart below is the one that gets drawn
+    monkeypatch.setattr(executor, 'RENDER_WORKERS', 0)
+    return dashboard.app.test_client()
+
+
+def break_chart(monkeypatch, library, chart_id):
+    registry.load_libraries()
+    charts = registry._charts[registry.resolve_library(library)]
+    monkeypatch.setitem(charts, chart_id, charts[chart_id]._replace(draw=boom))
+
+
+def visualizations(client, library, mode, filter):
+    response = client.post('/get_visualizations', data={'library': library, 'mode': mode, 'filter': filter})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert 'error' not in body
+    return {entry['id']: entry for entry in body['visualizations']}
+
+
+def test_failing_chart_does_not_fail_the_job(client, monkeypatch):
+    break_chart(monkeypatch, 'pandas', 'size_popularity')
+    entries = visualizations(client, 'pandas', 'image', 'Age:21..22')
+    assert len(entries) == len(registry.get_charts('pandas'))
+    assert 'boom' in entries['size_popularity']['error']
+    assert 'url' not in entries['size_popularity']
+    assert all('url' in entry for chart_id, entry in entries.items() if chart_id != 'size_popularity')
+
+
+def test_failing_spec_does_not_fail_the_job(client, monkeypatch):
+    library = registry.resolve_library('plotly')
+    chart_id = next(chart.id for chart in registry.get_charts(library) if registry.get_spec(library, chart.id))
+    monkeypatch.setitem(registry._specs[library], chart_id, boom)
+    entries = visualizations(client, 'plotly', 'spec', 'Age:23..24')
+    assert 'boom' in entries[chart_id]['error']
+    assert all('spec' in entry for other, entry in entries.items() if other != chart_id)
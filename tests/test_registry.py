@@ -0,0 +1,29 @@
+import pytest
+from visualizations import registry, formats
+from visualizations.aggregates import compute_aggregates
+from visualizations.rendering import prepare_frame, render_png
+from visualizations.specs import has_specs
+from dataset import load_data
+
+registry.load_libraries()
+CHARTS = [chart for library in registry.LIBRARY_MODULES for chart in registry.get_charts(library)]
+
+
+@pytest.fixture(scope='module')
+def df():
+    return load_data()
+
+
+@pytest.mark.parametrize('chart', CHARTS, ids=lambda chart: f'{chart.library}/{chart.id}')
+def test_chart_draws_from_its_declared_columns(df, chart):
+    # Only the columns the chart declares (directly or through its aggregates) are left in the frame
+    columns = registry.chart_columns(chart)
+    view = df[[column for column in df.columns if column in columns]]
+    assert registry.get_charts(chart.library, view.columns).count(chart) == 1
+
+    frame, _ = prepare_frame(chart.library, view)
+    aggs = compute_aggregates(frame, chart.needs) if chart.needs else {}
+    assert render_png(chart, frame, aggs, options=formats.render_options('png', size='thumb'))
+    spec = registry.get_spec(chart.library, chart.id) if has_specs(chart.library) else None
+    if spec is not None:
+        assert spec(frame, aggs) if chart.needs else spec(frame)
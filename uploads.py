@@ -0,0 +1,251 @@
+import os
+import time
+import hashlib
+import secrets
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from werkzeug.sansio.multipart import MultipartDecoder, File, Data, Epilogue, NEED_DATA
+from schema import infer_schema
+from visualizations import registry
+from dataset import ColumnarWriter, CHUNK_ROWS, COLUMNAR_SUFFIX, _read_meta
+
+# Uploaded datasets. The CSV is streamed to disk as it arrives, then converted
+# in a separate process into the typed columnar layout, so parsing a large
+# upload never holds the web process. Each upload is registered under the
+# first 16 hex digits of its content digest: its dataset id. The full digest
+# is its version, and the same file uploaded twice is the same dataset.
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                                          'uploads')
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 2 << 30))
+UPLOAD_CHUNK_BYTES = 1 << 20
+# Room in a request body for the multipart headers and form fields around the file
+MULTIPART_OVERHEAD_BYTES = 1 << 20
+# Rows read to infer the column types of an upload
+SCHEMA_SAMPLE_ROWS = 10_000
+
+CONVERTING, READY, FAILED = 'converting', 'ready', 'failed'
+
+# Uploads this process is converting or failed to convert; finished ones are found on disk
+_uploads = {}
+_lock = threading.Lock()
+_pool = None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def dataset_dir(dataset_id, upload_dir=None):
+    return os.path.join(upload_dir or UPLOAD_DIR, dataset_id + COLUMNAR_SUFFIX)
+
+
+def _valid_id(dataset_id):
+    return len(dataset_id) == 16 and all(c in '0123456789abcdef' for c in dataset_id)
+
+
+def receive(chunks, upload_dir=None, max_bytes=None):
+    """Write an iterable of byte chunks to a scratch file, hashing it on the way.
+
+    Returns (scratch path, sha256 hex digest, size). Raises UploadTooLarge,
+    leaving nothing behind, once more than max_bytes (default UPLOAD_MAX_BYTES) arrive.
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    incoming = os.path.join(upload_dir or UPLOAD_DIR, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    path = os.path.join(incoming, secrets.token_hex(8) + '.csv')
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, 'wb') as f:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f'Uploads are limited to {max_bytes} bytes')
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, hasher.hexdigest(), size
+
+
+def read_chunks(stream, chunk_bytes=UPLOAD_CHUNK_BYTES):
+    return iter(lambda: stream.read(chunk_bytes), b'')
+
+
+def _multipart_events(stream, decoder, chunk_bytes):
+    while True:
+        event = decoder.next_event()
+        if event is NEED_DATA:
+            if decoder.complete:
+                raise ValueError('The upload ended before the end of the multipart body')
+            decoder.receive_data(stream.read(chunk_bytes) or None)
+        elif isinstance(event, Epilogue):
+            return
+        else:
+            yield event
+
+
+def read_multipart_file(stream, boundary, field='file', chunk_bytes=UPLOAD_CHUNK_BYTES):
+    """(filename, byte chunks) of one file field of a multipart/form-data body.
+
+    The body is parsed from stream as the chunks are consumed, so the file is
+    never spooled or held in memory. Raises ValueError if the body has no such field.
+    """
+    if not boundary:
+        raise ValueError('The multipart upload has no boundary')
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    events = _multipart_events(stream, decoder, chunk_bytes)
+    for event in events:
+        if isinstance(event, File) and event.name == field:
+            break
+    else:
+        raise ValueError(f'The upload has no {field!r} file field')
+
+    def chunks():
+        for data in events:
+            if isinstance(data, Data):
+                if data.data:
+                    yield bytes(data.data)
+                if not data.more_data:
+                    return
+
+    return event.filename, chunks()
+
+
+def check_columns(columns):
+    """Raise ValueError unless at least one chart can be drawn from a dataset with these columns."""
+    if registry.drawable_charts(columns):
+        return
+    # Columns that are each enough for some chart on their own
+    used = [registry.chart_columns(chart) for chart in registry.drawable_charts(None)]
+    sufficient = sorted({name for needed in used if len(needed) == 1 for name in needed})
+    raise ValueError(f"No chart can be drawn from the columns {', '.join(map(str, columns)) or '(none)'}. "
+                     f"Charts are drawn from the shopping-trends columns; any one of {', '.join(sufficient)} "
+                     f"is enough for at least one chart.")
+
+
+def convert_upload(csv_path, columnar_dir, version, name, chunk_rows=CHUNK_ROWS):
+    """Convert an uploaded CSV into a typed columnar dataset, one chunk of rows at a time.
+
+    Column types are inferred from the first SCHEMA_SAMPLE_ROWS rows. Runs
+    in the conversion process; returns the dataset's meta.
+    """
+    sample = pd.read_csv(csv_path, nrows=SCHEMA_SAMPLE_ROWS)
+    schema = infer_schema(sample)
+    dtypes = {column: 'category' for column, kind in schema.items() if kind in ('category', 'flag')}
+    writer = ColumnarWriter(columnar_dir, schema)
+    try:
+        with pd.read_csv(csv_path, chunksize=chunk_rows, dtype=dtypes) as reader:
+            for chunk in reader:
+                writer.write(chunk)
+        # Text columns with too many distinct values are skipped, which may leave nothing to chart
+        check_columns(writer.columns)
+        return writer.close(version, name=name, uploaded=time.time())
+    except BaseException:
+        writer.abort()
+        raise
+
+
+def _get_pool(fresh=False):
+    global _pool
+    with _lock:
+        if _pool is None or fresh:
+            # spawn, not fork: the parent is a threaded web server
+            _pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def register(chunks, name, upload_dir=None):
+    """Store an upload and start converting it; returns its status (see status()).
+
+    An upload whose contents are already registered returns the existing
+    dataset. Raises ValueError, keeping nothing, for an empty upload, one
+    that is not a CSV, or one whose header has no columns any chart is drawn from.
+    """
+    path, digest, size = receive(chunks, upload_dir)
+    try:
+        if size == 0:
+            raise ValueError('The upload is empty')
+        check_columns(list(pd.read_csv(path, nrows=0).columns))
+    except ValueError:
+        os.remove(path)
+        raise
+    dataset_id = digest[:16]
+    columnar_dir = dataset_dir(dataset_id, upload_dir)
+    with _lock:
+        current = _uploads.get(dataset_id)
+        duplicate = os.path.isdir(columnar_dir) or (current is not None and current['status'] == CONVERTING)
+        if not duplicate:
+            _uploads[dataset_id] = {'id': dataset_id, 'name': name, 'version': digest, 'bytes': size,
+                                    'status': CONVERTING}
+    if duplicate:
+        os.remove(path)
+        return status(dataset_id, upload_dir)
+
+    def finished(future):
+        os.remove(path)
+        error = future.exception()
+        with _lock:
+            if error is None:
+                # On disk now, where status() finds it
+                _uploads.pop(dataset_id, None)
+            else:
+                _uploads[dataset_id].update(status=FAILED, error=str(error) or type(error).__name__)
+
+    try:
+        future = _get_pool().submit(convert_upload, path, columnar_dir, digest, name)
+    except BrokenProcessPool:
+        # The conversion process died on an earlier upload: start a new one
+        future = _get_pool(fresh=True).submit(convert_upload, path, columnar_dir, digest, name)
+    future.add_done_callback(finished)
+    return status(dataset_id, upload_dir)
+
+
+def status(dataset_id, upload_dir=None):
+    """{'id', 'name', 'version', 'status', ...} of an uploaded dataset, or None if there is no such dataset.
+
+    Ready datasets also report their rows and column kinds, plus any text
+    columns left out for having too many distinct values; failed ones their error.
+    """
+    if not _valid_id(dataset_id):
+        return None
+    with _lock:
+        current = _uploads.get(dataset_id)
+        if current is not None:
+            return dict(current)
+    meta = _read_meta(dataset_dir(dataset_id, upload_dir))
+    if meta is None:
+        return None
+    entry = {'id': dataset_id, 'name': meta.get('name'), 'version': meta['version'], 'status': READY,
+             'rows': meta['rows'], 'columns': meta.get('schema') or {c['name']: c['kind'] for c in meta['columns']}}
+    if meta.get('skipped_columns'):
+        entry['skipped_columns'] = meta['skipped_columns']
+    return entry
+
+
+def list_datasets(upload_dir=None):
+    upload_dir = upload_dir or UPLOAD_DIR
+    ids = set()
+    if os.path.isdir(upload_dir):
+        ids.update(name[:-len(COLUMNAR_SUFFIX)] for name in os.listdir(upload_dir) if name.endswith(COLUMNAR_SUFFIX))
+    with _lock:
+        ids.update(_uploads)
+    return [entry for entry in (status(dataset_id, upload_dir) for dataset_id in sorted(ids)) if entry]
+
+
+def dataset_path(dataset_id, upload_dir=None):
+    """The columnar directory to load an uploaded dataset from.
+
+    Raises LookupError for an unknown dataset and ValueError for one that is not ready yet.
+    """
+    entry = status(dataset_id, upload_dir)
+    if entry is None:
+        raise LookupError(f'Unknown dataset {dataset_id!r}')
+    if entry['status'] != READY:
+        raise ValueError(f"Dataset {dataset_id} is {entry['status']}" +
+                         (f": {entry['error']}" if entry.get('error') else ''))
+    return dataset_dir(dataset_id, upload_dir)
@@ -0,0 +1,305 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from visualizations.sketches import QuantileSketch
+from visualizations.cube import get_cube
+
+PURCHASE = 'Purchase Amount (USD)'
+NUMERIC_COLUMNS = ('Customer ID', 'Age', PURCHASE, 'Review Rating', 'Previous Purchases')
+
+# Shared aggregates, by name: (kind, group-by columns or histogram column, value column or bin count).
+# moments aggregates take the columns to correlate in place of the group-by columns.
+# box aggregates summarize the value column per group with a quantile sketch;
+# values aggregates keep per-group counts of the values on a fixed grid (for KDEs), see _binned_values.
+# Charts list the names they need and receive the results instead of scanning rows themselves.
+# count and mean aggregates over cube dimensions are rolled up from the dataset
+# version's categorical cube (see visualizations.cube) instead of grouping rows.
+AGGREGATES = {
+    'purchase_mean_by_category': ('mean', ('Category',), PURCHASE),
+    'purchase_mean_by_category_gender': ('mean', ('Category', 'Gender'), PURCHASE),
+    'purchase_mean_by_season': ('mean', ('Season',), PURCHASE),
+    'purchase_mean_by_subscription': ('mean', ('Subscription Status',), PURCHASE),
+    'count_by_subscription': ('count', ('Subscription Status',), None),
+    'count_by_payment_method': ('count', ('Payment Method',), None),
+    'count_by_gender': ('count', ('Gender',), None),
+    'count_by_frequency': ('count', ('Frequency of Purchases',), None),
+    'count_by_size': ('count', ('Size',), None),
+    'count_by_shipping_type': ('count', ('Shipping Type',), None),
+    'count_by_subscription_gender': ('count', ('Subscription Status', 'Gender'), None),
+    'count_by_category_discount': ('count', ('Category', 'Discount Applied'), None),
+    'count_by_frequency_promo': ('count', ('Frequency of Purchases', 'Promo Code Used'), None),
+    'count_by_frequency_gender': ('count', ('Frequency of Purchases', 'Gender'), None),
+    'count_by_preferred_payment_method': ('count', ('Preferred Payment Method', 'Payment Method'), None),
+    'count_by_item': ('count', ('Item Purchased',), None),
+    'count_by_color': ('count', ('Color',), None),
+    'count_by_color_gender': ('count', ('Color', 'Gender'), None),
+    'purchase_mean_by_discount': ('mean', ('Discount Applied',), PURCHASE),
+    'rating_mean_by_category': ('mean', ('Category',), 'Review Rating'),
+    'rating_mean_by_season': ('mean', ('Season',), 'Review Rating'),
+    'age_mean_by_preferred_payment_method': ('mean', ('Preferred Payment Method',), 'Age'),
+    'purchase_mean_by_location': ('mean', ('Location',), PURCHASE),
+    'review_rating_histogram': ('hist', 'Review Rating', 10),
+    'age_histogram': ('hist', 'Age', 20),
+    'previous_purchases_histogram': ('hist', 'Previous Purchases', 20),
+    'numeric_correlation': ('moments', NUMERIC_COLUMNS, None),
+    'purchase_box_by_category': ('box', ('Category',), PURCHASE),
+    'purchase_box_by_season': ('box', ('Season',), PURCHASE),
+    'purchase_box_by_frequency': ('box', ('Frequency of Purchases',), PURCHASE),
+    'purchase_box_by_payment_method': ('box', ('Payment Method',), PURCHASE),
+    'rating_box_by_shipping_type': ('box', ('Shipping Type',), 'Review Rating'),
+    'age_values_by_gender': ('values', ('Gender',), 'Age'),
+    'purchase_values_by_payment_method': ('values', ('Payment Method',), PURCHASE),
+    'rating_values_by_shipping_type': ('values', ('Shipping Type',), 'Review Rating'),
+}
+
+# values aggregates snap each value to the nearest multiple of VALUE_GRID_BASE * 2**level, at the
+# finest level where the values span at most MAX_VALUE_BINS grid points. Merging moves both sides
+# to the coarser grid (and coarser still if the combined values need it), so the state of one
+# group never exceeds MAX_VALUE_BINS + 1 counts however many rows or distinct values there are.
+# Integers, and decimals with few digits over a narrow range, stay exact.
+VALUE_GRID_BASE = 2.0 ** -10
+MAX_VALUE_BINS = 1024
+
+# Partial state memoized per (frame version, aggregate name); kept unfinalized so
+# appended rows can be folded in without rescanning the frame
+MAX_MEMO_ENTRIES = 512
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def aggregate_columns(name):
+    """The dataset columns the named aggregate reads."""
+    _, by, value = AGGREGATES[name]
+    columns = {by} if isinstance(by, str) else set(by)
+    if isinstance(value, str):
+        columns.add(value)
+    return columns
+
+
+def partial_aggregates(df, names, cube=None):
+    """Return mergeable partial state for the named aggregates over df.
+
+    count -> Series of group sizes, mean -> DataFrame of per-group 'sum' and
+    'count', hist -> Series of value counts, moments -> (rows, column means,
+    co-moment matrix) over the rows with no missing values, box -> {group key:
+    QuantileSketch}, values -> (grid level, Series of row counts per (group key, grid point)). Partials of
+    disjoint chunks are combined with merge_partials and turned into results
+    by finalize_partials. Given the Cube of df, count and mean partials over
+    its dimensions are rolled up from it rather than grouped from the rows.
+    """
+    names = list(OrderedDict.fromkeys(names))
+    partials = {}
+
+    # One groupby per distinct key, computing counts and every requested sum in the same pass
+    by_key = OrderedDict()
+    for name in names:
+        kind, by, value = AGGREGATES[name]
+        if kind in ('count', 'mean'):
+            by_key.setdefault(by, []).append(name)
+
+    for by, key_names in by_key.items():
+        value_cols = sorted({AGGREGATES[name][2] for name in key_names if AGGREGATES[name][0] == 'mean'})
+        if cube is not None and cube.covers(by, value_cols):
+            rolled = cube.rollup(by, value_cols)
+            sizes = rolled['size', ''].rename(None)
+            stats = rolled.drop(columns='size', level=0)
+        else:
+            grouped = df.groupby(list(by) if len(by) > 1 else by[0], sort=True, observed=True)
+            sizes = grouped.size()
+            stats = grouped[value_cols].agg(['sum', 'count']) if value_cols else None
+        for name in key_names:
+            kind, _, value = AGGREGATES[name]
+            if kind == 'count':
+                partials[name] = sizes
+            else:
+                partials[name] = stats[value][['sum', 'count']]
+
+    for name in names:
+        kind, column, _ = AGGREGATES[name]
+        if kind == 'hist':
+            # Exact value counts, so the bin edges can still be taken from the global min/max
+            partials[name] = df[column].value_counts(sort=False, dropna=True).sort_index()
+        elif kind == 'moments':
+            values = df[list(column)].to_numpy(dtype=float)
+            values = values[~np.isnan(values).any(axis=1)]
+            mean = values.mean(axis=0) if len(values) else np.zeros(len(column))
+            centered = values - mean
+            partials[name] = (len(values), mean, centered.T @ centered)
+        elif kind == 'values':
+            partials[name] = _binned_values(df, column, AGGREGATES[name][2])
+        elif kind == 'box':
+            grouped = df.groupby(list(column) if len(column) > 1 else column[0], sort=True, observed=True)
+            partials[name] = {key: QuantileSketch.from_values(values.to_numpy())
+                              for key, values in grouped[AGGREGATES[name][2]]}
+
+    return partials
+
+
+def _merge_moments(left, right):
+    # Pairwise update of means and co-moments (Chan et al.), stable for large counts
+    n_left, mean_left, m2_left = left
+    n_right, mean_right, m2_right = right
+    n = n_left + n_right
+    if n == 0:
+        return left
+    delta = mean_right - mean_left
+    mean = mean_left + delta * (n_right / n)
+    m2 = m2_left + m2_right + np.outer(delta, delta) * (n_left * n_right / n)
+    return n, mean, m2
+
+
+def _grid_level(low, high, level=0):
+    # The finest level, at least level, whose grid covers [low, high] in MAX_VALUE_BINS steps
+    # without grid indices outgrowing exact float integers
+    needed = max((high - low) / MAX_VALUE_BINS, max(abs(low), abs(high)) / 2.0 ** 52) / VALUE_GRID_BASE
+    return max(level, int(np.ceil(np.log2(needed))) if needed > 1 else 0)
+
+
+def _binned_values(df, by, value):
+    values = df[value].to_numpy(dtype=float)
+    keep = ~np.isnan(values)
+    level = _grid_level(values[keep].min(), values[keep].max()) if keep.any() else 0
+    points = np.round(values[keep] / (VALUE_GRID_BASE * 2.0 ** level)).astype(np.int64)
+    counts = df.loc[keep, list(by)].assign(**{value: points}).groupby(list(by) + [value], sort=True,
+                                                                       observed=True).size()
+    return level, counts
+
+
+def _coarsen_values(partial, level):
+    current, counts = partial
+    if current == level or counts.empty:
+        return level, counts
+    index = counts.index
+    points = np.round(index.get_level_values(-1).to_numpy() / 2.0 ** (level - current)).astype(np.int64)
+    keys = [index.get_level_values(i) for i in range(index.nlevels - 1)] + [points]
+    return level, counts.groupby(keys, sort=True, observed=True).sum().rename_axis(index.names)
+
+
+def _merge_values(left, right):
+    level = max(left[0], right[0])
+    _, left_counts = _coarsen_values(left, level)
+    _, right_counts = _coarsen_values(right, level)
+    combined = pd.concat([left_counts, right_counts])
+    if combined.empty:
+        return level, combined
+    points = combined.index.get_level_values(-1).to_numpy() * VALUE_GRID_BASE * 2.0 ** level
+    wider = _grid_level(points.min(), points.max(), level)
+    combined = combined.groupby(level=list(range(combined.index.nlevels)), sort=True, observed=True).sum()
+    return _coarsen_values((level, combined), wider)
+
+
+def merge_partials(left, right):
+    """Combine the partials of two disjoint chunks of rows."""
+    merged = dict(left)
+    for name, partial in right.items():
+        if name not in merged:
+            merged[name] = partial
+            continue
+        if AGGREGATES[name][0] == 'moments':
+            merged[name] = _merge_moments(merged[name], partial)
+            continue
+        if AGGREGATES[name][0] == 'values':
+            merged[name] = _merge_values(merged[name], partial)
+            continue
+        if AGGREGATES[name][0] == 'box':
+            sketches = dict(merged[name])
+            for key, sketch in partial.items():
+                sketches[key] = sketches[key].merge(sketch) if key in sketches else sketch
+            merged[name] = sketches
+            continue
+        combined = pd.concat([merged[name], partial])
+        merged[name] = combined.groupby(level=list(range(combined.index.nlevels)), sort=True, observed=True).sum()
+    return merged
+
+
+def finalize_partials(partials):
+    """Turn partial state into the results compute_aggregates returns."""
+    results = {}
+    for name, partial in partials.items():
+        kind, column, bins = AGGREGATES[name]
+        if kind == 'count':
+            results[name] = partial
+        elif kind == 'mean':
+            results[name] = partial['sum'] / partial['count']
+        elif kind == 'moments':
+            _, _, m2 = partial
+            scale = np.sqrt(np.diag(m2))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = m2 / np.outer(scale, scale)
+            results[name] = pd.DataFrame(corr, index=list(column), columns=list(column))
+        elif kind == 'values':
+            level, counts = partial
+            width = VALUE_GRID_BASE * 2.0 ** level
+            results[name] = OrderedDict(
+                (key, (group.index.get_level_values(-1).to_numpy(dtype=float) * width, group.to_numpy()))
+                for key, group in counts.groupby(level=list(range(len(column))) if len(column) > 1 else 0,
+                                                 sort=True, observed=True)
+            )
+        elif kind == 'box':
+            results[name] = OrderedDict(
+                (key, partial[key].box_stats(str(key))) for key in sorted(partial) if partial[key].count
+            )
+        else:
+            results[name] = np.histogram(partial.index.to_numpy(dtype=float), bins=bins,
+                                         weights=partial.to_numpy())
+    return results
+
+
+def _compute(df, names):
+    return finalize_partials(partial_aggregates(df, names))
+
+
+def _uses_cube(names):
+    return any(AGGREGATES[name][0] in ('count', 'mean') for name in names)
+
+
+def compute_aggregates(df, names, version=None):
+    """Return {name: result} for the named aggregates over df.
+
+    count -> Series of group sizes, mean -> Series of group means (both indexed by
+    the sorted group keys), hist -> (counts, bin_edges), moments -> correlation
+    DataFrame, box -> {group key: bxp statistics} and values -> {group key:
+    (grid values, counts)}, both in sorted key order. With a version, partials are memoized so each aggregate is
+    computed once per dataset version.
+    """
+    names = list(OrderedDict.fromkeys(names))
+    if version is None:
+        return _compute(df, names)
+
+    partials = {}
+    with _memo_lock:
+        for name in names:
+            if (version, name) in _memo:
+                _memo.move_to_end((version, name))
+                partials[name] = _memo[(version, name)]
+    missing = [name for name in names if name not in partials]
+    if missing:
+        cube = get_cube(df, version) if _uses_cube(missing) else None
+        computed = partial_aggregates(df, missing, cube)
+        _remember(version, computed)
+        partials.update(computed)
+    return finalize_partials(partials)
+
+
+def _remember(version, partials):
+    with _memo_lock:
+        for name, partial in partials.items():
+            _memo[(version, name)] = partial
+            _memo.move_to_end((version, name))
+        while len(_memo) > MAX_MEMO_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def append_aggregates(version, new_version, batch):
+    """Carry the aggregates memoized for version over to new_version, folding in batch.
+
+    batch holds the rows appended to get from one version to the other, so
+    the cost is proportional to the batch rather than the whole dataset.
+    """
+    with _memo_lock:
+        carried = {name: partial for (memo_version, name), partial in _memo.items() if memo_version == version}
+    if not carried:
+        return
+    batch_partials = partial_aggregates(batch, list(carried))
+    _remember(new_version, merge_partials(carried, batch_partials))
@@ -0,0 +1,197 @@
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# A materialized cube of the categorical dimensions most charts group by. Each
+# cell is one observed combination of dimension values and holds the row count
+# plus, per measure, the non-missing count, sum and sum of squares. Grouped
+# counts, means and variances over any subset of the dimensions are rollups of
+# the cells, so their cost depends on the number of cells (bounded by the
+# product of the dimension sizes), not on the number of rows.
+DIMENSIONS = (
+    'Category', 'Gender', 'Season', 'Payment Method', 'Preferred Payment Method', 'Subscription Status',
+    'Shipping Type', 'Size', 'Discount Applied', 'Promo Code Used', 'Frequency of Purchases',
+)
+MEASURES = ('Purchase Amount (USD)', 'Review Rating', 'Age')
+
+# Up to this many possible cells the base cuboid is counted densely in one
+# bincount; larger dimension spaces are grouped by sorting the cell codes
+MAX_DENSE_CELLS = 1 << 22
+
+# Cell codes are int64 mixed-radix numbers, so the product of the dimension
+# sizes must fit in one; past that there is no cube and rows are grouped per aggregate
+MAX_CELL_CODES = np.iinfo(np.int64).max
+
+MAX_CUBES = 4
+_cubes = OrderedDict()
+_lock = threading.Lock()
+
+
+class Cube:
+    """Count, sum and sum of squares per observed combination of dimension values."""
+
+    def __init__(self, dimensions, uniques, sizes, codes, count, measures):
+        self.dimensions = tuple(dimensions)
+        # Per dimension: the sorted distinct values, and each cell's position in them. A dimension
+        # with missing values has one more code, len(values), for them.
+        self.uniques = list(uniques)
+        self.sizes = list(sizes)
+        self.codes = codes
+        self.count = count
+        # measure -> (non-missing count, sum, sum of squares), one entry per cell
+        self.measures = measures
+
+    @property
+    def cells(self):
+        return len(self.count)
+
+    def covers(self, by, values=()):
+        return all(column in self.dimensions for column in by) and all(value in self.measures for value in values)
+
+    def _groups(self, by):
+        # Flat group number of every cell, the group count, and the sizes of the grouped dimensions
+        axes = [self.dimensions.index(column) for column in by]
+        sizes = [self.sizes[axis] for axis in axes]
+        flat = np.zeros(self.cells, dtype=np.int64)
+        for axis, size in zip(axes, sizes):
+            flat *= size
+            flat += self.codes[:, axis]
+        return axes, sizes, flat, int(np.prod(sizes))
+
+    def _index(self, by, axes, sizes, groups):
+        positions = np.unravel_index(groups, sizes)
+        levels = [self.uniques[axis].take(position) for axis, position in zip(axes, positions)]
+        if len(by) == 1:
+            return pd.Index(levels[0], name=by[0])
+        return pd.MultiIndex.from_arrays(levels, names=list(by))
+
+    def rollup(self, by, values=()):
+        """Group the cells by the by dimensions, like df.groupby(list(by), sort=True, observed=True).
+
+        Returns a DataFrame indexed by the observed group keys with a 'size'
+        column and, for each measure in values, the columns (value, 'count'),
+        (value, 'sum') and (value, 'sumsq'). Cells missing any by value are left out.
+        """
+        axes, sizes, flat, n_groups = self._groups(by)
+        size = np.bincount(flat, weights=self.count, minlength=n_groups)
+        groups = np.flatnonzero(size)
+        # Drop groups keyed on a missing value, which groupby leaves out too
+        positions = np.unravel_index(groups, sizes)
+        keep = np.ones(len(groups), dtype=bool)
+        for position, axis in zip(positions, axes):
+            keep &= position < len(self.uniques[axis])
+        groups = groups[keep]
+
+        columns = {('size', ''): size[groups].astype(np.int64)}
+        for value in values:
+            count, total, squares = self.measures[value]
+            columns[(value, 'count')] = np.bincount(flat, weights=count, minlength=n_groups)[groups].astype(np.int64)
+            columns[(value, 'sum')] = np.bincount(flat, weights=total, minlength=n_groups)[groups]
+            columns[(value, 'sumsq')] = np.bincount(flat, weights=squares, minlength=n_groups)[groups]
+        result = pd.DataFrame(columns, index=self._index(by, axes, sizes, groups))
+        result.columns = pd.MultiIndex.from_tuples(list(columns))
+        return result
+
+    def counts(self, by):
+        """Rows per group, like groupby(...).size()."""
+        return self.rollup(by)['size', ''].rename(None)
+
+    def stats(self, by, value):
+        """count, sum, mean and (sample) std of value per group, like groupby(...)[value].agg([...])."""
+        rolled = self.rollup(by, [value])[value]
+        count, total, squares = rolled['count'], rolled['sum'], rolled['sumsq']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            variance = (squares - count * mean ** 2) / (count - 1)
+        return pd.DataFrame({'count': count, 'sum': total, 'mean': mean,
+                             'std': np.sqrt(np.clip(variance, 0, None))})
+
+
+def _factorize(series):
+    # (codes, sorted distinct values) like pd.factorize(sort=True); categoricals reuse their own codes
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), pd.CategoricalIndex(series.cat.categories, dtype=series.dtype)
+    return pd.factorize(series, sort=True)
+
+
+def build_cube(df, dimensions=DIMENSIONS, measures=MEASURES):
+    """Aggregate df into a Cube over the dimensions and measures it has, in one pass per column.
+
+    Returns None when the product of the dimension sizes does not fit in an
+    int64 cell code.
+    """
+    dimensions = [column for column in dimensions if column in df.columns]
+    measures = [column for column in measures if column in df.columns]
+
+    uniques, sizes, column_codes = [], [], []
+    for column in dimensions:
+        codes, values = _factorize(df[column])
+        missing = codes < 0
+        if missing.any():
+            # Missing values get their own code after the real ones
+            codes = np.where(missing, len(values), codes)
+        uniques.append(values)
+        sizes.append(len(values) + int(missing.any()))
+        column_codes.append(codes)
+
+    # Exact integer product: a float or int64 one could round or wrap past the limit
+    possible = math.prod(sizes)
+    if possible > MAX_CELL_CODES:
+        return None
+    flat = np.zeros(len(df), dtype=np.int64)
+    for size, codes in zip(sizes, column_codes):
+        flat *= size
+        flat += codes
+
+    if possible <= MAX_DENSE_CELLS:
+        occupied = np.bincount(flat, minlength=possible)
+        cells = np.flatnonzero(occupied)
+        # Dense lookup from cell code to cell number, cheaper than searching the sorted cells per row
+        slots = np.zeros(possible, dtype=np.int64)
+        slots[cells] = np.arange(len(cells))
+        cell_of_row = slots[flat]
+    else:
+        cells, cell_of_row = np.unique(flat, return_inverse=True)
+
+    def per_cell(weights=None):
+        return np.bincount(cell_of_row, weights=weights, minlength=len(cells))
+
+    codes = np.empty((len(cells), len(dimensions)), dtype=np.int32)
+    remaining = cells
+    for axis in range(len(dimensions) - 1, -1, -1):
+        remaining, codes[:, axis] = np.divmod(remaining, sizes[axis])
+
+    cube_measures = {}
+    for column in measures:
+        values = df[column].to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        cube_measures[column] = (per_cell(present.astype(float)), per_cell(filled), per_cell(filled * filled))
+    return Cube(dimensions, uniques, sizes, codes, per_cell().astype(float), cube_measures)
+
+
+def get_cube(df, version):
+    """Return the cube of df, built once per dataset version and kept for the most recent versions.
+
+    None (remembered like a cube) means df's dimensions are too many or too
+    large for one; callers then group the rows themselves.
+    """
+    with _lock:
+        if version in _cubes:
+            _cubes.move_to_end(version)
+            return _cubes[version]
+    # Built outside the lock; concurrent first requests for a version may build it twice
+    cube = build_cube(df)
+    with _lock:
+        _cubes[version] = cube
+        _cubes.move_to_end(version)
+        while len(_cubes) > MAX_CUBES:
+            _cubes.popitem(last=False)
+    return cube
+
+
+def clear_cubes():
+    with _lock:
+        _cubes.clear()
@@ -0,0 +1,50 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Charts that draw one marker per row switch to a density view or a sample
+# above this many rows, so their render time and PNG size stop growing with the data
+MAX_POINTS = int(os.environ.get('SCATTER_MAX_POINTS', 20_000))
+DENSITY_GRIDSIZE = 50
+
+
+def too_many_points(df):
+    return len(df) > MAX_POINTS
+
+
+def sample_points(df, by=None, n=MAX_POINTS, seed=0):
+    """Return about n rows of df, keeping row order.
+
+    With by, every group is sampled in proportion to its size (and keeps at
+    least one row), so small groups do not disappear from the plot.
+    """
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    if by is None:
+        return df.iloc[np.sort(rng.choice(len(df), size=n, replace=False))]
+
+    keys = pd.Series(rng.random(len(df)), index=df.index)
+    grouped = keys.groupby(df[by], observed=True)
+    rank = grouped.rank(method='first')
+    quota = np.maximum(1, np.round(grouped.transform('size') * n / len(df)))
+    return df[(rank <= quota).to_numpy()]
+
+
+def density(ax, x, y, cmap='viridis', gridsize=DENSITY_GRIDSIZE):
+    # 2-D binned replacement for a scatter plot: cost is one pass over the rows
+    mesh = ax.hexbin(x, y, gridsize=gridsize, cmap=cmap, mincnt=1)
+    ax.figure.colorbar(mesh, ax=ax, label='Rows')
+
+
+def label_mode(ax, text):
+    # State on the chart itself that it is not showing every row
+    ax.figure.text(0.99, 0.01, text, ha='right', va='bottom', fontsize=8, color='gray')
+
+
+def density_label(df):
+    return f'Density of {len(df):,} rows'
+
+
+def sample_label(sample, df):
+    return f'Sample of {len(sample):,} of {len(df):,} rows'
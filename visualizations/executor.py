@@ -0,0 +1,136 @@
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# RENDER_WORKERS=0 or 1 keeps rendering serial in the calling process
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Worker-side memo of prepared frames: (library, source) -> (version, frame), oldest dropped first
+MAX_PREPARED = 8
+_prepared = {}
+
+
+def _init_worker():
+    # Pay the backend and library import cost once per worker, not per chart
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    from visualizations import registry
+    registry.load_libraries()
+
+
+def _load_source(source):
+    from dataset import load_dataset
+    if isinstance(source, str):
+        return load_dataset(source)
+    # (path, filter): a filtered view, selected here from the worker's own mapping of the dataset
+    from visualizations.filters import parse_filter, filter_frame
+    path, text = source
+    df, version = load_dataset(path)
+    return filter_frame(df, version, parse_filter(text))
+
+
+def _worker_frame(library, source):
+    from visualizations import registry
+    prepare = registry.get_prepare(library)
+    if not isinstance(source, (str, tuple)):
+        return prepare(source) if prepare else source
+
+    df, version = _load_source(source)
+    if prepare is None:
+        return df
+    cached = _prepared.get((library, source))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    frame = prepare(df)
+    _prepared.pop((library, source), None)
+    _prepared[(library, source)] = (version, frame)
+    while len(_prepared) > MAX_PREPARED:
+        del _prepared[next(iter(_prepared))]
+    return frame
+
+
+def _render_in_worker(library, chart_id, source, aggs, options=None):
+    from visualizations import registry
+    from visualizations.rendering import render_png
+    chart = registry.get_chart(library, chart_id)
+    timings = {}
+    png = render_png(chart, _worker_frame(library, source), aggs, timings, options)
+    return chart_id, png, timings
+
+
+def get_pool():
+    global _pool
+    if RENDER_WORKERS < 2:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent may be a threaded web server
+            context = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=context,
+                                        initializer=_init_worker)
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown)
+
+
+def iter_render_parallel(library, tasks, source, options=None, on_error=None):
+    """Render the (chart_id, aggs) tasks of a library in worker processes.
+
+    Returns an iterator of (chart_id, png, timings) in completion order, where
+    timings holds the worker's draw and savefig seconds, or None when
+    there is no pool to use, so callers fall back to rendering serially.
+    source is a dataset path the workers load through their own dataset
+    cache, a (path, filter string) pair for a filtered view of it, or a
+    DataFrame to ship to them. options are the render options
+    every chart is encoded with. A chart that raises is passed to
+    on_error(chart_id, exception) and skipped, if on_error is given.
+    """
+    if len(tasks) < 2:
+        return None
+    pool = get_pool()
+    if pool is None:
+        return None
+    try:
+        futures = {pool.submit(_render_in_worker, library, chart_id, source, aggs, options): chart_id
+                   for chart_id, aggs in tasks}
+    except BrokenProcessPool:
+        shutdown()
+        return None
+    return _collect(futures, on_error)
+
+
+def _collect(futures, on_error=None):
+    try:
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(futures[future], e)
+    except BrokenProcessPool:
+        # A worker died mid-request: drop the pool so the next request starts a fresh one
+        shutdown()
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
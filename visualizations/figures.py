@@ -0,0 +1,71 @@
+import os
+import threading
+from contextlib import contextmanager
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Figures are built directly on the Agg canvas instead of through pyplot, so
+# nothing is registered in pyplot's global figure manager and renders on
+# different threads never share state. Cleared figures are kept per size and
+# reused, which skips rebuilding the figure, canvas and renderer each chart.
+FIGURE_POOL_SIZE = int(os.environ.get('FIGURE_POOL_SIZE', 4))
+
+
+class FigurePool:
+    """Reusable Agg figures, at most max_idle kept per figure size."""
+
+    def __init__(self, max_idle=FIGURE_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+
+    def acquire(self, figsize):
+        figsize = tuple(figsize)
+        with self._lock:
+            self.in_use += 1
+            idle = self._idle.get(figsize)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+            self.created += 1
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def release(self, fig):
+        # Drop everything drawn on it; a figure that cannot be cleared is simply not reused
+        with self._lock:
+            self.in_use -= 1
+        try:
+            fig.clear()
+        except Exception:
+            return
+        figsize = tuple(fig.get_size_inches())
+        with self._lock:
+            idle = self._idle.setdefault(figsize, [])
+            if len(idle) < self.max_idle:
+                idle.append(fig)
+
+    @contextmanager
+    def figure(self, figsize):
+        """Lend a blank figure of figsize inches for the block, clearing it afterwards even on error."""
+        fig = self.acquire(figsize)
+        try:
+            yield fig
+        finally:
+            self.release(fig)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'created': self.created,
+                'reused': self.reused,
+                'in_use': self.in_use,
+                'idle': sum(len(idle) for idle in self._idle.values()),
+            }
+
+
+figure_pool = FigurePool()
@@ -0,0 +1,222 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Views of the dataset restricted to a filter, written as 'Season:Fall,Winter;Age:20..40':
+# a categorical column keeps the rows holding any of the listed values, a numeric
+# column the rows within an inclusive range (either bound may be left out).
+# Filters are answered from bitmap indexes kept per dataset version: one packed
+# bitmap (a bit per row) per categorical value and range-encoded bitmaps for
+# numeric columns. Each filtered column gives a bitmap, the bitmaps are
+# intersected, and only the surviving rows are copied out.
+CATEGORICAL_FILTERS = ('Season', 'Category', 'Gender', 'Location', 'Size', 'Payment Method', 'Subscription Status')
+NUMERIC_FILTERS = ('Age', 'Purchase Amount (USD)', 'Review Rating')
+
+MAX_INDEXED_VERSIONS = 2
+MAX_FILTERED_VIEWS = 8
+
+# Indexes by (dataset version, rows) -> {column: index}, built lazily per column
+_indexes = OrderedDict()
+# Filtered frames by (dataset version, filter key) -> (frame, version)
+_views = OrderedDict()
+_lock = threading.Lock()
+
+
+def _number(column, text):
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f'{column} bounds must be numbers, got {text!r}')
+
+
+def parse_filter(text):
+    """Parse a filter string into canonical form, raising ValueError on bad input.
+
+    The result is a tuple of (column, condition) pairs sorted by column,
+    where condition is a tuple of values for a categorical column and a
+    (low, high) pair, None for an open bound, for a numeric one. An empty
+    string means no filter and gives an empty tuple.
+    """
+    conditions = {}
+    for clause in (text or '').split(';'):
+        if not clause.strip():
+            continue
+        column, separator, values = clause.partition(':')
+        column = column.strip()
+        if not separator or not values.strip():
+            raise ValueError(f'Filter clause {clause!r} must look like column:value[,value...] or column:low..high')
+        if column in conditions:
+            raise ValueError(f'{column} is filtered more than once')
+        if column in CATEGORICAL_FILTERS:
+            conditions[column] = tuple(sorted({value.strip() for value in values.split(',') if value.strip()}))
+        elif column in NUMERIC_FILTERS:
+            low, separator, high = values.partition('..')
+            if not separator:
+                raise ValueError(f'{column} takes a range such as {column}:20..40')
+            low = _number(column, low) if low.strip() else None
+            high = _number(column, high) if high.strip() else None
+            if low is not None and high is not None and low > high:
+                raise ValueError(f'{column} range is empty: {low:g} > {high:g}')
+            conditions[column] = (low, high)
+        else:
+            raise ValueError(f'Cannot filter on {column!r} (expected one of: '
+                             f'{", ".join(CATEGORICAL_FILTERS + NUMERIC_FILTERS)})')
+    return tuple(sorted(conditions.items()))
+
+
+def filter_key(filters):
+    """The canonical filter string for parsed filters, equal for equal filters."""
+    clauses = []
+    for column, condition in filters:
+        if column in NUMERIC_FILTERS:
+            low, high = ('' if bound is None else f'{bound:g}' for bound in condition)
+            clauses.append(f'{column}:{low}..{high}')
+        else:
+            clauses.append(f'{column}:{",".join(condition)}')
+    return ';'.join(clauses)
+
+
+class CategoryIndex:
+    """Packed row bitmaps of one column, one per distinct value, built the first time the value is asked for."""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, sort=True)
+        self.rows = len(codes)
+        self.values = [str(value) for value in uniques]
+        self._positions = {value: i for i, value in enumerate(self.values)}
+        self._codes = codes.astype(np.int16 if len(uniques) < 2 ** 15 else np.int32)
+        self._bitmaps = {}
+
+    def _value_bitmap(self, position):
+        bitmap = self._bitmaps.get(position)
+        if bitmap is None:
+            bitmap = self._bitmaps[position] = np.packbits(self._codes == position, bitorder='little')
+        return bitmap
+
+    def bitmap(self, values):
+        bits = np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        for value in values:
+            position = self._positions.get(value)
+            if position is not None:
+                bits |= self._value_bitmap(position)
+        return bits
+
+
+class RangeIndex:
+    """Range-encoded packed bitmaps of one numeric column: for a threshold t, the rows with value <= t.
+
+    A range is the difference of two of them. Thresholds snap to the
+    column's distinct values, so repeated and nearby ranges share bitmaps;
+    at most MAX_THRESHOLDS are kept per column.
+    """
+
+    MAX_THRESHOLDS = 64
+
+    def __init__(self, values):
+        self._values = np.asarray(values, dtype=float)
+        self.rows = len(self._values)
+        self._distinct = np.unique(self._values[~np.isnan(self._values)])
+        self._bitmaps = OrderedDict()
+
+    @property
+    def bounds(self):
+        return (float(self._distinct[0]), float(self._distinct[-1])) if len(self._distinct) else (None, None)
+
+    def _at_most(self, position):
+        # Rows holding one of the first position distinct values; NaN rows are never included
+        if position <= 0:
+            return np.zeros((self.rows + 7) // 8, dtype=np.uint8)
+        bitmap = self._bitmaps.get(position)
+        if bitmap is None:
+            bitmap = np.packbits(self._values <= self._distinct[position - 1], bitorder='little')
+            self._bitmaps[position] = bitmap
+            while len(self._bitmaps) > self.MAX_THRESHOLDS:
+                self._bitmaps.popitem(last=False)
+        else:
+            self._bitmaps.move_to_end(position)
+        return bitmap
+
+    def bitmap(self, bounds):
+        low, high = bounds
+        below = 0 if low is None else int(np.searchsorted(self._distinct, low, side='left'))
+        upto = len(self._distinct) if high is None else int(np.searchsorted(self._distinct, high, side='right'))
+        return self._at_most(upto) & ~self._at_most(below)
+
+
+def _build_index(df, column):
+    if column in NUMERIC_FILTERS:
+        return RangeIndex(df[column].to_numpy())
+    return CategoryIndex(df[column])
+
+
+def get_index(df, version, column):
+    """Return the index of column for this version of df, building it on first use."""
+    if version is None:
+        return _build_index(df, column)
+    key = (version, len(df))
+    with _lock:
+        indexes = _indexes.get(key)
+        if indexes is not None and column in indexes:
+            _indexes.move_to_end(key)
+            return indexes[column]
+    # Built outside the lock; two requests racing on a new version just build it twice
+    index = _build_index(df, column)
+    with _lock:
+        _indexes.setdefault(key, {})[column] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXED_VERSIONS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def select_rows(df, version, filters):
+    """Return the ascending row positions of df matching every filter."""
+    mask = None
+    for column, condition in filters:
+        bits = get_index(df, version, column).bitmap(condition)
+        if mask is None:
+            mask = bits
+        else:
+            mask &= bits
+    if mask is None:
+        return np.arange(len(df))
+    return np.flatnonzero(np.unpackbits(mask, count=len(df), bitorder='little'))
+
+
+def filter_frame(df, version, filters):
+    """Return (frame, version) for the rows of df matching filters.
+
+    The version of a filtered view extends the dataset version with the
+    filter, so charts, aggregates and specs derived from it are cached
+    separately. Recently used views are kept, so the image requests of one
+    filtered page share a single selection.
+    """
+    if not filters:
+        return df, version
+    key = filter_key(filters)
+    filtered_version = f'{version}|{key}' if version is not None else None
+    if version is not None:
+        with _lock:
+            view = _views.get((version, key))
+            if view is not None:
+                _views.move_to_end((version, key))
+                return view
+
+    frame = df.iloc[select_rows(df, version, filters)].reset_index(drop=True)
+    if version is not None:
+        with _lock:
+            _views[(version, key)] = (frame, filtered_version)
+            while len(_views) > MAX_FILTERED_VIEWS:
+                _views.popitem(last=False)
+    return frame, filtered_version
+
+
+def filter_options(df, version):
+    """The filterable columns of df: their values (categorical) or [min, max] (numeric)."""
+    return {
+        'categorical': {column: get_index(df, version, column).values
+                        for column in CATEGORICAL_FILTERS if column in df.columns},
+        'numeric': {column: list(get_index(df, version, column).bounds)
+                    for column in NUMERIC_FILTERS if column in df.columns},
+    }
@@ -0,0 +1,157 @@
+import io
+import os
+import numpy as np
+import matplotlib as mpl
+from PIL import Image
+
+# Render options are plain dicts, normalized so equal requests give equal cache
+# keys: 'format' (see FORMATS), 'dpi' and 'width' (pixels; sets the dpi from
+# the figure width, before the tight crop). The defaults (full-colour PNG at DEFAULT_DPI) normalize to
+# an empty dict, so they share cache entries with renders that pass no options.
+FORMATS = {
+    'png': 'image/png',
+    'png8': 'image/png',  # palette-quantized to 256 colours
+    'webp': 'image/webp',
+    'svg': 'image/svg+xml',
+}
+EXTENSIONS = {'png': 'png', 'png8': 'png', 'webp': 'webp', 'svg': 'svg'}
+
+DEFAULT_FORMAT = 'png'
+DEFAULT_DPI = 100
+MAX_DPI = 300
+MAX_WIDTH = 4000
+THUMBNAIL_WIDTH = int(os.environ.get('THUMBNAIL_WIDTH', 480))
+WEBP_QUALITY = int(os.environ.get('WEBP_QUALITY', 85))
+
+# Named sizes a request can ask for instead of a dpi or width
+SIZES = {'thumb': {'width': THUMBNAIL_WIDTH}}
+
+# Formats offered to clients that negotiate by Accept header, in order of preference
+NEGOTIABLE = ['image/webp', 'image/png', 'image/svg+xml']
+
+# Image.Quantize.FASTOCTREE in current Pillow, Image.FASTOCTREE in older releases
+FAST_OCTREE = 2
+
+
+def render_options(format=None, dpi=None, width=None, size=None):
+    """Validate and normalize render options, raising ValueError on bad values."""
+    if size is not None and size not in SIZES:
+        raise ValueError(f'Unknown size {size!r} (expected one of: {", ".join(SIZES)})')
+    options = dict(SIZES[size]) if size else {}
+    format = format or DEFAULT_FORMAT
+    if format not in FORMATS:
+        raise ValueError(f'Unknown format {format!r} (expected one of: {", ".join(FORMATS)})')
+    if format != DEFAULT_FORMAT:
+        options['format'] = format
+    if width is not None:
+        width = _integer('width', width)
+        if not 16 <= width <= MAX_WIDTH:
+            raise ValueError(f'width must be between 16 and {MAX_WIDTH} pixels')
+        options['width'] = width
+    elif dpi is not None:
+        dpi = _integer('dpi', dpi)
+        if not 10 <= dpi <= MAX_DPI:
+            raise ValueError(f'dpi must be between 10 and {MAX_DPI}')
+        if dpi != DEFAULT_DPI:
+            options['dpi'] = dpi
+    return options
+
+
+def _integer(name, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer, got {value!r}')
+
+
+def negotiate_format(accept_mimetypes):
+    """Pick the preferred format a client names in its Accept header (a werkzeug MIMEAccept), or None.
+
+    Only types listed explicitly count: a bare */* or image/* gets the default PNG.
+    """
+    listed = [value for value in NEGOTIABLE if any(value == accepted for accepted, _ in accept_mimetypes)]
+    mimetype = accept_mimetypes.best_match(listed) if listed else None
+    if mimetype is None:
+        return None
+    return next(name for name, value in FORMATS.items() if value == mimetype)
+
+
+def mimetype(options):
+    return FORMATS[(options or {}).get('format', DEFAULT_FORMAT)]
+
+
+def extension(options):
+    return EXTENSIONS[(options or {}).get('format', DEFAULT_FORMAT)]
+
+
+def figure_dpi(fig, options):
+    options = options or {}
+    if 'width' in options:
+        return options['width'] / fig.get_figwidth()
+    return options.get('dpi', DEFAULT_DPI)
+
+
+def encode_figure(fig, options=None):
+    """Encode a drawn figure as the image bytes options ask for."""
+    options = options or {}
+    format = options.get('format', DEFAULT_FORMAT)
+    if format == 'svg' or not options:
+        # Vector output, and the default full-size PNG exactly as it has always been drawn
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='svg' if format == 'svg' else 'png', bbox_inches='tight')
+        return buffer.getvalue()
+
+    image = _tight_image(fig, figure_dpi(fig, options))
+    if isinstance(image, bytes):
+        if format == DEFAULT_FORMAT:
+            return image
+        image = Image.open(io.BytesIO(image))
+    buffer = io.BytesIO()
+    if format == 'webp':
+        image.save(buffer, format='WEBP', quality=WEBP_QUALITY)
+    elif format == 'png8':
+        image.convert('RGB').quantize(colors=256, method=FAST_OCTREE).save(buffer, format='PNG')
+    else:
+        image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _tight_image(fig, dpi):
+    """Draw fig at dpi, cropped like savefig(bbox_inches='tight').
+
+    savefig lays the figure out twice for that: once to measure, once to
+    draw. Here it is drawn once and the canvas cropped to the measured box,
+    which gives the same picture. Returns a PIL image, or PNG bytes when
+    something (e.g. rotated tick labels) reaches past the canvas and the
+    figure has to be drawn again at the measured box after all.
+    """
+    pad = mpl.rcParams['savefig.pad_inches']
+    original_dpi = fig.dpi
+    fig.dpi = dpi
+    try:
+        fig.canvas.draw()
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer())
+        width, height = fig.get_size_inches()
+        if bbox.x0 >= 0 and bbox.y0 >= 0 and bbox.x1 <= width and bbox.y1 <= height:
+            return _crop(fig, bbox.padded(pad), dpi)
+    finally:
+        fig.dpi = original_dpi
+
+    # The box is known now, so savefig can skip its own measuring pass
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches=bbox.padded(pad))
+    return buffer.getvalue()
+
+
+def _crop(fig, bbox, dpi):
+    # Cut bbox (in inches) out of the drawn canvas; padding that falls past the
+    # canvas edge is filled with the figure background, as savefig would draw it
+    pixels = np.asarray(fig.canvas.buffer_rgba())
+    rows, columns = pixels.shape[:2]
+    left, right = int(round(bbox.x0 * dpi)), int(round(bbox.x1 * dpi))
+    top, bottom = rows - int(round(bbox.y1 * dpi)), rows - int(round(bbox.y0 * dpi))
+    background = tuple(int(round(channel * 255)) for channel in mpl.colors.to_rgba(fig.get_facecolor()))
+    image = Image.new('RGBA', (right - left, bottom - top), background)
+    visible = pixels[max(top, 0):min(bottom, rows), max(left, 0):min(right, columns)]
+    image.paste(Image.fromarray(np.ascontiguousarray(visible)), (max(-left, 0), max(-top, 0)))
+    return image
@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from visualizations.metrics import metrics, start_trace, finish_trace
+
+# Render work runs on a bounded pool of background threads instead of the
+# request threads. Jobs are keyed by what they render (library, mode, dataset
+# version, filter, options): a request for a job that is already queued,
+# running or recently finished attaches to it instead of rendering again, so a
+# burst of identical requests costs one render.
+RENDER_JOB_WORKERS = int(os.environ.get('RENDER_JOB_WORKERS', 2))
+# Jobs waiting for a worker; beyond this, new (uncoalesced) jobs are refused
+RENDER_QUEUE_MAX = int(os.environ.get('RENDER_QUEUE_MAX', 64))
+# Finished jobs stay available for polling and coalescing this long
+JOB_RETENTION_SECONDS = float(os.environ.get('JOB_RETENTION_SECONDS', 300))
+MAX_FINISHED_JOBS = 256
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+logger = logging.getLogger('dataviz.jobs')
+
+
+class QueueFull(Exception):
+    pass
+
+
+class RenderJob:
+    """One unit of render work and the items it has produced so far.
+
+    run(job) produces items by calling job.append(chart_id, payload), or
+    job.append(chart_id, error=message) for a chart that could not be drawn;
+    the job carries on with the others and such errors are kept in
+    job.errors by chart id. Readers poll with snapshot() or follow the job
+    with iter_items().
+    """
+
+    def __init__(self, key, run, info):
+        self.id = secrets.token_hex(8)
+        self.key = key
+        self.info = info
+        self.state = QUEUED
+        self.items = []
+        self.errors = {}
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self._run = run
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in (DONE, FAILED)
+
+    def append(self, chart_id, payload=None, error=None):
+        with self._changed:
+            if error is not None:
+                self.errors[chart_id] = error
+            self.items.append((chart_id, payload))
+            self._changed.notify_all()
+
+    def _finish(self, error=None):
+        with self._changed:
+            self.state = FAILED if error else DONE
+            self.error = error
+            self.finished = time.time()
+            self._changed.notify_all()
+
+    def snapshot(self, since=0):
+        """Return (state, items produced after the first since, error) in one consistent read."""
+        with self._changed:
+            return self.state, list(self.items[since:]), self.error
+
+    def wait(self, timeout=None):
+        with self._changed:
+            self._changed.wait_for(lambda: self.done, timeout)
+            return self.done
+
+    def iter_items(self):
+        """Yield (chart_id, payload) as the job produces them, until it finishes.
+
+        Raises RuntimeError with the job's error if it failed.
+        """
+        position = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: len(self.items) > position or self.done)
+                items = self.items[position:]
+                state, error = self.state, self.error
+            position += len(items)
+            yield from items
+            if state in (DONE, FAILED) and position == len(self.items):
+                if state == FAILED:
+                    raise RuntimeError(error)
+                return
+
+
+class JobQueue:
+    """Coalescing queue of render jobs served by a fixed number of threads."""
+
+    def __init__(self, workers=RENDER_JOB_WORKERS, max_queued=RENDER_QUEUE_MAX,
+                 retention=JOB_RETENTION_SECONDS):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render-job')
+        return self._executor
+
+    def submit(self, key, run, **info):
+        """Return (job, coalesced): the live job for key, or a new one queued to call run(job).
+
+        A job that failed is never reused. Raises QueueFull when a new job
+        would exceed the queue bound.
+        """
+        with self._lock:
+            self._prune()
+            job = self._by_key.get(key)
+            if job is not None and job.state != FAILED:
+                metrics.inc('dataviz_render_jobs_total', outcome='coalesced')
+                return job, True
+            queued = sum(1 for job in self._jobs.values() if job.state == QUEUED)
+            if queued >= self.max_queued:
+                metrics.inc('dataviz_render_jobs_total', outcome='rejected')
+                raise QueueFull(f'{queued} render jobs are already waiting')
+            job = RenderJob(key, run, info)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._get_executor().submit(self._execute, job)
+        metrics.inc('dataviz_render_jobs_total', outcome='submitted')
+        return job, False
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _execute(self, job):
+        with job._changed:
+            job.state = RUNNING
+        metrics.observe('dataviz_render_job_wait_seconds', time.time() - job.submitted)
+        # Each job is traced like a request, so its phases show up in TRACE_REQUESTS logs
+        trace = start_trace(job=job.id, **job.info)
+        try:
+            job._run(job)
+        except Exception as e:
+            logger.exception('Render job %s (%s) failed', job.id, job.info)
+            job._finish(str(e) or type(e).__name__)
+        else:
+            job._finish()
+        finally:
+            # run closes over the view's frame; a finished job kept for polling must not pin it
+            job._run = None
+        duration = finish_trace(trace, status=job.state)
+        metrics.observe('dataviz_render_job_seconds', duration, status=job.state)
+
+    def _prune(self):
+        # Drop finished jobs past their retention, and the oldest beyond MAX_FINISHED_JOBS
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.done]
+        expired = [job for job in finished if now - job.finished > self.retention]
+        expired += finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]
+        for job in expired:
+            self._jobs.pop(job.id, None)
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def stats(self):
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {state: states.count(state) for state in (QUEUED, RUNNING, DONE, FAILED)}
+
+
+render_jobs = JobQueue()
+
+
+def job_metrics():
+    for state, count in render_jobs.stats().items():
+        yield 'dataviz_render_jobs', {'state': state}, count
+
+
+metrics.add_collector(job_metrics)
+metrics.describe('dataviz_render_jobs_total', 'counter',
+                 'Render job requests by outcome: submitted, coalesced into a live job, or rejected.')
+metrics.describe('dataviz_render_jobs', 'gauge', 'Render jobs held by state.')
+metrics.describe('dataviz_render_job_wait_seconds', 'histogram', 'Time render jobs waited for a worker.')
+metrics.describe('dataviz_render_job_seconds', 'histogram', 'Time to run a render job.')
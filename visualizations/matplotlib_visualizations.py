@@ -1,136 +1,152 @@
-import matplotlib.pyplot as plt
 import pandas as pd
-import io
-import base64
 import numpy as np
+from visualizations.registry import chart, set_prepare
+from visualizations.rendering import render_charts
+from visualizations.decimation import too_many_points, density, label_mode, density_label
+
+
+def clean_data(df):
+    numeric_cols = [col for col in ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases'] if col in df.columns]
+    categorical_cols = [col for col in ['Category', 'Payment Method', 'Gender', 'Season', 'Subscription Status'] if col in df.columns]
+    critical_cols = [col for col in ['Age', 'Category', 'Purchase Amount (USD)', 'Payment Method', 'Review Rating'] if col in df.columns]
+
+    # Nothing to fill or drop: hand back the original frame, so no copy is made and
+    # aggregates computed for it are shared with the other libraries
+    if not df[sorted(set(numeric_cols + categorical_cols + critical_cols))].isna().any().any():
+        return df
 
-def generate_matplotlib_visualizations(df):
     # Clean data before visualization
     df_clean = df.copy()
-    
+
     # Fill missing numeric values with their respective means
-    numeric_cols = ['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases']
     for col in numeric_cols:
-        if col in df_clean.columns:
-            df_clean[col] = df_clean[col].fillna(df_clean[col].mean())
-    
+        df_clean[col] = df_clean[col].fillna(df_clean[col].mean())
+
     # Fill missing categorical values with their most frequent value
-    categorical_cols = ['Category', 'Payment Method', 'Gender', 'Season', 'Subscription Status']
     for col in categorical_cols:
-        if col in df_clean.columns:
-            df_clean[col] = df_clean[col].fillna(df_clean[col].mode()[0])
-    
+        df_clean[col] = df_clean[col].fillna(df_clean[col].mode()[0])
+
     # Drop any remaining rows with missing values in critical columns
-    critical_cols = ['Age', 'Category', 'Purchase Amount (USD)', 'Payment Method', 'Review Rating']
-    df_clean = df_clean.dropna(subset=[col for col in critical_cols if col in df_clean.columns])
-    
-    visualizations = []    
-    
-    # Visualization 1: Age Distribution
-    plt.figure(figsize=(10, 6))
-    plt.hist(df_clean['Age'].values, bins=20, edgecolor='black', color='skyblue')
-    plt.title('Age Distribution of Customers')
-    plt.xlabel('Age')
-    plt.ylabel('Count')
-    visualizations.append(save_plot_to_base64(plt, 'Age Distribution'))
-    plt.close()
-    
-    # Visualization 2: Purchase Amount by Category
-    plt.figure(figsize=(10, 6))
-    category_means = df_clean.groupby('Category')['Purchase Amount (USD)'].mean().sort_values()
+    df_clean = df_clean.dropna(subset=critical_cols)
+    return df_clean
+
+
+# Every matplotlib chart draws from the cleaned frame
+set_prepare('matplotlib', clean_data)
+
+
+# Visualization 1: Age Distribution
+@chart('matplotlib', 'age_distribution', 'Age Distribution', needs=['age_histogram'])
+def age_distribution(ax, df_clean, aggs):
+    counts, edges = aggs['age_histogram']
+    ax.hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', color='skyblue')
+    ax.set_title('Age Distribution of Customers')
+    ax.set_xlabel('Age')
+    ax.set_ylabel('Count')
+
+
+# Visualization 2: Purchase Amount by Category
+@chart('matplotlib', 'purchase_amount_by_category', 'Purchase Amount by Category',
+       needs=['purchase_mean_by_category'])
+def purchase_amount_by_category(ax, df_clean, aggs):
+    category_means = aggs['purchase_mean_by_category'].sort_values()
     categories = category_means.index
-    means = category_means.values 
-    plt.barh(categories, means, color='skyblue', edgecolor='black')
-    plt.title('Average Purchase Amount by Category')
-    plt.xlabel('Average Purchase Amount (USD)')
-    plt.ylabel('Category')
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Category'))
-    plt.close()
-    
-    # Visualization 3: Payment Method Distribution
-    plt.figure(figsize=(8, 6))
-    payment_counts = df_clean['Payment Method'].value_counts()
-    plt.pie(payment_counts, labels=payment_counts.index, autopct='%1.1f%%')
-    plt.title('Payment Method Distribution')
-    visualizations.append(save_plot_to_base64(plt, 'Payment Method Distribution'))
-    plt.close()
-    
-    # Visualization 4: Purchase Amount vs. Review Rating
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df_clean['Purchase Amount (USD)'], df_clean['Review Rating'], alpha=0.5)
-    plt.title('Purchase Amount vs. Review Rating')
-    plt.xlabel('Purchase Amount (USD)')
-    plt.ylabel('Review Rating')
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount vs Review Rating'))
-    plt.close()
-    
-    # NEW Visualization 5: Gender Distribution
-    plt.figure(figsize=(8, 6))
-    gender_counts = df_clean['Gender'].value_counts()
-    plt.bar(gender_counts.index, gender_counts.values, color=['skyblue', 'lightcoral'])
-    plt.title('Gender Distribution of Customers')
-    plt.xlabel('Gender')
-    plt.ylabel('Count')
-    visualizations.append(save_plot_to_base64(plt, 'Gender Distribution'))
-    plt.close()
-    
-    # NEW Visualization 6: Seasonal Purchase Trends
-    plt.figure(figsize=(10, 6))
-    season_means = df_clean.groupby('Season')['Purchase Amount (USD)'].mean()
+    means = category_means.values
+    ax.barh(categories, means, color='skyblue', edgecolor='black')
+    ax.set_title('Average Purchase Amount by Category')
+    ax.set_xlabel('Average Purchase Amount (USD)')
+    ax.set_ylabel('Category')
+
+
+# Visualization 3: Payment Method Distribution
+@chart('matplotlib', 'payment_method_distribution', 'Payment Method Distribution',
+       needs=['count_by_payment_method'], figsize=(8, 6))
+def payment_method_distribution(ax, df_clean, aggs):
+    payment_counts = aggs['count_by_payment_method'].sort_values(ascending=False)
+    ax.pie(payment_counts, labels=payment_counts.index, autopct='%1.1f%%')
+    ax.set_title('Payment Method Distribution')
+
+
+# Visualization 4: Purchase Amount vs. Review Rating
+@chart('matplotlib', 'purchase_amount_vs_review_rating', 'Purchase Amount vs Review Rating',
+       columns=['Purchase Amount (USD)', 'Review Rating'])
+def purchase_amount_vs_review_rating(ax, df_clean):
+    if too_many_points(df_clean):
+        density(ax, df_clean['Purchase Amount (USD)'], df_clean['Review Rating'], cmap='Blues')
+        label_mode(ax, density_label(df_clean))
+    else:
+        ax.scatter(df_clean['Purchase Amount (USD)'], df_clean['Review Rating'], alpha=0.5)
+    ax.set_title('Purchase Amount vs. Review Rating')
+    ax.set_xlabel('Purchase Amount (USD)')
+    ax.set_ylabel('Review Rating')
+
+
+# NEW Visualization 5: Gender Distribution
+@chart('matplotlib', 'gender_distribution', 'Gender Distribution', needs=['count_by_gender'], figsize=(8, 6))
+def gender_distribution(ax, df_clean, aggs):
+    gender_counts = aggs['count_by_gender'].sort_values(ascending=False)
+    ax.bar(gender_counts.index, gender_counts.values, color=['skyblue', 'lightcoral'])
+    ax.set_title('Gender Distribution of Customers')
+    ax.set_xlabel('Gender')
+    ax.set_ylabel('Count')
+
+
+# NEW Visualization 6: Seasonal Purchase Trends
+@chart('matplotlib', 'seasonal_purchase_trends', 'Seasonal Purchase Trends', needs=['purchase_mean_by_season'])
+def seasonal_purchase_trends(ax, df_clean, aggs):
+    season_means = aggs['purchase_mean_by_season']
     seasons = ['Winter', 'Spring', 'Summer', 'Fall']
     season_means = season_means.reindex(seasons, fill_value=0)  # Ensure all seasons are included
-    plt.plot(season_means.index, season_means.values, marker='o', color='green')
-    plt.title('Average Purchase Amount by Season')
-    plt.xlabel('Season')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.grid(True)
-    visualizations.append(save_plot_to_base64(plt, 'Seasonal Purchase Trends'))
-    plt.close()
-    
-    # NEW Visualization 7: Previous Purchases vs Age
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df_clean['Age'], df_clean['Previous Purchases'], alpha=0.6, color='purple')
-    plt.title('Previous Purchases by Age')
-    plt.xlabel('Age')
-    plt.ylabel('Number of Previous Purchases')
-    plt.grid(True)
-    visualizations.append(save_plot_to_base64(plt, 'Previous Purchases by Age'))
-    plt.close()
-    
-    # NEW Visualization 8: Subscription Status Impact on Purchase Amount
-    plt.figure(figsize=(8, 6))
-    subscription_means = df_clean.groupby('Subscription Status')['Purchase Amount (USD)'].mean()
-    subscription_means.plot(kind='bar', color=['lightgreen', 'salmon'])
-    plt.title('Average Purchase Amount by Subscription Status')
-    plt.xlabel('Subscription Status')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=0)
-    visualizations.append(save_plot_to_base64(plt, 'Subscription Impact on Purchases'))
-    plt.close()
-    
-    # NEW Visualization 9: Frequency of Purchases Distribution
-    plt.figure(figsize=(10, 6))
-    freq_counts = df_clean['Frequency of Purchases'].value_counts()
-    freq_counts.plot(kind='bar', color='teal')
-    plt.title('Frequency of Purchases Distribution')
-    plt.xlabel('Purchase Frequency')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Frequency Distribution'))
-    plt.close()
-    
-    
+    ax.plot(season_means.index, season_means.values, marker='o', color='green')
+    ax.set_title('Average Purchase Amount by Season')
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.grid(True)
+
+
+# NEW Visualization 7: Previous Purchases vs Age
+@chart('matplotlib', 'previous_purchases_by_age', 'Previous Purchases by Age', columns=['Age', 'Previous Purchases'])
+def previous_purchases_by_age(ax, df_clean):
+    if too_many_points(df_clean):
+        density(ax, df_clean['Age'], df_clean['Previous Purchases'], cmap='Purples')
+        label_mode(ax, density_label(df_clean))
+    else:
+        ax.scatter(df_clean['Age'], df_clean['Previous Purchases'], alpha=0.6, color='purple')
+    ax.set_title('Previous Purchases by Age')
+    ax.set_xlabel('Age')
+    ax.set_ylabel('Number of Previous Purchases')
+    ax.grid(True)
+
+
+# NEW Visualization 8: Subscription Status Impact on Purchase Amount
+@chart('matplotlib', 'subscription_impact_on_purchases', 'Subscription Impact on Purchases',
+       needs=['purchase_mean_by_subscription'], figsize=(8, 6))
+def subscription_impact_on_purchases(ax, df_clean, aggs):
+    subscription_means = aggs['purchase_mean_by_subscription']
+    subscription_means.plot(kind='bar', color=['lightgreen', 'salmon'], ax=ax)
+    ax.set_title('Average Purchase Amount by Subscription Status')
+    ax.set_xlabel('Subscription Status')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=0)
+
+
+# NEW Visualization 9: Frequency of Purchases Distribution
+@chart('matplotlib', 'purchase_frequency_distribution', 'Purchase Frequency Distribution',
+       needs=['count_by_frequency'])
+def purchase_frequency_distribution(ax, df_clean, aggs):
+    freq_counts = aggs['count_by_frequency'].sort_values(ascending=False)
+    freq_counts.plot(kind='bar', color='teal', ax=ax)
+    ax.set_title('Frequency of Purchases Distribution')
+    ax.set_xlabel('Purchase Frequency')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def generate_matplotlib_visualizations(df, version=None, source=None, options=None, chart_ids=None, aggregates=None):
+    visualizations = render_charts('matplotlib', df, version=version, options=options, source=source, chart_ids=chart_ids,
+                                   aggregates=aggregates)
+
     return {
         'library': 'matplotlib',
         'visualizations': visualizations
     }
-
-def save_plot_to_base64(plt, title):
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    return {
-        'title': title,
-        'image': f'data:image/png;base64,{image_base64}'
-    }
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Process-local request metrics, exposed in the Prometheus text format. With
+# several WSGI worker processes each one reports its own series, so scrape
+# them per worker or sum them in the query.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# TRACE_REQUESTS=1 logs one JSON line per request with every span it recorded
+TRACE_REQUESTS = os.environ.get('TRACE_REQUESTS') == '1'
+
+trace_logger = logging.getLogger('dataviz.trace')
+if TRACE_REQUESTS and not trace_logger.handlers:
+    trace_logger.addHandler(logging.StreamHandler())
+    trace_logger.setLevel(logging.INFO)
+
+# Spans of the request being handled in this context, or None outside of a traced request
+_trace = contextvars.ContextVar('trace', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Thread-safe counters and duration histograms keyed by name and labels."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        self._descriptions[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+    def add_collector(self, collect):
+        """Register collect() -> iterable of (name, labels dict, value), read at scrape time.
+
+        Used for values owned elsewhere, such as cache statistics or open figures.
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        samples = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                samples.setdefault(name, []).append((name, labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                lines = samples.setdefault(name, [])
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    lines.append((name + '_bucket', labels + (('le', _format_value(float(bound))),), count))
+                lines.append((name + '_bucket', labels + (('le', '+Inf'),), histogram['count']))
+                lines.append((name + '_sum', labels, histogram['sum']))
+                lines.append((name + '_count', labels, histogram['count']))
+        for collect in self._collectors:
+            for name, labels, value in collect():
+                samples.setdefault(name, []).append((name, tuple(sorted(labels.items())), value))
+
+        output = []
+        for name in sorted(samples):
+            kind, help_text = self._descriptions.get(name, ('untyped', ''))
+            output.append(f'# HELP {name} {help_text}')
+            output.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples[name]:
+                output.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(output) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = Metrics()
+metrics.describe('dataviz_phase_seconds', 'histogram',
+                 'Time spent per request phase (load, filter, clean, aggregate, render, encode, spec).')
+metrics.describe('dataviz_chart_render_seconds', 'histogram', 'Time to draw and encode one chart.')
+metrics.describe('dataviz_requests_total', 'counter', 'HTTP requests by endpoint and status.')
+metrics.describe('dataviz_request_seconds', 'histogram', 'HTTP request duration by endpoint.')
+metrics.describe('dataviz_response_bytes_total', 'counter', 'Response body bytes served by endpoint.')
+
+
+def record_span(phase, seconds, **labels):
+    metrics.observe('dataviz_phase_seconds', seconds, phase=phase)
+    trace = _trace.get()
+    if trace is not None:
+        trace['spans'].append({'phase': phase, 'ms': round(seconds * 1000, 3), **labels})
+
+
+@contextmanager
+def span(phase, **labels):
+    """Time the block as one occurrence of phase; labels only go to the request trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(phase, time.perf_counter() - start, **labels)
+
+
+def record_chart(library, chart_id, timings):
+    # timings holds the draw and savefig seconds measured where the chart was rendered
+    record_span('render', timings['draw'], library=library, chart=chart_id)
+    record_span('encode', timings['savefig'], library=library, chart=chart_id)
+    metrics.observe('dataviz_chart_render_seconds', timings['draw'] + timings['savefig'],
+                    library=library, chart=chart_id)
+
+
+def start_trace(**fields):
+    """Begin collecting spans for the current request; returns the trace to pass to finish_trace."""
+    trace = {'fields': fields, 'spans': [], 'start': time.perf_counter()}
+    trace['token'] = _trace.set(trace)
+    return trace
+
+
+def finish_trace(trace, **fields):
+    """Stop collecting spans for trace and return its total duration in seconds.
+
+    When TRACE_REQUESTS is set, the trace is logged as one JSON line.
+    """
+    duration = time.perf_counter() - trace['start']
+    try:
+        _trace.reset(trace['token'])
+    except ValueError:
+        # Finished from another context, e.g. after a streamed response was sent
+        pass
+    if TRACE_REQUESTS:
+        record = {**trace['fields'], **fields, 'ms': round(duration * 1000, 3), 'spans': trace['spans']}
+        trace_logger.info(json.dumps(record))
+    return duration
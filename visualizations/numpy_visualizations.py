@@ -1,134 +1,192 @@
 import numpy as np
 import seaborn as sns
-import matplotlib.pyplot as plt
-import io
-import base64
-
-def generate_numpy_visualizations(df):
-    visualizations = []
-    
-     # Convert relevant columns to NumPy arrays
-    payment_methods = np.array(df['Preferred Payment Method'])
-    ages = np.array(df['Age'])
-    purchase_amounts = np.array(df['Purchase Amount (USD)'])
+from visualizations.registry import chart, chart_spec
+from visualizations.rendering import render_charts
+from visualizations import specs
+
+# Each chart's series are computed once by a helper shared by its matplotlib
+# drawing and its client-side spec, so both always show the same numbers.
+
+
+# Visualization 1: Average Age by Payment Method
+def payment_method_ages(aggs):
+    mean_ages = aggs['age_mean_by_preferred_payment_method']
+    return np.array(mean_ages.index), mean_ages.to_numpy()
+
+
+@chart('numpy', 'average_age_by_payment_method', 'Average Age by Payment Method',
+       needs=['age_mean_by_preferred_payment_method'])
+def average_age_by_payment_method(ax, df, aggs):
+    unique_methods, mean_ages = payment_method_ages(aggs)
+
+    ax.bar(unique_methods, mean_ages, color=['skyblue', 'lightgreen', 'salmon'])
+    ax.set_title('Average Age by Payment Method (NumPy)')
+    ax.set_xlabel('Payment Method')
+    ax.set_ylabel('Average Age')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+@chart_spec('numpy', 'average_age_by_payment_method')
+def average_age_by_payment_method_spec(df, aggs):
+    unique_methods, mean_ages = payment_method_ages(aggs)
+    colors = ['skyblue', 'lightgreen', 'salmon']
+    return specs.figure(
+        [specs.bar(unique_methods, mean_ages, color=[colors[i % len(colors)] for i in range(len(unique_methods))])],
+        'Average Age by Payment Method', 'Payment Method', 'Average Age'
+    )
+
+
+# Visualization 2: Average Purchase Amount by Category
+@chart('numpy', 'average_purchase_by_category', 'Average Purchase Amount by Category',
+       needs=['purchase_mean_by_category'])
+def average_purchase_by_category(ax, df, aggs):
+    category_means = aggs['purchase_mean_by_category']
+    categories = np.array(category_means.index)
+    avg_purchase = category_means.to_numpy()
+
+    ax.bar(categories, avg_purchase, color='lightblue')
+    ax.set_title('Average Purchase Amount by Category (NumPy)')
+    ax.set_xlabel('Category')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+@chart_spec('numpy', 'average_purchase_by_category')
+def average_purchase_by_category_spec(df, aggs):
+    category_means = aggs['purchase_mean_by_category']
+    return specs.figure(
+        [specs.bar(np.array(category_means.index), category_means.to_numpy(), color='lightblue')],
+        'Average Purchase Amount by Category', 'Category', 'Average Purchase Amount (USD)'
+    )
+
+
+# Visualization 3: Discount Application by Category
+def discount_counts_by_category(aggs):
+    # Columns: [no discount, discount applied]
+    counts = aggs['count_by_category_discount'].unstack(fill_value=0)
+    counts = counts.reindex(columns=['No', 'Yes'], fill_value=0)
+    return np.array(counts.index), counts.to_numpy()
+
+
+@chart('numpy', 'discount_application_by_category', 'Discount Application by Category',
+       needs=['count_by_category_discount'])
+def discount_application_by_category(ax, df, aggs):
+    categories_with_discount, discount_counts = discount_counts_by_category(aggs)
+
+    ax.bar(categories_with_discount, discount_counts[:, 0], color='salmon', label='No Discount')
+    ax.bar(categories_with_discount, discount_counts[:, 1], bottom=discount_counts[:, 0], color='lightgreen', label='Discount Applied')
+    ax.set_title('Discount Application by Category (NumPy)')
+    ax.set_xlabel('Category')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend(title='Discount Applied?')
+
+
+@chart_spec('numpy', 'discount_application_by_category')
+def discount_application_by_category_spec(df, aggs):
+    categories_with_discount, discount_counts = discount_counts_by_category(aggs)
+    return specs.figure(
+        [specs.bar(categories_with_discount, discount_counts[:, 0], color='salmon', name='No Discount'),
+         specs.bar(categories_with_discount, discount_counts[:, 1], color='lightgreen', name='Discount Applied')],
+        'Discount Application by Category', 'Category', 'Count', legend_title='Discount Applied?', barmode='stack'
+    )
+
+
+# Visualization 4: Review Rating Distribution
+@chart('numpy', 'review_ratings', 'Review Ratings', needs=['review_rating_histogram'], columns=['Review Rating'])
+def review_ratings(ax, df, aggs):
     review_ratings = np.array(df['Review Rating'])
-    frequencies = np.array(df['Frequency of Purchases'])
-    genders = np.array(df['Gender'])
-    seasons = np.array(df['Season'])
-    discount_applied = np.array(df['Discount Applied'])
-    
-    # Visualization 1: Average Age by Payment Method
-    unique_methods = np.unique(payment_methods)
-    mean_ages = np.zeros(len(unique_methods))
-    for i, method in enumerate(unique_methods):
-        mean_ages[i] = np.mean(ages[payment_methods == method])
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(unique_methods, mean_ages, color=['skyblue', 'lightgreen', 'salmon'])
-    plt.title('Average Age by Payment Method (NumPy)')
-    plt.xlabel('Payment Method')
-    plt.ylabel('Average Age')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Average Age by Payment Method'))
-    plt.close()
-    
-    # Visualization 2: Average Purchase Amount by Category
-    categories = np.unique(df['Category'])
-    avg_purchase = np.zeros(len(categories))
-    for i, category in enumerate(categories):
-        avg_purchase[i] = np.mean(purchase_amounts[df['Category'] == category])
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(categories, avg_purchase, color='lightblue')
-    plt.title('Average Purchase Amount by Category (NumPy)')
-    plt.xlabel('Category')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Average Purchase Amount by Category'))
-    plt.close()
-    
-    # Visualization 3: Discount Application by Category
-    categories_with_discount = np.unique(df['Category'])
-    discount_counts = np.zeros((len(categories_with_discount), 2))
-    discount_applied = df['Discount Applied'].astype(bool).values
-
-    for i, category in enumerate(categories_with_discount):
-        for j, discount in enumerate([False, True]):
-            count = np.sum((df['Category'] == category) & (discount_applied == discount))
-            discount_counts[i, j] = count
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(categories_with_discount, discount_counts[:, 0], color='salmon', label='No Discount')
-    plt.bar(categories_with_discount, discount_counts[:, 1], bottom=discount_counts[:, 0], color='lightgreen', label='Discount Applied')
-    plt.title('Discount Application by Category (NumPy)')
-    plt.xlabel('Category')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.legend(title='Discount Applied?')
-    visualizations.append(save_plot_to_base64(plt, 'Discount Application by Category'))
-    plt.close()
-    
-    # Visualization 4: Review Rating Distribution
     avg_rating = np.mean(review_ratings)
+    counts, edges = aggs['review_rating_histogram']
+
+    ax.hist(edges[:-1], bins=edges, weights=counts, color='skyblue', edgecolor='white')
+    ax.axvline(avg_rating, color='red', linestyle='--', label=f'Average: {avg_rating:.1f}')
+
+    ax.set_title('Customer Review Ratings Distribution (NumPy)')
+    ax.set_xlabel('Rating (1-5 stars)')
+    ax.set_ylabel('Number of Reviews')
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+
+
+@chart_spec('numpy', 'review_ratings')
+def review_ratings_spec(df, aggs):
+    avg_rating = float(np.mean(np.array(df['Review Rating'])))
+    counts, edges = aggs['review_rating_histogram']
+    histogram = specs.histogram_bars(counts, edges, color='skyblue')
+    histogram.update(name='Reviews', showlegend=False)
+    return specs.figure(
+        [histogram,
+         specs.line([avg_rating, avg_rating], [0, int(counts.max()) if len(counts) else 0], color='red', dash='dash',
+                    name=f'Average: {avg_rating:.1f}')],
+        'Customer Review Ratings Distribution', 'Rating (1-5 stars)', 'Number of Reviews', bargap=0
+    )
+
+
+# Visualization 5: Purchase Frequency by Gender
+def frequency_counts_by_gender(aggs):
+    # Columns: [Male, Female]
+    counts = aggs['count_by_frequency_gender'].unstack(fill_value=0)
+    counts = counts.reindex(columns=['Male', 'Female'], fill_value=0)
+    return np.array(counts.index), counts.to_numpy()
+
+
+@chart('numpy', 'purchase_frequency_by_gender', 'Purchase Frequency by Gender',
+       needs=['count_by_frequency_gender'])
+def purchase_frequency_by_gender(ax, df, aggs):
+    unique_frequencies, counts_by_gender = frequency_counts_by_gender(aggs)
+
+    ax.bar(unique_frequencies, counts_by_gender[:, 0], color='lightpink', label='Male')
+    ax.bar(unique_frequencies, counts_by_gender[:, 1], bottom=counts_by_gender[:, 0], color='lightblue', label='Female')
+    ax.set_title('Purchase Frequency by Gender (NumPy)')
+    ax.set_xlabel('Frequency of Purchases')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend(title='Gender')
+
+
+@chart_spec('numpy', 'purchase_frequency_by_gender')
+def purchase_frequency_by_gender_spec(df, aggs):
+    unique_frequencies, counts_by_gender = frequency_counts_by_gender(aggs)
+    return specs.figure(
+        [specs.bar(unique_frequencies, counts_by_gender[:, 0], color='lightpink', name='Male'),
+         specs.bar(unique_frequencies, counts_by_gender[:, 1], color='lightblue', name='Female')],
+        'Purchase Frequency by Gender', 'Frequency of Purchases', 'Count', legend_title='Gender', barmode='stack'
+    )
+
+
+# Visualization 6: Average Rating by Season
+def season_ratings(aggs):
+    season_means = aggs['rating_mean_by_season']
+    return np.array(season_means.index), season_means.to_numpy()
+
+
+@chart('numpy', 'average_rating_by_season', 'Average Rating by Season', needs=['rating_mean_by_season'])
+def average_rating_by_season(ax, df, aggs):
+    unique_seasons, avg_ratings_by_season = season_ratings(aggs)
+
+    ax.plot(unique_seasons, avg_ratings_by_season, marker='o', color='purple')
+    ax.set_title('Average Rating by Season (NumPy)')
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Average Rating')
+    ax.set_ylim(0, 5)
+    ax.grid(True, linestyle='--', alpha=0.3)
+
+
+@chart_spec('numpy', 'average_rating_by_season')
+def average_rating_by_season_spec(df, aggs):
+    unique_seasons, avg_ratings_by_season = season_ratings(aggs)
+    return specs.figure(
+        [specs.line(unique_seasons, avg_ratings_by_season, color='purple', markers=True)],
+        'Average Rating by Season', 'Season', 'Average Rating', yaxis={'range': [0, 5]}
+    )
+
+
+def generate_numpy_visualizations(df, version=None, source=None, options=None, chart_ids=None, aggregates=None):
+    visualizations = render_charts('numpy', df, version=version, options=options, source=source, chart_ids=chart_ids,
+                                   aggregates=aggregates)
 
-    plt.figure(figsize=(10, 6))
-    plt.hist(review_ratings, bins=10, color='skyblue', edgecolor='white')
-    plt.axvline(avg_rating, color='red', linestyle='--', label=f'Average: {avg_rating:.1f}')
-
-    plt.title('Customer Review Ratings Distribution (NumPy)')
-    plt.xlabel('Rating (1-5 stars)')
-    plt.ylabel('Number of Reviews')
-    plt.legend()
-    plt.grid(axis='y', alpha=0.3)
-
-    visualizations.append(save_plot_to_base64(plt, 'Review Ratings'))
-    plt.close()
-
-    # Visualization 5: Purchase Frequency by Gender
-    unique_frequencies = np.unique(frequencies)
-    counts_by_gender = np.zeros((len(unique_frequencies), 2))
-    for i, freq in enumerate(unique_frequencies):
-        for j, gender in enumerate(['Male', 'Female']):
-            counts_by_gender[i, j] = np.sum((frequencies == freq) & (genders == gender))
-
-    plt.figure(figsize=(10, 6))
-    plt.bar(unique_frequencies, counts_by_gender[:, 0], color='lightpink', label='Male')
-    plt.bar(unique_frequencies, counts_by_gender[:, 1], bottom=counts_by_gender[:, 0], color='lightblue', label='Female')
-    plt.title('Purchase Frequency by Gender (NumPy)')
-    plt.xlabel('Frequency of Purchases')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.legend(title='Gender')
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Frequency by Gender'))
-    plt.close()
-
-    # Visualization 6: Average Rating by Season
-    unique_seasons = np.unique(seasons)
-    avg_ratings_by_season = np.zeros(len(unique_seasons))
-    for i, season in enumerate(unique_seasons):
-        avg_ratings_by_season[i] = np.mean(review_ratings[seasons == season])
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(unique_seasons, avg_ratings_by_season, marker='o', color='purple')
-    plt.title('Average Rating by Season (NumPy)')
-    plt.xlabel('Season')
-    plt.ylabel('Average Rating')
-    plt.ylim(0, 5) 
-    plt.grid(True, linestyle='--', alpha=0.3)
-    visualizations.append(save_plot_to_base64(plt, 'Average Rating by Season'))
-    plt.close()
-    
     return {
         'library': 'numpy',
         'visualizations': visualizations
     }
-
-def save_plot_to_base64(plt, title):
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    return {
-        'title': title,
-        'image': f'data:image/png;base64,{image_base64}'
-    }
\ No newline at end of file
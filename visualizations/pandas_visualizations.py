@@ -1,233 +1,248 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import io
-import base64
-
-def generate_pandas_visualizations(df):
-    visualizations = []
-    
-    # Visualization 1: Top 10 Items Purchased
-    plt.figure(figsize=(10, 6))
-    
-    # Get items frequency and prepare data for plotting
-    item_counts = df['Item Purchased'].value_counts()
+from visualizations.registry import chart
+from visualizations.rendering import render_charts
+from visualizations.decimation import too_many_points, label_mode, density_label, DENSITY_GRIDSIZE
+
+
+# Visualization 1: Top 10 Items Purchased
+@chart('pandas', 'top_items_purchased', 'Top 10 Items Purchased', needs=['count_by_item'])
+def top_items_purchased(ax, df, aggs):
+
+    # Get items frequency and prepare data for plotting; ties keep item order, as value_counts does
+    item_counts = aggs['count_by_item'].sort_values(ascending=False, kind='stable')
     top_10_items = item_counts.head(10)
     sorted_top_items = top_10_items.sort_values()
-    
+
     # Create horizontal bar chart
-    sorted_top_items.plot(kind='barh', color='teal')
-    
+    sorted_top_items.plot(kind='barh', color='teal', ax=ax)
+
     # Add chart labels
-    plt.title('Top 10 Most Purchased Items')
-    plt.xlabel('Count')
-    plt.ylabel('Item')
-    
-    # Save and close
-    visualizations.append(save_plot_to_base64(plt, 'Top 10 Items Purchased'))
-    plt.close()
-    
-    # Visualization 2: Subscription Status Distribution
-    plt.figure(figsize=(8, 6))
+    ax.set_title('Top 10 Most Purchased Items')
+    ax.set_xlabel('Count')
+    ax.set_ylabel('Item')
+
+
+# Visualization 2: Subscription Status Distribution
+@chart('pandas', 'subscription_status_distribution', 'Subscription Status Distribution',
+       needs=['count_by_subscription'], figsize=(8, 6))
+def subscription_status_distribution(ax, df, aggs):
     # Get subscription status counts
-    subscription_counts = df['Subscription Status'].value_counts()
+    subscription_counts = aggs['count_by_subscription'].sort_values(ascending=False)
     # Create pie chart
     subscription_counts.plot(
-        kind='pie', 
-        autopct='%1.1f%%', 
+        kind='pie',
+        ax=ax,
+        autopct='%1.1f%%',
         colors=['lightcoral', 'lightgreen']
     )
     # Customize chart appearance
-    plt.title('Subscription Status Distribution')
-    plt.ylabel('')  # Remove y-label for cleaner look
-    
-    # Save and close
-    visualizations.append(save_plot_to_base64(plt, 'Subscription Status Distribution'))
-    plt.close()
-    
-    
-    # Visualization 3: Previous Purchases Distribution    
-    # Step 1: Create a new figure with specified size 
-    plt.figure(figsize=(10, 6))
-    purchase_history = df['Previous Purchases'] 
+    ax.set_title('Subscription Status Distribution')
+    ax.set_ylabel('')  # Remove y-label for cleaner look
+
+
+# Visualization 3: Previous Purchases Distribution
+@chart('pandas', 'previous_purchases_distribution', 'Previous Purchases Distribution',
+       needs=['previous_purchases_histogram'])
+def previous_purchases_distribution(ax, df, aggs):
+    # The shared 20-bin histogram, drawn as one weighted value per bin
+    counts, edges = aggs['previous_purchases_histogram']
+    purchase_history = pd.Series(edges[:-1])
     purchase_history.plot(
         kind='hist',       # Create a histogram
-        bins=20,           # Divide data into 20 bins
+        ax=ax,             # Draw on the chart's own axes
+        bins=edges,        # Divide data into 20 bins
+        weights=counts,    # Each bin's left edge carries the bin's count
         edgecolor='black', # Add black edges to bars
         color='purple',    # Fill bars with purple color
         alpha=0.7          # Make bars slightly transparent (0.7 = 70% opaque)
     )
-    plt.title('Distribution of Previous Purchases')
-    plt.xlabel('Number of Previous Purchases')
-    plt.ylabel('Count')
-    
-    # Step 4: Save the visualization and close the figure
-    visualizations.append(save_plot_to_base64(plt, 'Previous Purchases Distribution'))
-    plt.close()
-    
-    # Visualization 4: Purchase Amount Over Age
-    plt.figure(figsize=(10, 6))
-    df.plot(kind='scatter'
-            , x='Age',
-            y='Purchase Amount (USD)',
-            alpha=0.5,
-            color='orange')
-    plt.title('Purchase Amount Over Age')
-    plt.xlabel('Age')
-    plt.ylabel('Purchase Amount (USD)')
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount Over Age'))
-    plt.close()
-
-    # Visualization 5: Payment Method Popularity
-    plt.figure(figsize=(10, 6))
-    payment_counts = df['Payment Method'].value_counts().sort_values()
+    ax.set_title('Distribution of Previous Purchases')
+    ax.set_xlabel('Number of Previous Purchases')
+    ax.set_ylabel('Count')
+
+
+# Visualization 4: Purchase Amount Over Age
+@chart('pandas', 'purchase_amount_over_age', 'Purchase Amount Over Age', columns=['Age', 'Purchase Amount (USD)'])
+def purchase_amount_over_age(ax, df):
+    if too_many_points(df):
+        df.plot(kind='hexbin', x='Age', y='Purchase Amount (USD)',
+                gridsize=DENSITY_GRIDSIZE, cmap='Oranges', mincnt=1, ax=ax)
+        label_mode(ax, density_label(df))
+    else:
+        df.plot(kind='scatter'
+                , x='Age',
+                y='Purchase Amount (USD)',
+                alpha=0.5,
+                color='orange',
+                ax=ax)
+    ax.set_title('Purchase Amount Over Age')
+    ax.set_xlabel('Age')
+    ax.set_ylabel('Purchase Amount (USD)')
+
+
+# Visualization 5: Payment Method Popularity
+@chart('pandas', 'payment_method_popularity', 'Payment Method Popularity', needs=['count_by_payment_method'])
+def payment_method_popularity(ax, df, aggs):
+    payment_counts = aggs['count_by_payment_method'].sort_values()
     payment_counts.plot(
         kind='barh',
+        ax=ax,
         color=['skyblue', 'lightgreen', 'salmon', 'gold'],
         edgecolor='black'
     )
-    plt.title('Most Popular Payment Methods')
-    plt.xlabel('Number of Transactions')
-    plt.ylabel('Payment Method')
-    plt.grid(axis='x', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Payment Method Popularity'))
-    plt.close()
-
-    # Visualization 6: Purchase Amount by Category
-    plt.figure(figsize=(12, 6))
-    df.boxplot(
-        column='Purchase Amount (USD)',
-        by='Category',
-        vert=False,
+    ax.set_title('Most Popular Payment Methods')
+    ax.set_xlabel('Number of Transactions')
+    ax.set_ylabel('Payment Method')
+    ax.grid(axis='x', linestyle='--', alpha=0.4)
+
+
+# Visualization 6: Purchase Amount by Category
+@chart('pandas', 'purchase_amount_by_category', 'Purchase Amount by Category',
+       needs=['purchase_box_by_category'], figsize=(12, 6))
+def purchase_amount_by_category(ax, df, aggs):
+    # Quartiles, whiskers and outliers come from the shared per-category sketches
+    ax.bxp(
+        list(aggs['purchase_box_by_category'].values()),
+        orientation='horizontal',
         patch_artist=True,
         boxprops={'facecolor': 'lightblue'},
+        medianprops={'color': 'black'},
         flierprops={'marker': 'o', 'markersize': 5, 'markerfacecolor': 'red'}
     )
-    plt.title('Purchase Amount Distribution by Category')
-    plt.suptitle('')  
-    plt.xlabel('Purchase Amount (USD)')
-    plt.ylabel('Category')
-    plt.grid(axis='x', linestyle='--', alpha=0.3)
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Category'))
-    plt.close()
-    
-    # NEW Visualization 7: Review Rating Distribution
-    plt.figure(figsize=(10, 6))
-    df['Review Rating'].plot(
-        kind='hist',
-        bins=10,
+    ax.grid(True)
+    ax.set_title('Purchase Amount Distribution by Category')
+    ax.figure.suptitle('')
+    ax.set_xlabel('Purchase Amount (USD)')
+    ax.set_ylabel('Category')
+    ax.grid(axis='x', linestyle='--', alpha=0.3)
+
+
+# NEW Visualization 7: Review Rating Distribution
+@chart('pandas', 'review_rating_distribution', 'Review Rating Distribution', needs=['review_rating_histogram'])
+def review_rating_distribution(ax, df, aggs):
+    # Redraw the shared 10-bin histogram by weighting each bin's left edge with its count
+    counts, edges = aggs['review_rating_histogram']
+    ax.hist(
+        edges[:-1],
+        bins=edges,
+        weights=counts,
         color='lightgreen',
         edgecolor='black',
         alpha=0.7
     )
-    plt.title('Distribution of Review Ratings')
-    plt.xlabel('Rating')
-    plt.ylabel('Count')
-    plt.grid(axis='y', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Review Rating Distribution'))
-    plt.close()
-    
-    # NEW Visualization 8: Seasonal Purchase Patterns
-    plt.figure(figsize=(10, 6))
-    season_data = df.groupby('Season')['Purchase Amount (USD)'].mean().sort_values()
+    ax.set_title('Distribution of Review Ratings')
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Count')
+    ax.grid(axis='y', linestyle='--', alpha=0.4)
+
+
+# NEW Visualization 8: Seasonal Purchase Patterns
+@chart('pandas', 'seasonal_purchase_patterns', 'Seasonal Purchase Patterns', needs=['purchase_mean_by_season'])
+def seasonal_purchase_patterns(ax, df, aggs):
+    season_data = aggs['purchase_mean_by_season'].sort_values()
     season_data.plot(
         kind='bar',
+        ax=ax,
         color='skyblue',
         edgecolor='black'
     )
-    plt.title('Average Purchase Amount by Season')
-    plt.xlabel('Season')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Seasonal Purchase Patterns'))
-    plt.close()
-    
-    # NEW Visualization 9: Size Popularity Breakdown
-    plt.figure(figsize=(8, 6))
-    size_counts = df['Size'].value_counts()
+    ax.set_title('Average Purchase Amount by Season')
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.4)
+
+
+# NEW Visualization 9: Size Popularity Breakdown
+@chart('pandas', 'size_popularity', 'Size Popularity', needs=['count_by_size'], figsize=(8, 6))
+def size_popularity(ax, df, aggs):
+    size_counts = aggs['count_by_size'].sort_values(ascending=False)
     size_counts.plot(
         kind='pie',
+        ax=ax,
         autopct='%1.1f%%',
         colors=['#ff9999', '#66b3ff', '#99ff99', '#ffcc99'],
         shadow=True
     )
-    plt.title('Size Popularity Breakdown')
-    plt.ylabel('')
-    visualizations.append(save_plot_to_base64(plt, 'Size Popularity'))
-    plt.close()
-    
-    # NEW Visualization 10: Color Preference Analysis
-    plt.figure(figsize=(12, 6))
-    color_counts = df['Color'].value_counts().head(10).sort_values()
+    ax.set_title('Size Popularity Breakdown')
+    ax.set_ylabel('')
+
+
+# NEW Visualization 10: Color Preference Analysis
+@chart('pandas', 'color_preference_analysis', 'Color Preference Analysis', needs=['count_by_color'],
+       figsize=(12, 6))
+def color_preference_analysis(ax, df, aggs):
+    color_counts = aggs['count_by_color'].sort_values(ascending=False, kind='stable').head(10).sort_values()
     color_counts.plot(
         kind='barh',
+        ax=ax,
         colormap='viridis'
     )
-    plt.title('Top 10 Most Popular Colors')
-    plt.xlabel('Count')
-    plt.ylabel('Color')
-    plt.grid(axis='x', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Color Preference Analysis'))
-    plt.close()
-    
-    # NEW Visualization 11: Location-based Purchase Comparison
-    plt.figure(figsize=(12, 6))
-    location_data = df.groupby('Location')['Purchase Amount (USD)'].mean().sort_values(ascending=False).head(10)
+    ax.set_title('Top 10 Most Popular Colors')
+    ax.set_xlabel('Count')
+    ax.set_ylabel('Color')
+    ax.grid(axis='x', linestyle='--', alpha=0.4)
+
+
+# NEW Visualization 11: Location-based Purchase Comparison
+@chart('pandas', 'location_purchase_comparison', 'Location Purchase Comparison',
+       needs=['purchase_mean_by_location'], figsize=(12, 6))
+def location_purchase_comparison(ax, df, aggs):
+    location_data = aggs['purchase_mean_by_location'].sort_values(ascending=False).head(10)
     location_data.plot(
         kind='bar',
+        ax=ax,
         color='coral',
         edgecolor='black'
     )
-    plt.title('Top 10 Locations by Average Purchase Amount')
-    plt.xlabel('Location')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Location Purchase Comparison'))
-    plt.close()
-    
-    # NEW Visualization 12: Shipping Type Preference
-    plt.figure(figsize=(10, 6))
-    shipping_counts = df['Shipping Type'].value_counts().sort_values()
+    ax.set_title('Top 10 Locations by Average Purchase Amount')
+    ax.set_xlabel('Location')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.4)
+
+
+# NEW Visualization 12: Shipping Type Preference
+@chart('pandas', 'shipping_type_preference', 'Shipping Type Preference', needs=['count_by_shipping_type'])
+def shipping_type_preference(ax, df, aggs):
+    shipping_counts = aggs['count_by_shipping_type'].sort_values()
     shipping_counts.plot(
         kind='barh',
+        ax=ax,
         color='lightseagreen'
     )
-    plt.title('Shipping Type Popularity')
-    plt.xlabel('Count')
-    plt.ylabel('Shipping Type')
-    plt.grid(axis='x', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Shipping Type Preference'))
-    plt.close()
-    
-    # NEW Visualization 13: Discount Impact Analysis
-    plt.figure(figsize=(8, 6))
-    discount_impact = df.groupby('Discount Applied')['Purchase Amount (USD)'].mean()
-    discount_impact.index = ['No Discount', 'Discount Applied']
+    ax.set_title('Shipping Type Popularity')
+    ax.set_xlabel('Count')
+    ax.set_ylabel('Shipping Type')
+    ax.grid(axis='x', linestyle='--', alpha=0.4)
+
+
+# NEW Visualization 13: Discount Impact Analysis
+@chart('pandas', 'discount_impact_analysis', 'Discount Impact Analysis', needs=['purchase_mean_by_discount'],
+       figsize=(8, 6))
+def discount_impact_analysis(ax, df, aggs):
+    # Relabelled by key on a copy: the shared aggregate must stay as it is for other charts,
+    # and a filtered view may hold only one of the two values
+    discount_impact = aggs['purchase_mean_by_discount'].rename({'No': 'No Discount', 'Yes': 'Discount Applied'})
+    colors = {'No Discount': '#ff9999', 'Discount Applied': '#66b3ff'}
     discount_impact.plot(
         kind='bar',
-        color=['#ff9999', '#66b3ff'],
+        ax=ax,
+        color=[colors.get(label, 'gray') for label in discount_impact.index],
         edgecolor='black'
     )
-    plt.title('Impact of Discount on Average Purchase Amount')
-    plt.xlabel('Discount Status')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', linestyle='--', alpha=0.4)
-    visualizations.append(save_plot_to_base64(plt, 'Discount Impact Analysis'))
-    plt.close()
-    
+    ax.set_title('Impact of Discount on Average Purchase Amount')
+    ax.set_xlabel('Discount Status')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=0)
+    ax.grid(axis='y', linestyle='--', alpha=0.4)
+
+
+def generate_pandas_visualizations(df, version=None, source=None, options=None, chart_ids=None, aggregates=None):
+    visualizations = render_charts('pandas', df, version=version, options=options, source=source, chart_ids=chart_ids,
+                                   aggregates=aggregates)
+
     return {
         'library': 'pandas',
         'visualizations': visualizations
     }
-
-def save_plot_to_base64(plt, title):
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    return {
-        'title': title,
-        'image': f'data:image/png;base64,{image_base64}'
-    }
\ No newline at end of file
@@ -0,0 +1,114 @@
+import importlib
+from collections import OrderedDict, namedtuple
+
+Chart = namedtuple('Chart', ['library', 'id', 'title', 'draw', 'needs', 'columns', 'figsize'])
+
+LIBRARY_MODULES = OrderedDict([
+    ('matplotlib', 'visualizations.matplotlib_visualizations'),
+    ('seaborn', 'visualizations.seaborn_visualizations'),
+    ('pandas', 'visualizations.pandas_visualizations'),
+    ('numpy', 'visualizations.numpy_visualizations'),
+])
+
+# The front end still asks for the NumPy charts under their old button name
+LIBRARY_ALIASES = {'plotly': 'numpy'}
+
+# Button names whose charts are drawn in the browser from chart specs instead of served as images
+CLIENT_RENDERED = {'plotly'}
+
+_charts = {}
+_specs = {}
+_prepare = {}
+# Columns each chart reads, by (library, chart id), worked out on first use
+_chart_columns = {}
+
+
+def chart(library, chart_id, title, needs=(), columns=(), figsize=(10, 6)):
+    """Register the decorated draw function as chart_id of library.
+
+    The chart is drawn as draw(ax, df) onto the single axes of a figsize-inch
+    figure. needs names shared aggregates (see visualizations.aggregates); a
+    chart that declares any is drawn as draw(ax, df, aggs) with those results
+    in aggs. columns names the dataset columns draw reads from df itself,
+    beyond those of its aggregates.
+    """
+    def decorator(draw):
+        charts = _charts.setdefault(library, OrderedDict())
+        if chart_id in charts:
+            raise ValueError(f'Chart {library}/{chart_id} is already registered')
+        charts[chart_id] = Chart(library, chart_id, title, draw, tuple(needs), tuple(columns), tuple(figsize))
+        return draw
+    return decorator
+
+
+def chart_spec(library, chart_id):
+    """Register the decorated function as the client-side spec of chart_id of library.
+
+    It is called like the chart's draw function, minus the axes: spec(df) or
+    spec(df, aggs), and returns a Plotly figure dict ({'data': [...],
+    'layout': {...}}) holding only aggregated series.
+    """
+    def decorator(build):
+        specs = _specs.setdefault(library, {})
+        if chart_id in specs:
+            raise ValueError(f'Chart spec {library}/{chart_id} is already registered')
+        specs[chart_id] = build
+        return build
+    return decorator
+
+
+def set_prepare(library, prepare):
+    # Frame transformation applied once per render (or per worker) before drawing
+    _prepare[library] = prepare
+
+
+def load_libraries():
+    for module_name in LIBRARY_MODULES.values():
+        importlib.import_module(module_name)
+
+
+def resolve_library(name):
+    name = LIBRARY_ALIASES.get(name, name)
+    return name if name in LIBRARY_MODULES else None
+
+
+def get_charts(library, columns=None):
+    """The charts of library, in registration order; given a dataset's columns, only those it can draw."""
+    importlib.import_module(LIBRARY_MODULES[library])
+    charts = list(_charts.get(library, {}).values())
+    if columns is None:
+        return charts
+    columns = set(columns)
+    return [chart for chart in charts if chart_columns(chart) <= columns]
+
+
+def drawable_charts(columns):
+    """The charts of every library that a dataset with these columns can draw."""
+    load_libraries()
+    return [chart for library in LIBRARY_MODULES for chart in get_charts(library, columns)]
+
+
+def chart_columns(chart):
+    """The dataset columns chart reads: the columns it declares plus those of its aggregates."""
+    columns = _chart_columns.get((chart.library, chart.id))
+    if columns is None:
+        from visualizations.aggregates import aggregate_columns
+        columns = set(chart.columns)
+        for need in chart.needs:
+            columns |= aggregate_columns(need)
+        columns = _chart_columns[(chart.library, chart.id)] = frozenset(columns)
+    return columns
+
+
+def get_chart(library, chart_id):
+    importlib.import_module(LIBRARY_MODULES[library])
+    return _charts.get(library, {}).get(chart_id)
+
+
+def get_spec(library, chart_id):
+    importlib.import_module(LIBRARY_MODULES[library])
+    return _specs.get(library, {}).get(chart_id)
+
+
+def get_prepare(library):
+    return _prepare.get(library)
@@ -0,0 +1,173 @@
+import io
+import base64
+import time
+import threading
+from collections import OrderedDict
+from visualizations.chart_cache import chart_cache, make_key
+from visualizations import registry
+from visualizations.aggregates import compute_aggregates
+from visualizations.metrics import span, record_chart
+from visualizations.figures import figure_pool
+from visualizations import formats
+
+# Prepared frames by (library, dataset version), so cleaning runs once per version
+MAX_PREPARED = 8
+_prepared = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def save_plot_to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def png_to_data_uri(png, mimetype='image/png'):
+    image_base64 = base64.b64encode(png).decode('utf-8')
+    return f'data:{mimetype};base64,{image_base64}'
+
+
+def save_plot_to_base64(fig, title):
+    return {
+        'title': title,
+        'image': png_to_data_uri(save_plot_to_png(fig))
+    }
+
+
+def draw_chart(chart, fig, df, aggs=None):
+    # Every chart draws onto one axes filling the figure
+    ax = fig.add_subplot()
+    if chart.needs:
+        chart.draw(ax, df, aggs)
+    else:
+        chart.draw(ax, df)
+
+
+def render_png(chart, df, aggs=None, timings=None, options=None):
+    # timings, if given, receives the seconds spent drawing and encoding (as savefig);
+    # options pick the image format and size, see visualizations.formats
+    with figure_pool.figure(chart.figsize) as fig:
+        start = time.perf_counter()
+        draw_chart(chart, fig, df, aggs)
+        drawn = time.perf_counter()
+        png = formats.encode_figure(fig, options)
+        if timings is not None:
+            timings.update(draw=drawn - start, savefig=time.perf_counter() - drawn)
+        return png
+
+
+def chart_result(chart, png, options=None):
+    return {
+        'id': chart.id,
+        'title': chart.title,
+        'image': png_to_data_uri(png, formats.mimetype(options))
+    }
+
+
+def iter_chart_pngs(library, df, version=None, options=None, source=None, chart_ids=None, cache=chart_cache,
+                    aggregates=None, on_error=None):
+    """Yield (chart, image bytes) for the charts of library as soon as each one is ready.
+
+    Cached charts come first, in registry order; cache misses follow in the
+    order they finish rendering. With a dataset version the PNG bytes are
+    cached, keyed by the render options too (format and size, see
+    visualizations.formats; none means a full-size PNG). Misses are fanned out to the render pool; source (the dataset
+    path) lets workers load the data themselves instead of receiving a
+    pickled copy. aggregates supplies precomputed shared aggregates, e.g.
+    from an out-of-core summary where df is only a sample of the rows.
+    With on_error, a chart that fails to draw or encode is passed to
+    on_error(chart, exception) instead of ending the iteration, and the
+    others are still yielded.
+    """
+    from visualizations.executor import iter_render_parallel
+
+    charts = registry.get_charts(library, df.columns)
+    if chart_ids is not None:
+        charts = [chart for chart in charts if chart.id in chart_ids]
+
+    missing = []
+    for chart in charts:
+        png = cache.get(make_key(library, chart.id, version, options)) if version is not None else None
+        if png is None:
+            missing.append(chart)
+        else:
+            yield chart, png
+    if not missing:
+        return
+
+    # Aggregates for every missing chart are computed together, once per frame version,
+    # and shipped to the workers alongside the chart ids
+    with span('clean', library=library):
+        frame, frame_version = prepare_frame(library, df, version)
+    needs = [name for chart in missing for name in chart.needs]
+    if aggregates is not None:
+        aggs = aggregates
+    else:
+        with span('aggregate', library=library):
+            aggs = compute_aggregates(frame, needs, frame_version) if needs else {}
+    tasks = [(chart.id, {name: aggs[name] for name in chart.needs}) for chart in missing]
+
+    by_id = {chart.id: chart for chart in missing}
+    failed = (lambda chart_id, error: on_error(by_id[chart_id], error)) if on_error else None
+    rendered = iter_render_parallel(library, tasks, source if source is not None else df, options, failed)
+    if rendered is None:
+        rendered = _render_serial(by_id, frame, tasks, options, failed)
+    for chart_id, png, timings in rendered:
+        record_chart(library, chart_id, timings)
+        if version is not None:
+            cache.put(make_key(library, chart_id, version, options), png)
+        yield by_id[chart_id], png
+
+
+def _render_serial(charts, frame, tasks, options=None, on_error=None):
+    for chart_id, chart_aggs in tasks:
+        timings = {}
+        try:
+            png = render_png(charts[chart_id], frame, chart_aggs, timings, options)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(chart_id, e)
+            continue
+        yield chart_id, png, timings
+
+
+def prepare_frame(library, df, version=None):
+    """Apply the library's prepare step, returning (frame, frame version).
+
+    The version only changes when preparing actually produced a different frame,
+    so aggregates over an untouched frame are shared with the other libraries.
+    With a version, the step runs once per dataset version rather than per request.
+    """
+    prepare = registry.get_prepare(library)
+    if prepare is None:
+        return df, version
+    if version is not None:
+        with _prepared_lock:
+            prepared = _prepared.get((library, version))
+            if prepared is not None:
+                _prepared.move_to_end((library, version))
+                return prepared
+    frame = prepare(df)
+    prepared = (frame, version if frame is df or version is None else f'{version}:{library}')
+    if version is not None:
+        with _prepared_lock:
+            _prepared[(library, version)] = prepared
+            while len(_prepared) > MAX_PREPARED:
+                _prepared.popitem(last=False)
+    return prepared
+
+
+def render_charts(library, df, version=None, options=None, source=None, chart_ids=None, cache=chart_cache,
+                  aggregates=None):
+    # Same as iter_chart_pngs, but collected back into registry order
+    pngs = {
+        chart.id: png
+        for chart, png in iter_chart_pngs(library, df, version=version, options=options, source=source,
+                                          chart_ids=chart_ids, cache=cache, aggregates=aggregates)
+    }
+    return [
+        chart_result(chart, pngs[chart.id], options)
+        for chart in registry.get_charts(library)
+        if chart.id in pngs
+    ]
@@ -1,198 +1,284 @@
+import colorsys
 import seaborn as sns
-import matplotlib.pyplot as plt
+import matplotlib as mpl
 import pandas as pd
-import io
-import base64
 import numpy as np
+from visualizations.registry import chart
+from visualizations.rendering import render_charts
+from visualizations.decimation import sample_points, label_mode, sample_label
+from visualizations.kde import density_curve
 
-def generate_seaborn_visualizations(df):
-    visualizations = []
-    
-    # Visualization 1: Age Distribution by Gender
-    plt.figure(figsize=(10, 6))
-    sns.histplot(data=df, x='Age', hue='Gender', kde=True, bins=20, alpha=0.6)
-    plt.title('Age Distribution by Gender')
-    plt.xlabel('Age')
-    plt.ylabel('Count')
-    visualizations.append(save_plot_to_base64(plt, 'Age Distribution by Gender'))
-    plt.close()
-    
-    # Visualization 2: Purchase Amount by Category and Gender (fixed deprecated ci parameter)
-    plt.figure(figsize=(12, 6))
-    sns.barplot(data=df, x='Category', y='Purchase Amount (USD)', hue='Gender', errorbar=None)
-    plt.title('Average Purchase Amount by Category and Gender')
-    plt.xlabel('Category')
-    plt.ylabel('Average Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Category and Gender'))
-    plt.close()
-    
-    # Visualization 3: Heatmap of Correlation
-    plt.figure(figsize=(10, 8))
-    numeric_df = df.select_dtypes(include=['int64', 'float64'])
-    sns.heatmap(numeric_df.corr(), annot=True, cmap='coolwarm', center=0)
-    plt.title('Correlation Heatmap')
-    visualizations.append(save_plot_to_base64(plt, 'Correlation Heatmap'))
-    plt.close()
-    
-    # Visualization 4: Boxplot of Purchase Amount by Season (fixed palette warning)
-    plt.figure(figsize=(10, 6))
+
+def draw_boxes(ax, stats, palette):
+    # Seaborn-styled box plot from precomputed statistics, so no rows are sorted at draw time
+    line = {'color': '0.26'}
+    artists = ax.bxp(stats, positions=range(len(stats)), widths=0.8, patch_artist=True,
+                     boxprops={'edgecolor': '0.26'}, medianprops=line, whiskerprops=line, capprops=line,
+                     flierprops={'marker': 'd', 'markerfacecolor': '0.26', 'markeredgecolor': '0.26',
+                                 'markersize': 5})
+    for box, color in zip(artists['boxes'], palette):
+        # seaborn draws box fills at 75% saturation
+        box.set_facecolor(sns.desaturate(color, 0.75))
+    ax.set_xlim(-0.5, len(stats) - 0.5)
+
+
+def draw_violins(ax, distributions, box_stats, palette, width=0.8, cut=2, gridsize=100):
+    # Seaborn-styled violins (area-normalized, inner box) from the shared value counts and box statistics
+    curves = [density_curve(values, counts, cut=cut, gridsize=gridsize) for values, counts in distributions.values()]
+    peak = max((curve[1].max() for curve in curves if curve is not None), default=1)
+    colors = [sns.desaturate(color, 0.75) for color in palette]
+    lightness = min(colorsys.rgb_to_hls(*mpl.colors.to_rgb(color))[1] for color in colors) * 0.6
+    line_color = (lightness, lightness, lightness)
+    line_width = 1.25 * mpl.rcParams['patch.linewidth']
+    box_width = line_width * 4.5
+
+    for position, (key, curve, color) in enumerate(zip(distributions, curves, colors)):
+        stats = box_stats[key]
+        if curve is None:
+            # A single distinct value: seaborn draws a flat line instead of a violin
+            ax.plot([position - width / 2, position + width / 2], [stats['mean'], stats['mean']],
+                    color=line_color, linewidth=line_width)
+            continue
+        support, density = curve
+        span = density / peak * width / 2
+        ax.fill_betweenx(support, position - span, position + span,
+                         facecolor=color, edgecolor=line_color, linewidth=line_width)
+        ax.plot([position, position], [stats['whislo'], stats['whishi']], color=line_color, linewidth=box_width / 3)
+        ax.plot([position, position], [stats['q1'], stats['q3']], color=line_color, linewidth=box_width)
+        ax.plot([position], [stats['med']], marker='_', markersize=box_width / 1.2, markeredgewidth=box_width / 5,
+                markeredgecolor='w', markerfacecolor='w', color=line_color)
+    ax.set_xticks(range(len(distributions)))
+    ax.set_xticklabels([str(key) for key in distributions])
+    ax.set_xlim(-0.5, len(distributions) - 0.5)
+
+
+def draw_counts(ax, counts, x, hue, palette, order=None):
+    # countplot equivalent from precomputed counts per (x, hue) pair: one bar per pair, no rows counted
+    sns.barplot(data=counts.rename('count').reset_index(), x=x, y='count', hue=hue, palette=palette,
+                order=order, errorbar=None, ax=ax)
+
+
+# Visualization 1: Age Distribution by Gender
+@chart('seaborn', 'age_distribution_by_gender', 'Age Distribution by Gender', needs=['age_values_by_gender'])
+def age_distribution_by_gender(ax, df, aggs):
+    distributions = aggs['age_values_by_gender']
+    palette = dict(zip(distributions, sns.color_palette(n_colors=len(distributions))))
+    # Bars from the shared per-gender age counts: one weighted row per distinct age
+    age_counts = pd.concat([pd.DataFrame({'Gender': gender, 'Age': values, 'Rows': counts})
+                            for gender, (values, counts) in distributions.items()], ignore_index=True)
+    sns.histplot(data=age_counts, x='Age', hue='Gender', hue_order=list(distributions), palette=palette,
+                 weights='Rows', bins=20, alpha=0.6, ax=ax)
+    # KDE curves on a common grid, scaled to the bar counts as histplot(kde=True) does
+    low, high = age_counts['Age'].min(), age_counts['Age'].max()
+    grid = np.linspace(low, high, 200)
+    bin_width = (high - low) / 20
+    for gender, (values, counts) in distributions.items():
+        curve = density_curve(values, counts, grid=grid)
+        if curve is not None:
+            ax.plot(grid, curve[1] * counts.sum() * bin_width, color=palette[gender])
+    ax.set_title('Age Distribution by Gender')
+    ax.set_xlabel('Age')
+    ax.set_ylabel('Count')
+
+
+# Visualization 2: Purchase Amount by Category and Gender (fixed deprecated ci parameter)
+@chart('seaborn', 'purchase_amount_by_category_and_gender', 'Purchase Amount by Category and Gender',
+       needs=['purchase_mean_by_category_gender'], figsize=(12, 6))
+def purchase_amount_by_category_and_gender(ax, df, aggs):
+    # One precomputed mean per bar, so the barplot has nothing left to aggregate
+    category_gender_means = aggs['purchase_mean_by_category_gender'].rename('Purchase Amount (USD)').reset_index()
+    sns.barplot(data=category_gender_means, x='Category', y='Purchase Amount (USD)', hue='Gender', errorbar=None, ax=ax)
+    ax.set_title('Average Purchase Amount by Category and Gender')
+    ax.set_xlabel('Category')
+    ax.set_ylabel('Average Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# Visualization 3: Heatmap of Correlation
+@chart('seaborn', 'correlation_heatmap', 'Correlation Heatmap', needs=['numeric_correlation'], figsize=(10, 8))
+def correlation_heatmap(ax, df, aggs):
+    sns.heatmap(aggs['numeric_correlation'], annot=True, cmap='coolwarm', center=0, ax=ax)
+    ax.set_title('Correlation Heatmap')
+
+
+# Visualization 4: Boxplot of Purchase Amount by Season (fixed palette warning)
+@chart('seaborn', 'purchase_amount_by_season', 'Purchase Amount by Season', needs=['purchase_box_by_season'])
+def purchase_amount_by_season(ax, df, aggs):
     # Create a categorical palette mapping
     season_order = ['Winter', 'Spring', 'Summer', 'Fall']
-    sns.boxplot(data=df, x='Season', y='Purchase Amount (USD)', order=season_order, 
-                hue='Season', palette='pastel', legend=False)
-    plt.title('Purchase Amount Distribution by Season')
-    plt.xlabel('Season')
-    plt.ylabel('Purchase Amount (USD)')
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Season'))
-    plt.close()
-    
-    # Visualization 5: Review Rating by Category (fixed deprecated parameters)
-    plt.figure(figsize=(12, 6))
-    sns.pointplot(data=df, x='Category', y='Review Rating', errorbar=None, 
-                 hue='Category', palette='Set2', legend=False)
-    plt.title('Average Review Rating by Category')
-    plt.xlabel('Product Category')
-    plt.ylabel('Average Rating')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    visualizations.append(save_plot_to_base64(plt, 'Review Rating by Category'))
-    plt.close()
-    
-    # Visualization 6: Subscription Status by Gender
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=df, x='Subscription Status', hue='Gender', palette='pastel')
-    plt.title('Subscription Status Distribution by Gender')
-    plt.xlabel('Subscription Status')
-    plt.ylabel('Count')
-    plt.legend(title='Gender')
-    visualizations.append(save_plot_to_base64(plt, 'Subscription Status by Gender'))
-    plt.close()
-    
-    # Visualization 7: Purchase Amount Distribution by Payment Method (fixed palette warning)
-    plt.figure(figsize=(12, 6))
-    sns.violinplot(data=df, x='Payment Method', y='Purchase Amount (USD)', 
-                  hue='Payment Method', palette='muted', legend=False)
-    plt.title('Purchase Amount Distribution by Payment Method')
-    plt.xlabel('Payment Method')
-    plt.ylabel('Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Payment Method'))
-    plt.close()
-    
-    # Visualization 8: Previous Purchases vs Purchase Amount
-    plt.figure(figsize=(10, 6))
-    sns.regplot(data=df, x='Previous Purchases', y='Purchase Amount (USD)', 
-                scatter_kws={'alpha':0.5}, line_kws={'color':'red'})
-    plt.title('Relationship Between Previous Purchases and Purchase Amount')
-    plt.xlabel('Number of Previous Purchases')
-    plt.ylabel('Purchase Amount (USD)')
-    plt.grid(True, alpha=0.3)
-    visualizations.append(save_plot_to_base64(plt, 'Previous Purchases vs Purchase Amount'))
-    plt.close()
-    
-    # Visualization 9: Discount Usage by Category
-    plt.figure(figsize=(12, 6))
-    sns.countplot(data=df, x='Category', hue='Discount Applied', palette='Blues')
-    plt.title('Discount Usage Across Product Categories')
-    plt.xlabel('Product Category')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.legend(title='Discount Applied')
-    visualizations.append(save_plot_to_base64(plt, 'Discount Usage by Category'))
-    plt.close()
-    
-    # Visualization 10: Purchase Amount by Frequency of Purchases (fixed palette warning)
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(data=df, x='Frequency of Purchases', y='Purchase Amount (USD)', 
-               hue='Frequency of Purchases', palette='viridis', legend=False)
-    plt.title('Purchase Amount Distribution by Purchase Frequency')
-    plt.xlabel('Frequency of Purchases')
-    plt.ylabel('Purchase Amount (USD)')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Purchase Amount by Frequency'))
-    plt.close()
-    
-    # Visualization 11: Item Size vs Purchase Amount (replaced swarmplot with stripplot)
-    plt.figure(figsize=(10, 6))
-    sns.stripplot(data=df, x='Size', y='Purchase Amount (USD)', 
-                 hue='Size', palette='Set3', legend=False, size=4, jitter=True, alpha=0.7)
-    plt.title('Purchase Amount by Item Size')
-    plt.xlabel('Size')
-    plt.ylabel('Purchase Amount (USD)')
-    visualizations.append(save_plot_to_base64(plt, 'Size vs Purchase Amount'))
-    plt.close()
-    
-    # Visualization 12: Review Rating Distribution by Shipping Type (fixed palette warning)
-    plt.figure(figsize=(12, 6))
-    sns.violinplot(data=df, x='Shipping Type', y='Review Rating', 
-                  hue='Shipping Type', palette='rocket', legend=False)
-    plt.title('Review Rating Distribution by Shipping Type')
-    plt.xlabel('Shipping Type')
-    plt.ylabel('Review Rating')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Rating by Shipping Type'))
-    plt.close()
-    
-    # NEW Visualization 13: Age vs Purchase Amount with Color Mapped to Review Rating
-    plt.figure(figsize=(10, 6))
-    scatter = sns.scatterplot(data=df, x='Age', y='Purchase Amount (USD)', 
+    season_stats = aggs['purchase_box_by_season']
+    stats = [season_stats[season] for season in season_order if season in season_stats]
+    draw_boxes(ax, stats, sns.color_palette('pastel', len(stats)))
+    ax.set_title('Purchase Amount Distribution by Season')
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Purchase Amount (USD)')
+
+
+# Visualization 5: Review Rating by Category (fixed deprecated parameters)
+@chart('seaborn', 'review_rating_by_category', 'Review Rating by Category',
+       needs=['rating_mean_by_category'], figsize=(12, 6))
+def review_rating_by_category(ax, df, aggs):
+    # One precomputed mean per point
+    category_ratings = aggs['rating_mean_by_category'].rename('Review Rating').reset_index()
+    sns.pointplot(data=category_ratings, x='Category', y='Review Rating', errorbar=None,
+                 hue='Category', palette='Set2', legend=False, ax=ax)
+    ax.set_title('Average Review Rating by Category')
+    ax.set_xlabel('Product Category')
+    ax.set_ylabel('Average Rating')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+# Visualization 6: Subscription Status by Gender
+@chart('seaborn', 'subscription_status_by_gender', 'Subscription Status by Gender',
+       needs=['count_by_subscription_gender'])
+def subscription_status_by_gender(ax, df, aggs):
+    draw_counts(ax, aggs['count_by_subscription_gender'], 'Subscription Status', 'Gender', palette='pastel')
+    ax.set_title('Subscription Status Distribution by Gender')
+    ax.set_xlabel('Subscription Status')
+    ax.set_ylabel('Count')
+    ax.legend(title='Gender')
+
+
+# Visualization 7: Purchase Amount Distribution by Payment Method (fixed palette warning)
+@chart('seaborn', 'purchase_amount_by_payment_method', 'Purchase Amount by Payment Method',
+       needs=['purchase_values_by_payment_method', 'purchase_box_by_payment_method'], figsize=(12, 6))
+def purchase_amount_by_payment_method(ax, df, aggs):
+    distributions = aggs['purchase_values_by_payment_method']
+    draw_violins(ax, distributions, aggs['purchase_box_by_payment_method'],
+                 sns.color_palette('muted', len(distributions)))
+    ax.set_title('Purchase Amount Distribution by Payment Method')
+    ax.set_xlabel('Payment Method')
+    ax.set_ylabel('Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# Visualization 8: Previous Purchases vs Purchase Amount
+@chart('seaborn', 'previous_purchases_vs_purchase_amount', 'Previous Purchases vs Purchase Amount',
+       columns=['Previous Purchases', 'Purchase Amount (USD)'])
+def previous_purchases_vs_purchase_amount(ax, df):
+    points = sample_points(df)
+    sns.regplot(data=points, x='Previous Purchases', y='Purchase Amount (USD)',
+                scatter_kws={'alpha':0.5}, line_kws={'color':'red'}, ax=ax)
+    if points is not df:
+        label_mode(ax, sample_label(points, df))
+    ax.set_title('Relationship Between Previous Purchases and Purchase Amount')
+    ax.set_xlabel('Number of Previous Purchases')
+    ax.set_ylabel('Purchase Amount (USD)')
+    ax.grid(True, alpha=0.3)
+
+
+# Visualization 9: Discount Usage by Category
+@chart('seaborn', 'discount_usage_by_category', 'Discount Usage by Category',
+       needs=['count_by_category_discount'], figsize=(12, 6))
+def discount_usage_by_category(ax, df, aggs):
+    draw_counts(ax, aggs['count_by_category_discount'], 'Category', 'Discount Applied', palette='Blues')
+    ax.set_title('Discount Usage Across Product Categories')
+    ax.set_xlabel('Product Category')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend(title='Discount Applied')
+
+
+# Visualization 10: Purchase Amount by Frequency of Purchases (fixed palette warning)
+@chart('seaborn', 'purchase_amount_by_frequency', 'Purchase Amount by Frequency',
+       needs=['purchase_box_by_frequency'], figsize=(12, 6))
+def purchase_amount_by_frequency(ax, df, aggs):
+    stats = list(aggs['purchase_box_by_frequency'].values())
+    draw_boxes(ax, stats, sns.color_palette('viridis', len(stats)))
+    ax.set_title('Purchase Amount Distribution by Purchase Frequency')
+    ax.set_xlabel('Frequency of Purchases')
+    ax.set_ylabel('Purchase Amount (USD)')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# Visualization 11: Item Size vs Purchase Amount (replaced swarmplot with stripplot)
+@chart('seaborn', 'size_vs_purchase_amount', 'Size vs Purchase Amount', columns=['Size', 'Purchase Amount (USD)'])
+def size_vs_purchase_amount(ax, df):
+    # Sampled per size, so the rarer sizes keep their share of the points
+    points = sample_points(df, by='Size')
+    sns.stripplot(data=points, x='Size', y='Purchase Amount (USD)',
+                 hue='Size', palette='Set3', legend=False, size=4, jitter=True, alpha=0.7, ax=ax)
+    if points is not df:
+        label_mode(ax, sample_label(points, df))
+    ax.set_title('Purchase Amount by Item Size')
+    ax.set_xlabel('Size')
+    ax.set_ylabel('Purchase Amount (USD)')
+
+
+# Visualization 12: Review Rating Distribution by Shipping Type (fixed palette warning)
+@chart('seaborn', 'rating_by_shipping_type', 'Rating by Shipping Type',
+       needs=['rating_values_by_shipping_type', 'rating_box_by_shipping_type'], figsize=(12, 6))
+def rating_by_shipping_type(ax, df, aggs):
+    distributions = aggs['rating_values_by_shipping_type']
+    draw_violins(ax, distributions, aggs['rating_box_by_shipping_type'],
+                 sns.color_palette('rocket', len(distributions)))
+    ax.set_title('Review Rating Distribution by Shipping Type')
+    ax.set_xlabel('Shipping Type')
+    ax.set_ylabel('Review Rating')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# NEW Visualization 13: Age vs Purchase Amount with Color Mapped to Review Rating
+@chart('seaborn', 'age_vs_purchase_amount_by_rating', 'Age vs Purchase Amount by Rating',
+       columns=['Age', 'Purchase Amount (USD)', 'Review Rating', 'Previous Purchases'])
+def age_vs_purchase_amount_by_rating(ax, df):
+    points = sample_points(df)
+    scatter = sns.scatterplot(data=points, x='Age', y='Purchase Amount (USD)',
                               hue='Review Rating', palette='viridis', size='Previous Purchases',
-                              sizes=(20, 200), alpha=0.7)
-    plt.title('Age vs Purchase Amount (Colored by Review Rating)')
-    plt.xlabel('Customer Age')
-    plt.ylabel('Purchase Amount (USD)')
-    plt.legend(title='Review Rating', bbox_to_anchor=(1.05, 1), loc='upper left')
-    visualizations.append(save_plot_to_base64(plt, 'Age vs Purchase Amount by Rating'))
-    plt.close()
-    
-    # NEW Visualization 14: Promo Code Usage by Purchase Frequency
-    plt.figure(figsize=(10, 6))
-    sns.countplot(data=df, x='Frequency of Purchases', hue='Promo Code Used', palette='Set2')
-    plt.title('Promo Code Usage by Purchase Frequency')
-    plt.xlabel('Purchase Frequency')
-    plt.ylabel('Count')
-    plt.legend(title='Promo Code Used')
-    plt.xticks(rotation=45)
-    visualizations.append(save_plot_to_base64(plt, 'Promo Code Usage by Frequency'))
-    plt.close()
-    
-    # NEW Visualization 15: Preferred Payment Method vs Actual Payment Method
-    plt.figure(figsize=(10, 8))
-    payment_crosstab = pd.crosstab(df['Preferred Payment Method'], df['Payment Method'])
-    sns.heatmap(payment_crosstab, annot=True, cmap='YlGnBu', fmt='d')
-    plt.title('Preferred Payment Method vs Actual Payment Method Used')
-    plt.xlabel('Payment Method Used')
-    plt.ylabel('Preferred Payment Method')
-    visualizations.append(save_plot_to_base64(plt, 'Payment Method Preference vs Usage'))
-    plt.close()
-    
-    # NEW Visualization 16: Color Preferences by Gender
-    plt.figure(figsize=(12, 6))
-    # Get the top colors
-    top_colors = df['Color'].value_counts().head(8).index
-    # Filter data for those colors
-    color_gender_df = df[df['Color'].isin(top_colors)]
-    sns.countplot(data=color_gender_df, x='Color', hue='Gender', palette='Pastel1')
-    plt.title('Top Color Preferences by Gender')
-    plt.xlabel('Color')
-    plt.ylabel('Count')
-    plt.xticks(rotation=45)
-    plt.legend(title='Gender')
-    visualizations.append(save_plot_to_base64(plt, 'Color Preferences by Gender'))
-    plt.close()
-    
+                              sizes=(20, 200), alpha=0.7, ax=ax)
+    ax.set_title('Age vs Purchase Amount (Colored by Review Rating)')
+    ax.set_xlabel('Customer Age')
+    ax.set_ylabel('Purchase Amount (USD)')
+    ax.legend(title='Review Rating', bbox_to_anchor=(1.05, 1), loc='upper left')
+    if points is not df:
+        label_mode(ax, sample_label(points, df))
+
+
+# NEW Visualization 14: Promo Code Usage by Purchase Frequency
+@chart('seaborn', 'promo_code_usage_by_frequency', 'Promo Code Usage by Frequency',
+       needs=['count_by_frequency_promo'])
+def promo_code_usage_by_frequency(ax, df, aggs):
+    draw_counts(ax, aggs['count_by_frequency_promo'], 'Frequency of Purchases', 'Promo Code Used', palette='Set2')
+    ax.set_title('Promo Code Usage by Purchase Frequency')
+    ax.set_xlabel('Purchase Frequency')
+    ax.set_ylabel('Count')
+    ax.legend(title='Promo Code Used')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# NEW Visualization 15: Preferred Payment Method vs Actual Payment Method
+@chart('seaborn', 'payment_method_preference_vs_usage', 'Payment Method Preference vs Usage',
+       needs=['count_by_preferred_payment_method'], figsize=(10, 8))
+def payment_method_preference_vs_usage(ax, df, aggs):
+    # The crosstab is the shared pair counts laid out as a table; pairs never seen count 0
+    payment_crosstab = aggs['count_by_preferred_payment_method'].unstack(fill_value=0)
+    sns.heatmap(payment_crosstab, annot=True, cmap='YlGnBu', fmt='d', ax=ax)
+    ax.set_title('Preferred Payment Method vs Actual Payment Method Used')
+    ax.set_xlabel('Payment Method Used')
+    ax.set_ylabel('Preferred Payment Method')
+
+
+# NEW Visualization 16: Color Preferences by Gender
+@chart('seaborn', 'color_preferences_by_gender', 'Color Preferences by Gender',
+       needs=['count_by_color', 'count_by_color_gender'], figsize=(12, 6))
+def color_preferences_by_gender(ax, df, aggs):
+    # Get the top colors; ties keep color order, as value_counts does
+    top_colors = list(aggs['count_by_color'].sort_values(ascending=False, kind='stable').head(8).index)
+    # Explicit order: a categorical Color column would otherwise show every color, even unused ones
+    draw_counts(ax, aggs['count_by_color_gender'], 'Color', 'Gender', palette='Pastel1', order=top_colors)
+    ax.set_title('Top Color Preferences by Gender')
+    ax.set_xlabel('Color')
+    ax.set_ylabel('Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.legend(title='Gender')
+
+
+def generate_seaborn_visualizations(df, version=None, source=None, options=None, chart_ids=None, aggregates=None):
+    visualizations = render_charts('seaborn', df, version=version, options=options, source=source, chart_ids=chart_ids,
+                                   aggregates=aggregates)
+
     return {
         'library': 'seaborn',
         'visualizations': visualizations
     }
-
-def save_plot_to_base64(plt, title):
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    buffer.seek(0)
-    image_base64 = base64.b64encode(buffer.read()).decode('utf-8')
-    return {
-        'title': title,
-        'image': f'data:image/png;base64,{image_base64}'
-    }
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import numpy as np
+
+# Mergeable quantile sketch for box plots. Values are kept as a sorted list of
+# (value, weight) pairs; while a sketch holds at most CAPACITY distinct values
+# it is exact. Past that, adjacent pairs are merged into weighted centroids of
+# at most 2 * rows / CAPACITY rows each, so any quantile read from the sketch
+# is off by at most 2 / CAPACITY in rank (0.1% with the default capacity).
+# The smallest and largest TAIL_VALUES values are also kept exactly, for the
+# whisker ends and a capped sample of outliers.
+CAPACITY = int(os.environ.get('SKETCH_CAPACITY', 2000))
+TAIL_VALUES = int(os.environ.get('SKETCH_TAIL_VALUES', 200))
+
+
+class QuantileSketch:
+
+    def __init__(self, capacity=CAPACITY, tail=TAIL_VALUES):
+        self.capacity = capacity
+        self.tail = tail
+        self.values = np.empty(0)
+        self.weights = np.empty(0, dtype=np.int64)
+        self.low = np.empty(0)
+        self.high = np.empty(0)
+
+    @classmethod
+    def from_values(cls, values, capacity=CAPACITY, tail=TAIL_VALUES):
+        sketch = cls(capacity, tail)
+        values = np.asarray(values, dtype=float)
+        values = np.sort(values[~np.isnan(values)])
+        sketch.values, sketch.weights = np.unique(values, return_counts=True)
+        sketch.low, sketch.high = values[:tail], values[max(len(values) - tail, 0):]
+        sketch._compress()
+        return sketch
+
+    @property
+    def count(self):
+        return int(self.weights.sum())
+
+    def merge(self, other):
+        """Return a new sketch summarizing the rows of both sketches."""
+        merged = QuantileSketch(self.capacity, self.tail)
+        values = np.concatenate([self.values, other.values])
+        weights = np.concatenate([self.weights, other.weights])
+        merged.values, inverse = np.unique(values, return_inverse=True)
+        merged.weights = np.bincount(inverse.ravel(), weights=weights, minlength=len(merged.values)).astype(np.int64)
+        merged.low = np.sort(np.concatenate([self.low, other.low]))[:self.tail]
+        high = np.sort(np.concatenate([self.high, other.high]))
+        merged.high = high[max(len(high) - self.tail, 0):]
+        merged._compress()
+        return merged
+
+    def _compress(self):
+        if len(self.values) <= self.capacity:
+            return
+        # Cut the cumulative weight into CAPACITY / 2 equal slices and collapse each into its weighted mean
+        cumulative = np.cumsum(self.weights)
+        buckets = np.minimum((cumulative - 1) * (self.capacity // 2) // cumulative[-1], self.capacity // 2 - 1)
+        weights = np.bincount(buckets, weights=self.weights)
+        sums = np.bincount(buckets, weights=self.values * self.weights)
+        keep = weights > 0
+        self.values = sums[keep] / weights[keep]
+        self.weights = weights[keep].astype(np.int64)
+
+    def quantile(self, q):
+        # Linear interpolation between order statistics, as numpy.percentile does
+        position = (self.count - 1) * q
+        below, above = int(np.floor(position)), int(np.ceil(position))
+        cumulative = np.cumsum(self.weights)
+        lower, upper = self.values[np.searchsorted(cumulative, [below, above], side='right')]
+        return lower + (upper - lower) * (position - below)
+
+    def box_stats(self, label, whis=1.5):
+        """Box plot statistics in the form matplotlib's Axes.bxp draws."""
+        q1, median, q3 = (self.quantile(q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        low_fence, high_fence = q1 - whis * iqr, q3 + whis * iqr
+        minimum, maximum = self.low[0], self.high[-1]
+
+        # Whiskers end at the most extreme values inside the fences; those sit in the
+        # exact tails unless more than TAIL_VALUES rows lie beyond a fence
+        inside_low = self.low[self.low >= low_fence]
+        inside_high = self.high[self.high <= high_fence]
+        whislo = inside_low[0] if len(inside_low) else low_fence
+        whishi = inside_high[-1] if len(inside_high) else high_fence
+        if minimum >= low_fence:
+            whislo = minimum
+        if maximum <= high_fence:
+            whishi = maximum
+
+        fliers = np.concatenate([self.low[self.low < low_fence], self.high[self.high > high_fence]])
+        return {
+            'label': label,
+            'med': median,
+            'q1': q1,
+            'q3': q3,
+            'iqr': iqr,
+            'whislo': whislo,
+            'whishi': whishi,
+            'fliers': fliers,
+            'mean': float(np.average(self.values, weights=self.weights)),
+        }
@@ -0,0 +1,117 @@
+import json
+import math
+import numpy as np
+from visualizations.chart_cache import chart_cache, make_key
+from visualizations import registry
+from visualizations.aggregates import compute_aggregates
+from visualizations.metrics import span
+from visualizations.rendering import prepare_frame
+
+# Client-side charts: instead of an image the server sends a Plotly figure
+# (traces plus layout) holding only the aggregated series, and the browser
+# draws it. Specs are cached per dataset version like rendered images, under
+# the render option format='spec'.
+SPEC_OPTIONS = {'format': 'spec'}
+
+
+def to_json_values(values):
+    # Plain lists for JSON: numpy scalars become Python numbers, NaN becomes null
+    values = np.asarray(values).tolist()
+    return [None if isinstance(value, float) and math.isnan(value) else value for value in values]
+
+
+def bar(x, y, color=None, name=None, width=None):
+    trace = {'type': 'bar', 'x': to_json_values(x), 'y': to_json_values(y)}
+    if color is not None:
+        trace['marker'] = {'color': color if isinstance(color, str) else list(color)}
+    if name is not None:
+        trace['name'] = name
+    if width is not None:
+        trace['width'] = to_json_values(width)
+    return trace
+
+
+def line(x, y, color=None, name=None, dash=None, markers=False):
+    trace = {'type': 'scatter', 'mode': 'lines+markers' if markers else 'lines',
+             'x': to_json_values(x), 'y': to_json_values(y)}
+    style = {key: value for key, value in (('color', color), ('dash', dash)) if value is not None}
+    if style:
+        trace['line'] = style
+    if name is not None:
+        trace['name'] = name
+    return trace
+
+
+def histogram_bars(counts, edges, color=None):
+    # A precomputed histogram as bars centred on each bin, as wide as the bin
+    edges = np.asarray(edges, dtype=float)
+    return bar((edges[:-1] + edges[1:]) / 2, counts, color=color, width=np.diff(edges))
+
+
+def figure(traces, title, xlabel=None, ylabel=None, legend_title=None, **layout):
+    """Plotly figure dict: traces, a title and axis labels plus any extra layout keys."""
+    spec_layout = {'title': {'text': title}, 'xaxis': {}, 'yaxis': {}}
+    if xlabel is not None:
+        spec_layout['xaxis']['title'] = {'text': xlabel}
+    if ylabel is not None:
+        spec_layout['yaxis']['title'] = {'text': ylabel}
+    if legend_title is not None:
+        spec_layout['legend'] = {'title': {'text': legend_title}}
+    for key, value in layout.items():
+        if isinstance(value, dict) and isinstance(spec_layout.get(key), dict):
+            spec_layout[key].update(value)
+        else:
+            spec_layout[key] = value
+    return {'data': traces, 'layout': spec_layout}
+
+
+def has_specs(library):
+    return any(registry.get_spec(library, chart.id) for chart in registry.get_charts(library))
+
+
+def iter_chart_specs(library, df, version=None, chart_ids=None, cache=chart_cache, aggregates=None, on_error=None):
+    """Yield (chart, spec) for the charts of library that have a client-side spec.
+
+    Specs are built in registry order from the library's prepared frame and
+    the shared aggregates (or the precomputed aggregates given, as for
+    iter_chart_pngs). Building one is cheap, so it happens in this process.
+    With on_error, a spec that fails to build is passed to on_error(chart,
+    exception) and the remaining charts are still yielded.
+    """
+    charts = [chart for chart in registry.get_charts(library, df.columns) if registry.get_spec(library, chart.id)]
+    if chart_ids is not None:
+        charts = [chart for chart in charts if chart.id in chart_ids]
+
+    frame = aggs = None
+    for chart in charts:
+        key = make_key(library, chart.id, version, SPEC_OPTIONS)
+        cached = cache.get(key) if version is not None else None
+        if cached is not None:
+            yield chart, json.loads(cached)
+            continue
+
+        if frame is None:
+            with span('clean', library=library):
+                frame, frame_version = prepare_frame(library, df, version)
+            if aggregates is not None:
+                aggs = aggregates
+            else:
+                needs = [name for other in charts for name in other.needs]
+                with span('aggregate', library=library):
+                    aggs = compute_aggregates(frame, needs, frame_version) if needs else {}
+
+        build = registry.get_spec(library, chart.id)
+        try:
+            with span('spec', library=library, chart=chart.id):
+                if chart.needs:
+                    spec = build(frame, {name: aggs[name] for name in chart.needs})
+                else:
+                    spec = build(frame)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(chart, e)
+            continue
+        if version is not None:
+            cache.put(key, json.dumps(spec, separators=(',', ':')).encode('utf-8'))
+        yield chart, spec
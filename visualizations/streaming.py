@@ -0,0 +1,111 @@
+import os
+import itertools
+import threading
+import numpy as np
+import pandas as pd
+from visualizations.aggregates import AGGREGATES, aggregate_columns, partial_aggregates, merge_partials, finalize_partials
+
+# Out-of-core mode: the source is read in fixed-size chunks and folded into
+# mergeable partial aggregates, so peak memory follows the chunk size rather
+# than the file size. Charts that draw individual rows use a uniform sample.
+SAMPLE_ROWS = int(os.environ.get('STREAM_SAMPLE_ROWS', 50_000))
+
+# One summary per source path, replaced when the dataset version changes
+_summaries = {}
+_lock = threading.Lock()
+
+
+class Reservoir:
+    """Uniform random sample of at most size rows from a stream of DataFrame chunks (algorithm R)."""
+
+    def __init__(self, size=SAMPLE_ROWS, seed=0):
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._frame = None
+
+    def add(self, chunk):
+        chunk = chunk.reset_index(drop=True)
+        taken = 0
+        if self._frame is None or len(self._frame) < self.size:
+            # Fill the reservoir with the first rows of the stream
+            taken = min(len(chunk), self.size - (0 if self._frame is None else len(self._frame)))
+            head = chunk.iloc[:taken]
+            self._frame = head if self._frame is None else pd.concat([self._frame, head], ignore_index=True)
+
+        rest = len(chunk) - taken
+        if rest > 0:
+            # Row number i of the stream replaces a random slot with probability size / (i + 1)
+            positions = np.arange(self.seen + taken, self.seen + len(chunk))
+            slots = (self._rng.random(rest) * (positions + 1)).astype(np.int64)
+            rows = np.flatnonzero(slots < self.size)
+            if len(rows):
+                # When a slot is hit more than once in a chunk, the later row wins
+                slots = slots[rows]
+                _, last = np.unique(slots[::-1], return_index=True)
+                keep = len(slots) - 1 - last
+                incoming = chunk.iloc[taken + rows[keep]].set_axis(slots[keep])
+                kept = self._frame.drop(index=slots[keep])
+                self._frame = pd.concat([kept, incoming]).sort_index()
+        self.seen += len(chunk)
+
+    def frame(self):
+        if self._frame is None:
+            return pd.DataFrame()
+        return self._frame.reset_index(drop=True)
+
+
+def _fold(chunks, names, reservoir, partials=None):
+    partials = partials or {}
+    for chunk in chunks:
+        partials = merge_partials(partials, partial_aggregates(chunk, names))
+        reservoir.add(chunk)
+    return partials
+
+
+def summarize_chunks(chunks, names=None, sample_rows=SAMPLE_ROWS, seed=0):
+    """Fold an iterable of DataFrame chunks into (sample, aggregates).
+
+    aggregates matches compute_aggregates over the concatenated chunks;
+    sample is a uniform random sample of at most sample_rows rows.
+    """
+    names = list(AGGREGATES) if names is None else list(names)
+    reservoir = Reservoir(sample_rows, seed)
+    partials = _fold(chunks, names, reservoir)
+    return reservoir.frame(), finalize_partials(partials)
+
+
+def summarize_dataset(path, chunk_rows=None):
+    """Return (sample, version, aggregates) for the dataset at path, streaming it once per version."""
+    from dataset import CHUNK_ROWS, iter_chunks, source_version
+
+    version = source_version(path)
+    # Held while streaming, so concurrent requests wait for one pass instead of each starting their own
+    with _lock:
+        cached = _summaries.get(path)
+        if cached is None or cached['version'] != version:
+            reservoir = Reservoir()
+            chunks = iter_chunks(path, chunk_rows or CHUNK_ROWS)
+            first = next(chunks, None)
+            if first is None:
+                partials = {}
+            else:
+                # Uploaded datasets may lack columns: only the aggregates they can feed are folded
+                names = [name for name in AGGREGATES if aggregate_columns(name) <= set(first.columns)]
+                partials = _fold(itertools.chain([first], chunks), names, reservoir)
+            cached = {'version': version, 'reservoir': reservoir, 'partials': partials}
+            cached['sample'], cached['aggregates'] = reservoir.frame(), finalize_partials(partials)
+            _summaries[path] = cached
+    return cached['sample'], version, cached['aggregates']
+
+
+def append_summary(path, previous, version, batch):
+    """Fold rows appended to path into its summary, if it is summarized at version previous."""
+    with _lock:
+        cached = _summaries.get(path)
+        if cached is None or cached['version'] != previous:
+            return
+        reservoir = cached['reservoir']
+        partials = _fold([batch], list(AGGREGATES), reservoir, dict(cached['partials']))
+        _summaries[path] = {'version': version, 'reservoir': reservoir, 'partials': partials,
+                            'sample': reservoir.frame(), 'aggregates': finalize_partials(partials)}